@@ -47,6 +47,11 @@ if len(sys.argv) == 1 \
 
 import os
 
+# Cleaned reads are streamed to stdout: all the messages go to stderr
+if '--stdout' in sys.argv[1:]:
+    sys.stdout = sys.stderr
+# end if
+
 print('\n  == {} v{} ==\n'.format(os.path.basename(__file__), __version__))
 
 
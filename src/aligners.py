@@ -0,0 +1,87 @@
+
+from src.blast import BlastAligner
+from src.cascade import CascadingAligner
+from src.dedup import DeduplicatingAligner
+from src.alignment_memo import MemoizingAligner
+from src.seed_aligner import SeedExtendAligner
+from src.kromsatel_modes import KromsatelModes
+from src.primer_fast_path import PrimerFastPathAligner
+
+
+ALIGNERS = (
+    'blast',
+    'internal',
+)
+
+
+def create_aligner(kromsatel_args, primer_scheme):
+    aligner = _create_base_aligner(kromsatel_args)
+
+    if not kromsatel_args.cascade_task is None:
+        aligner = CascadingAligner(
+            [
+                aligner,
+                BlastAligner(kromsatel_args, kromsatel_args.cascade_task),
+            ]
+        )
+    # end if
+
+    if not kromsatel_args.alignment_memo_fpath is None:
+        aligner = MemoizingAligner(
+            aligner,
+            kromsatel_args.alignment_memo_fpath,
+            kromsatel_args.reference_fpath
+        )
+    # end if
+
+    aligner = DeduplicatingAligner(
+        aligner,
+        kromsatel_args.dedup_window
+    )
+
+    if primer_fast_path_enabled(kromsatel_args):
+        aligner = PrimerFastPathAligner(
+            aligner,
+            primer_scheme,
+            kromsatel_args.reference_fpath
+        )
+    # end if
+
+    return aligner
+# end def
+
+
+def _create_base_aligner(kromsatel_args):
+    if kromsatel_args.aligner == 'internal':
+        return SeedExtendAligner(kromsatel_args)
+    # end if
+    return BlastAligner(kromsatel_args)
+# end def
+
+
+def aligner_uses_blast(kromsatel_args):
+    # Reads are not aligned at all if alignments are taken from a file
+    if not kromsatel_args.reclassify_fpath is None \
+       or not kromsatel_args.alignments_fpath is None:
+        return False
+    # end if
+    return kromsatel_args.aligner == 'blast' \
+           or not kromsatel_args.cascade_task is None
+# end def
+
+
+def get_cascade_tier_names(kromsatel_args):
+    if kromsatel_args.aligner == 'blast':
+        first_tier_name = kromsatel_args.blast_task
+    else:
+        first_tier_name = kromsatel_args.aligner
+    # end if
+    return [first_tier_name, kromsatel_args.cascade_task]
+# end def
+
+
+def primer_fast_path_enabled(kromsatel_args):
+    # Long reads are rarely free of errors, and they are often chimeric
+    return kromsatel_args.primer_fast_path \
+           and kromsatel_args.kromsatel_mode != KromsatelModes.Nanopore
+# end def
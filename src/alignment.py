@@ -1,91 +1,157 @@
 
 import re
+import struct
 
 
-def parse_alignments_illumina(raw_alignments):
+# Columns of BLAST tabular output (-outfmt 6) which `parse_blast_tabular` expects
+TABULAR_COLUMNS = (
+    'qseqid',
+    'qstart',
+    'qend',
+    'sstart',
+    'send',
+    'sstrand',
+)
+
+
+def parse_alignments_illumina(reads_chunk, alignment_lists):
 
     alignments = dict()
 
-    for raw_alignment_obj in raw_alignments:
-        query_name = raw_alignment_obj['report']['results']['search']['query_title']
-        alignments[query_name] = parse_single_hsp(raw_alignment_obj['report'])
+    for read, read_alignments in zip(reads_chunk, alignment_lists):
+        alignments[read.header] = select_single_alignment(read_alignments)
     # end for
 
     return alignments
 # end def
 
 
-def parse_alignments_nanopore(raw_alignments):
+def parse_alignments_nanopore(reads_chunk, alignment_lists):
 
     alignments = dict()
 
-    for raw_alignment_obj in raw_alignments:
-        query_name = raw_alignment_obj['report']['results']['search']['query_title']
-        alignments[query_name] = parse_hsps(raw_alignment_obj['report'])
+    for read, read_alignments in zip(reads_chunk, alignment_lists):
+        alignments[read.header] = read_alignments
     # end for
 
     return alignments
 # end def
 
 
-def parse_single_hsp(alignment_report):
-
-    search_result = alignment_report['results']['search']
-
-    if len(search_result['hits']) == 0:
+def select_single_alignment(read_alignments):
+    if len(read_alignments) == 0:
         return None
     # end if
+    return read_alignments[0]
+# end def
 
-    hsps = search_result['hits'][0]['hsps']
 
-    first_hsp = hsps[0]
-    return Alignment(first_hsp)
+# Binary record of a single alignment: query_from, query_to, ref_from, ref_to, strand
+_PACKED_ALIGNMENT = struct.Struct('<IIIIB')
+PACKED_ALIGNMENT_SIZE = _PACKED_ALIGNMENT.size
+
+
+def pack_alignments(alignments):
+    # Packs a list of alignments into a compact bytes record
+    return b''.join(
+        _PACKED_ALIGNMENT.pack(
+            a.query_from, a.query_to,
+            a.ref_from, a.ref_to,
+            a.align_strand_plus
+        )
+        for a in alignments
+    )
 # end def
 
 
-def parse_hsps(alignment_report):
+def unpack_alignments(packed_alignments):
+    return [
+        Alignment(query_from, query_to, ref_from, ref_to, bool(strand_plus))
+        for query_from, query_to, ref_from, ref_to, strand_plus
+            in _PACKED_ALIGNMENT.iter_unpack(packed_alignments)
+    ]
+# end def
+
 
-    alignments = list()
+# Query identifiers are indices of query sequences prefixed with a letter:
+#   BLAST+ may treat a purely numeric identifier as a GI or an `lcl|` id.
+_QUERY_ID_PREFIX = 'q'
 
-    search_result = alignment_report['results']['search']
 
-    if len(search_result['hits']) == 0:
-        return alignments
+def make_query_id(query_index):
+    return '{}{}'.format(_QUERY_ID_PREFIX, query_index)
+# end def
+
+
+def _parse_query_id(qseqid):
+    # Returns the index of the query sequence. BLAST+ may report
+    #   the identifier with a database prefix, e.g. `lcl|q0`
+    query_id = qseqid.rpartition('|')[2]
+    if not query_id.startswith(_QUERY_ID_PREFIX):
+        raise ValueError('unexpected query identifier `{}`'.format(qseqid))
     # end if
+    return int(query_id[len(_QUERY_ID_PREFIX):])
+# end def
 
-    hsps = search_result['hits'][0]['hsps']
 
-    for hsp in hsps:
-        alignments.append(Alignment(hsp))
-    # end for
+def parse_blast_tabular(lines):
+    # Parses BLAST tabular output line by line,
+    #   yields tuples (<QUERY_INDEX>, <Alignment>).
+    # Query identifiers are expected to be made by `make_query_id`.
 
-    return alignments
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('ascii')
+        # end if
+
+        if line == '\n' or line.startswith('#'):
+            continue
+        # end if
+
+        qseqid, qstart, qend, sstart, send, sstrand = line.rstrip().split('\t')
+
+        query_from = int(qstart) - 1 # 1-based to 0-based
+        query_to   = int( qend ) - 1 # 1-based to 0-based
+        ref_from   = int(sstart) - 1 # 1-based to 0-based
+        ref_to     = int( send ) - 1 # 1-based to 0-based
+
+        align_strand_plus = (sstrand == 'plus')
+
+        # If strand is minus, swap reference alignment coordinates
+        #   so that `ref_from` < `ref_to`
+        if not align_strand_plus:
+            ref_from, ref_to = ref_to, ref_from
+        # end if
+
+        yield _parse_query_id(qseqid), Alignment(query_from, query_to, ref_from, ref_to, align_strand_plus)
+    # end for
 # end def
 
 
 class Alignment:
 
-    def __init__(self, hsp):
+    def __init__(self, query_from, query_to, ref_from, ref_to, align_strand_plus):
+        # All coordinates are 0-based and right-closed, `ref_from` <= `ref_to`
 
-        self.query_from = hsp['query_from'] - 1 # 1-based to 0-based
-        self.query_to   = hsp[ 'query_to' ] - 1 # 1-based to 0-based
+        self.query_from = query_from
+        self.query_to   = query_to
 
-        self.ref_from   = hsp[ 'hit_from' ] - 1 # 1-based to 0-based
-        self.ref_to     = hsp[  'hit_to'  ] - 1 # 1-based to 0-based
+        self.ref_from   = ref_from
+        self.ref_to     = ref_to
+
+        self.align_strand_plus = align_strand_plus
 
         # TODO: Temporarily disabled
         # self.query_gap_locations = _find_gap_locations(hsp['qseq'])
         # self.ref_gap_locations = _find_gap_locations(hsp['hseq'])
+    # end def
 
-        query_strand_plus = True if hsp['query_strand'].upper() == 'PLUS' else False
-        ref_strand_plus   = True if hsp[ 'hit_strand' ].upper() == 'PLUS' else False
-        self.align_strand_plus = query_strand_plus and ref_strand_plus
-
-        # If strand is minus, swap reference alignment coordinates
-        #   so that `ref_from` < `ref_to`
-        if not self.align_strand_plus:
-            self.ref_from, self.ref_to = self.ref_to, self.ref_from
-        # end if
+    def get_copy(self):
+        return Alignment(
+            self.query_from, self.query_to,
+            self.ref_from, self.ref_to,
+            self.align_strand_plus
+        )
     # end def
 
     def get_aln_start_coord(self):
@@ -0,0 +1,160 @@
+
+import os
+import sqlite3
+import hashlib
+
+import src.process_cache
+import src.filesystem as fs
+from src.fatal_errors import FatalError
+from src.alignment import pack_alignments, unpack_alignments
+
+
+# SQLite limits number of parameters in a single statement
+_MAX_KEYS_PER_QUERY = 500
+
+
+class MemoizingAligner:
+    # Keeps alignments in an on-disk SQLite store, which persists across runs.
+    # A key of an entry is a hash of the reference sequence, aligner parameters
+    #   and the read sequence. Only sequences missing from the store are aligned.
+
+    def __init__(self, aligner, memo_fpath, reference_fpath):
+        self.aligner = aligner
+        self.memo_fpath = memo_fpath
+
+        context = '{}\n{}\n'.format(
+            fs.hash_file(reference_fpath),
+            aligner.params_key
+        )
+        # Only bytes are kept: keys must be the same in every process,
+        #   whether the aligner is inherited or pickled
+        self._context_digest = hashlib.blake2b(
+            context.encode('utf-8'),
+            digest_size=16
+        ).digest()
+
+        _init_memo_database(memo_fpath)
+    # end def
+
+    def align(self, seqs):
+
+        keys = [self._make_key(seq) for seq in seqs]
+
+        connection = self._get_connection()
+        memo_alignments = _fetch(connection, keys)
+
+        missed_indices = [
+            i for i, key in enumerate(keys) if not key in memo_alignments
+        ]
+        missed_alignments = list()
+        if len(missed_indices) != 0:
+            missed_alignments = self.aligner.align(
+                [seqs[i] for i in missed_indices]
+            )
+        # end if
+
+        alignments = [None] * len(seqs)
+
+        for i, key in enumerate(keys):
+            packed_alignments = memo_alignments.get(key)
+            if not packed_alignments is None:
+                alignments[i] = unpack_alignments(packed_alignments)
+            # end if
+        # end for
+
+        new_entries = list()
+        for i, seq_alignments in zip(missed_indices, missed_alignments):
+            alignments[i] = seq_alignments
+            new_entries.append((keys[i], pack_alignments(seq_alignments)))
+        # end for
+
+        _store(connection, new_entries, self.memo_fpath)
+
+        return alignments
+    # end def
+
+    def _make_key(self, seq):
+        return hashlib.blake2b(
+            self._context_digest + seq.encode('ascii'),
+            digest_size=16
+        ).digest()
+    # end def
+
+    def _get_connection(self):
+        # SQLite connections must not be shared across processes
+        return src.process_cache.get_or_build(
+            ('memo_connection', os.getpid(), self.memo_fpath),
+            lambda: _connect(self.memo_fpath)
+        )
+    # end def
+# end class
+
+
+def _connect(memo_fpath):
+    try:
+        connection = sqlite3.connect(memo_fpath, timeout=600)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+    except sqlite3.Error as err:
+        error_msg = '\nError: cannot open alignment memo `{}`:\n  {}' \
+            .format(memo_fpath, err)
+        raise FatalError(error_msg)
+    # end try
+    return connection
+# end def
+
+
+def _init_memo_database(memo_fpath):
+    connection = _connect(memo_fpath)
+    try:
+        with connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS alignments' \
+                ' (key BLOB PRIMARY KEY, alignments BLOB NOT NULL)' \
+                ' WITHOUT ROWID'
+            )
+        # end with
+    except sqlite3.Error as err:
+        error_msg = '\nError: cannot initialize alignment memo `{}`:\n  {}' \
+            .format(memo_fpath, err)
+        raise FatalError(error_msg)
+    finally:
+        connection.close()
+    # end try
+# end def
+
+
+def _fetch(connection, keys):
+    memo_alignments = dict()
+    unique_keys = list(set(keys))
+
+    for i in range(0, len(unique_keys), _MAX_KEYS_PER_QUERY):
+        batch = unique_keys[i : i+_MAX_KEYS_PER_QUERY]
+        query = 'SELECT key, alignments FROM alignments WHERE key IN ({})' \
+            .format(', '.join('?' * len(batch)))
+        for key, packed_alignments in connection.execute(query, batch):
+            memo_alignments[key] = packed_alignments
+        # end for
+    # end for
+
+    return memo_alignments
+# end def
+
+
+def _store(connection, new_entries, memo_fpath):
+    if len(new_entries) == 0:
+        return
+    # end if
+    try:
+        with connection:
+            connection.executemany(
+                'INSERT OR IGNORE INTO alignments (key, alignments) VALUES (?, ?)',
+                new_entries
+            )
+        # end with
+    except sqlite3.Error as err:
+        error_msg = '\nError: cannot write to alignment memo `{}`:\n  {}' \
+            .format(memo_fpath, err)
+        raise FatalError(error_msg)
+    # end try
+# end def
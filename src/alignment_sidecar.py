@@ -0,0 +1,161 @@
+
+import os
+import struct
+
+from src.fatal_errors import FatalError
+from src.alignment import pack_alignments, unpack_alignments, PACKED_ALIGNMENT_SIZE
+
+
+# Sidecar file of alignments:
+#   header: magic, format version, kromsatel mode, chunk size;
+#   then blocks of alignments of single chunks, in arbitrary order.
+# Block: header (chunk number, part, number of reads, payload size) and payload.
+# Payload: for each read -- number of alignments and packed alignments.
+# "Part" distinguishes forward (0) and reverse (1) reads of a paired-end chunk.
+
+_MAGIC = b'KRSA'
+_VERSION = 1
+
+_FILE_HEADER = struct.Struct('<4sBBI')
+_BLOCK_HEADER = struct.Struct('<IBII')
+_NUM_ALIGNMENTS = struct.Struct('<H')
+
+
+class AlignmentSidecarWriter:
+
+    def __init__(self, sidecar_fpath, kromsatel_mode, chunk_size):
+        self.sidecar_fpath = sidecar_fpath
+        self._init_file(kromsatel_mode, chunk_size)
+    # end def
+
+    def _init_file(self, kromsatel_mode, chunk_size):
+        try:
+            with open(self.sidecar_fpath, 'wb') as sidecar_file:
+                sidecar_file.write(
+                    _FILE_HEADER.pack(_MAGIC, _VERSION, kromsatel_mode, chunk_size)
+                )
+            # end with
+        except OSError as err:
+            error_msg = '\nError: cannot initialize alignment file `{}`:\n {}' \
+                .format(self.sidecar_fpath, err)
+            raise FatalError(error_msg)
+        # end try
+    # end def
+
+    def write_chunk(self, chunk_num, part, alignment_lists):
+        # Should be called under a lock: blocks are appended by several processes
+        payload = b''.join(
+            _NUM_ALIGNMENTS.pack(len(read_alignments)) + pack_alignments(read_alignments)
+            for read_alignments in alignment_lists
+        )
+        block_header = _BLOCK_HEADER.pack(
+            chunk_num,
+            part,
+            len(alignment_lists),
+            len(payload)
+        )
+        with open(self.sidecar_fpath, 'ab') as sidecar_file:
+            sidecar_file.write(block_header + payload)
+        # end with
+    # end def
+# end class
+
+
+class AlignmentSidecarReader:
+
+    def __init__(self, sidecar_fpath):
+        self.sidecar_fpath = sidecar_fpath
+        self.kromsatel_mode = None
+        self.chunk_size = None
+        # (<CHUNK_NUM>, <PART>) -> (<OFFSET_OF_PAYLOAD>, <NUM_READS>, <PAYLOAD_SIZE>)
+        self.block_locations = dict()
+        self._index_blocks()
+    # end def
+
+    def _index_blocks(self):
+        # Reads block headers only, skipping payloads
+        try:
+            with open(self.sidecar_fpath, 'rb') as sidecar_file:
+                self._read_file_header(sidecar_file)
+
+                block_header = sidecar_file.read(_BLOCK_HEADER.size)
+                while len(block_header) == _BLOCK_HEADER.size:
+                    chunk_num, part, num_reads, payload_size = \
+                        _BLOCK_HEADER.unpack(block_header)
+                    self.block_locations[(chunk_num, part)] = (
+                        sidecar_file.tell(),
+                        num_reads,
+                        payload_size
+                    )
+                    sidecar_file.seek(payload_size, os.SEEK_CUR)
+                    block_header = sidecar_file.read(_BLOCK_HEADER.size)
+                # end while
+            # end with
+        except OSError as err:
+            error_msg = '\nError: cannot read alignment file `{}`:\n {}' \
+                .format(self.sidecar_fpath, err)
+            raise FatalError(error_msg)
+        # end try
+    # end def
+
+    def _read_file_header(self, sidecar_file):
+        file_header = sidecar_file.read(_FILE_HEADER.size)
+        if len(file_header) != _FILE_HEADER.size:
+            self._raise_invalid_file('file is truncated')
+        # end if
+
+        magic, version, kromsatel_mode, chunk_size = _FILE_HEADER.unpack(file_header)
+
+        if magic != _MAGIC:
+            self._raise_invalid_file('it is not a kromsatel alignment file')
+        # end if
+        if version != _VERSION:
+            self._raise_invalid_file('unsupported format version {}'.format(version))
+        # end if
+
+        self.kromsatel_mode = kromsatel_mode
+        self.chunk_size = chunk_size
+    # end def
+
+    def read_chunk(self, chunk_num, part, num_reads):
+        try:
+            payload_offset, stored_num_reads, payload_size = \
+                self.block_locations[(chunk_num, part)]
+        except KeyError:
+            self._raise_invalid_file(
+                'alignments of chunk #{} are missing'.format(chunk_num+1)
+            )
+        # end try
+
+        if stored_num_reads != num_reads:
+            self._raise_invalid_file(
+                'chunk #{} contains {} reads, but {} reads are stored in the file.' \
+                ' Does the file correspond to input reads?' \
+                    .format(chunk_num+1, num_reads, stored_num_reads)
+            )
+        # end if
+
+        with open(self.sidecar_fpath, 'rb') as sidecar_file:
+            sidecar_file.seek(payload_offset)
+            payload = sidecar_file.read(payload_size)
+        # end with
+
+        alignment_lists = list()
+        pos = 0
+        for _ in range(num_reads):
+            num_alignments, = _NUM_ALIGNMENTS.unpack_from(payload, pos)
+            pos += _NUM_ALIGNMENTS.size
+            end = pos + num_alignments * PACKED_ALIGNMENT_SIZE
+            alignment_lists.append(unpack_alignments(payload[pos : end]))
+            pos = end
+        # end for
+
+        return alignment_lists
+    # end def
+
+    def _raise_invalid_file(self, reason):
+        error_msg = '\nError: invalid alignment file `{}`:\n  {}' \
+            .format(self.sidecar_fpath, reason)
+        raise FatalError(error_msg)
+    # end def
+# end class
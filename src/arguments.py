@@ -1,7 +1,12 @@
 
 import os
 
+import copy
+import tempfile
+
 import src.blast
+import src.aligners
+import src.sample_sheet
 import src.filesystem as fs
 from src.printing import print_err
 from src.fatal_errors import FatalError
@@ -22,6 +27,12 @@ class KromsatelArgs:
         self.frw_read_fpath = None
         self.rvr_read_fpath = None
         self.long_read_fpath = None
+        self.interleaved = False
+        self.samples_fpath = None
+        self.samples = None
+        self.watch_dirpath = None
+        self.watch_timeout = 600 # seconds
+        self.watch_settle_time = 10 # seconds
         self.primers_fpath = None
         self.reference_fpath = None
 
@@ -31,6 +42,11 @@ class KromsatelArgs:
             'kromsatel_output'
         )
         self.split_output = False
+        self.stdout_output = False
+        self.compression_level = 9
+        self.compression_threads = 1 # thread
+        self.bgzf = False
+        self.ordered_output = False
 
         # Computational resourses
         self.threads_num = 1 # thread
@@ -39,13 +55,27 @@ class KromsatelArgs:
         self.min_len = 25 # bp
         self.chunk_size = 1000 # reads
         self.blast_task = 'megablast'
+        self.cascade_task = None
         self.fixed_crop_len = 'auto'
         self.primer_ext_len = 5 # bp
         self.use_index = False
+        self.aligner = 'blast'
+        self.db_cache_dirpath = None
+        self.dedup_window = 0 # distinct sequences
+        self.alignment_memo_fpath = None
+        self.save_alignments_fpath = None
+        self.reclassify_fpath = None
+        self.alignments_fpath = None
+        self.primer_fast_path = True
+        self.prefilter_min_kmers = 0 # k-mers
+        self.write_discarded = False
+        self.count_reads = False
+        self.merge_mates = False
 
         # "Meta" parameter derived from arguments
         self.kromsatel_mode = None
         self.tmp_dir_path = None
+        self.db_fpath = None
     # end def
 
     def __repr__(self):
@@ -54,17 +84,40 @@ class KromsatelArgs:
         + 'frw_read_fpath = `{}`\n' .format(self.frw_read_fpath) \
         + 'rvr_read_fpath = `{}`\n' .format(self.rvr_read_fpath) \
         + 'long_read_fpath = `{}`\n'.format(self.long_read_fpath) \
+        + 'interleaved = {}\n'      .format(self.interleaved) \
+        + 'samples_fpath = `{}`\n'  .format(self.samples_fpath) \
+        + 'watch_dirpath = `{}`\n'  .format(self.watch_dirpath) \
+        + 'watch_timeout = {}\n'    .format(self.watch_timeout) \
+        + 'watch_settle_time = {}\n'.format(self.watch_settle_time) \
         + 'primers_fpath = `{}`\n'  .format(self.primers_fpath) \
         + 'reference_fpath = `{}`\n'.format(self.reference_fpath) \
         + 'outdir_path = `{}`\n'    .format(self.outdir_path) \
         + 'split_output = `{}`\n'   .format(self.split_output) \
+        + 'stdout_output = {}\n'    .format(self.stdout_output) \
+        + 'compression_level = {}\n'.format(self.compression_level) \
+        + 'compression_threads = {}\n'.format(self.compression_threads) \
+        + 'bgzf = {}\n'             .format(self.bgzf) \
+        + 'ordered_output = {}\n'   .format(self.ordered_output) \
         + 'min_len = {}\n'          .format(self.min_len) \
         + 'threads_num = {}\n'      .format(self.threads_num) \
         + 'chunk_size = {}\n'       .format(self.chunk_size) \
         + 'blast_task = {}\n'       .format(self.blast_task) \
+        + 'cascade_task = {}\n'     .format(self.cascade_task) \
         + 'fixed_crop_len = {}\n'   .format(self.fixed_crop_len) \
         + 'primer_ext_len = {}\n'   .format(self.primer_ext_len) \
-        + 'use_index = {}\n'        .format(self.use_index)
+        + 'use_index = {}\n'        .format(self.use_index) \
+        + 'aligner = {}\n'          .format(self.aligner) \
+        + 'db_cache_dirpath = `{}`\n'.format(self.db_cache_dirpath) \
+        + 'dedup_window = {}\n'     .format(self.dedup_window) \
+        + 'alignment_memo_fpath = `{}`\n'.format(self.alignment_memo_fpath) \
+        + 'save_alignments_fpath = `{}`\n'.format(self.save_alignments_fpath) \
+        + 'reclassify_fpath = `{}`\n'.format(self.reclassify_fpath) \
+        + 'alignments_fpath = `{}`\n'.format(self.alignments_fpath) \
+        + 'primer_fast_path = {}\n'.format(self.primer_fast_path) \
+        + 'prefilter_min_kmers = {}\n'.format(self.prefilter_min_kmers) \
+        + 'write_discarded = {}\n'.format(self.write_discarded) \
+        + 'count_reads = {}\n'.format(self.count_reads) \
+        + 'merge_mates = {}\n'.format(self.merge_mates)
         return repr_str
     # end def
 
@@ -73,8 +126,17 @@ class KromsatelArgs:
         KromsatelModes.IlluminaPE
         KromsatelModes.Nanopore
         KromsatelModes.IlluminaSE
-        if self.kromsatel_mode == KromsatelModes.IlluminaSE:
+        if not self.samples is None:
+            args_str += '- Sample sheet: `{}` ({} samples);\n' \
+                .format(self.samples_fpath, len(self.samples))
+        elif not self.watch_dirpath is None:
+            args_str += '- Watch directory for long reads: `{}`' \
+                ' (clean files unchanged for {} s, stop after {} s without new files);\n' \
+                    .format(self.watch_dirpath, self.watch_settle_time, self.watch_timeout)
+        elif self.kromsatel_mode == KromsatelModes.IlluminaSE:
             args_str += '- Reads: `{}`;\n'.format(self.frw_read_fpath)
+        elif self.kromsatel_mode == KromsatelModes.IlluminaPE and self.interleaved:
+            args_str += '- Interleaved paired-end reads: `{}`;\n'.format(self.frw_read_fpath)
         elif self.kromsatel_mode == KromsatelModes.IlluminaPE:
             args_str += '- Forward reads: `{}`;\n'.format(self.frw_read_fpath)
             args_str += '- Reverse reads: `{}`;\n'.format(self.rvr_read_fpath)
@@ -89,16 +151,61 @@ class KromsatelArgs:
         # end if
 
         args_str += '- Primers: `{}`;\n'             .format(self.primers_fpath) \
-                 + '- Reference: `{}`;\n'            .format(self.reference_fpath) \
-                 + '- Output directory: `{}`;\n'     .format(self.outdir_path) \
-                 + '- Split output: {};\n'           .format(self.split_output) \
+                 + '- Reference: `{}`;\n'            .format(self.reference_fpath)
+        if self.uses_outdir():
+            args_str += '- Output directory: `{}`;\n'.format(self.outdir_path)
+        # end if
+        args_str += '- Split output: {};\n'           .format(self.split_output) \
                  + '- Min output len: {} bp;\n'      .format(self.min_len) \
                  + '- Threads: {};\n'                .format(self.threads_num) \
                  + '- Chunk size: {} reads;\n'       .format(self.chunk_size) \
                  + '- BLAST task: "{}";\n'           .format(self.blast_task) \
                  + '- Crop length: {};\n'            .format(str_fixed_crop_len) \
                  + '- 5\'-primer extention: {} bp;\n'.format(self.primer_ext_len) \
-                 + '- Use BLAST index: {};'          .format(self.use_index)
+                 + '- Use BLAST index: {};\n'        .format(self.use_index) \
+                 + '- Aligner: "{}";\n'              .format(self.aligner) \
+                 + '- Deduplication window: {} sequences;\n'.format(self.dedup_window) \
+                 + '- Exact primer fast path: {};'   .format(self.primer_fast_path)
+        if self.stdout_output:
+            args_str += '\n- Write cleaned reads to stdout: True;'
+        else:
+            args_str += '\n- Output compression: level {}, {} thread(s){};' \
+                .format(
+                    self.compression_level,
+                    self.compression_threads,
+                    ', BGZF' if self.bgzf else ''
+                )
+        # end if
+        if self.ordered_output:
+            args_str += '\n- Output reads in input order: True;'
+        # end if
+        if self.merge_mates:
+            args_str += '\n- Merge overlapping mates: True;'
+        # end if
+        if not self.cascade_task is None:
+            args_str += '\n- Cascade BLAST task for unaligned reads: "{}";' \
+                .format(self.cascade_task)
+        # end if
+        if self.prefilter_min_kmers > 0:
+            args_str += '\n- K-mer prefilter: at least {} shared k-mers;' \
+                .format(self.prefilter_min_kmers)
+            args_str += '\n- Write discarded reads: {};'.format(self.write_discarded)
+        # end if
+        if not self.db_cache_dirpath is None:
+            args_str += '\n- Database cache directory: `{}`;'.format(self.db_cache_dirpath)
+        # end if
+        if not self.alignment_memo_fpath is None:
+            args_str += '\n- Alignment memo: `{}`;'.format(self.alignment_memo_fpath)
+        # end if
+        if not self.save_alignments_fpath is None:
+            args_str += '\n- Save alignments to: `{}`;'.format(self.save_alignments_fpath)
+        # end if
+        if not self.reclassify_fpath is None:
+            args_str += '\n- Reclassify using alignments from: `{}`;'.format(self.reclassify_fpath)
+        # end if
+        if not self.alignments_fpath is None:
+            args_str += '\n- Precomputed alignments: `{}`;'.format(self.alignments_fpath)
+        # end if
         return args_str
     # end def
 
@@ -110,6 +217,28 @@ class KromsatelArgs:
         self.db_fpath = df_fpath
     # end def
 
+    def get_sample_args(self, sample):
+        # Arguments of a single sample of a batch:
+        #   output files of a sample are written to its own subdirectory
+        sample_args = copy.copy(self)
+        sample_args.samples_fpath = None
+        sample_args.samples = None
+        sample_args.kromsatel_mode = sample.kromsatel_mode
+        sample_args.frw_read_fpath = sample.frw_read_fpath
+        sample_args.rvr_read_fpath = sample.rvr_read_fpath
+        sample_args.long_read_fpath = sample.long_read_fpath
+        sample_args.interleaved = False
+        sample_args.outdir_path = os.path.join(self.outdir_path, sample.name)
+        return sample_args
+    # end def
+
+    def uses_outdir(self):
+        # When cleaned reads are written to stdout, only discarded reads
+        #   are written to the output directory
+        return not self.stdout_output \
+            or (self.write_discarded and self.prefilter_min_kmers > 0)
+    # end def
+
     def _check_actual_arguments(self):
         argument_checker = KromsatelArgumentChecker(self.argparse_args)
         argument_checker.check_arguments()
@@ -121,20 +250,58 @@ class KromsatelArgs:
         self._set_reference_fpath()
         self._set_outdpath()
         self._set_split_output()
+        self._set_stdout_output()
+        self._set_compression_level()
+        self._set_compression_threads()
+        self._set_bgzf()
+        self._set_ordered_output()
         self._set_min_len()
         self._set_chunk_size()
         self._set_threads_num()
         self._set_blast_task()
+        self._set_cascade_task()
         self._set_fixed_crop_len()
         self._set_primer_ext_len()
         self._set_use_index()
+        self._set_aligner()
+        self._set_db_cache_dirpath()
+        self._set_dedup_window()
+        self._set_alignment_memo_fpath()
+        self._set_save_alignments_fpath()
+        self._set_reclassify_fpath()
+        self._set_alignments_fpath()
+        self._set_primer_fast_path()
+        self._set_prefilter_min_kmers()
+        self._set_write_discarded()
+        self._set_count_reads()
+        self._set_merge_mates()
     # end def
 
     def _set_reads_fpaths(self):
+        if not self.argparse_args.samples is None:
+            # Mode is detected for each sample separately
+            self.samples_fpath = os.path.abspath(self.argparse_args.samples)
+            self.samples = src.sample_sheet.parse_sample_sheet(self.samples_fpath)
+            return
+        # end if
+
+        if not self.argparse_args.watch is None:
+            self.kromsatel_mode = KromsatelModes.Nanopore
+            self.watch_dirpath = self.argparse_args.watch
+            if not self.argparse_args.watch_timeout is None:
+                self.watch_timeout = int(self.argparse_args.watch_timeout)
+            # end if
+            if not self.argparse_args.watch_settle_time is None:
+                self.watch_settle_time = int(self.argparse_args.watch_settle_time)
+            # end if
+            return
+        # end if
+
         self.kromsatel_mode = _detect_kromsatel_mode(self.argparse_args)
         if self.kromsatel_mode == KromsatelModes.IlluminaPE:
             self.frw_read_fpath = self.argparse_args.reads_R1
             self.rvr_read_fpath = self.argparse_args.reads_R2
+            self.interleaved = self.argparse_args.interleaved
         elif self.kromsatel_mode == KromsatelModes.Nanopore:
             self.long_read_fpath = self.argparse_args.reads_long
         elif self.kromsatel_mode == KromsatelModes.IlluminaSE:
@@ -154,7 +321,21 @@ class KromsatelArgs:
         if not self.argparse_args.outdir is None:
             self.outdir_path = self.argparse_args.outdir
         # end if
-        self._create_tmp_directory()
+        if self.argparse_args.stdout:
+            # The output directory is not created unless discarded reads are written to it
+            self._create_system_tmp_directory()
+        else:
+            self._create_tmp_directory()
+        # end if
+    # end def
+
+    def _create_system_tmp_directory(self):
+        try:
+            self.tmp_dir_path = tempfile.mkdtemp(prefix='kromsatel_')
+        except OSError as err:
+            error_msg = '\nError: cannot create temporary directory:\n  {}'.format(err)
+            raise FatalError(error_msg)
+        # end try
     # end def
 
     def _create_tmp_directory(self):
@@ -177,6 +358,30 @@ class KromsatelArgs:
          self.split_output = self.argparse_args.split_output
     # end def
 
+    def _set_stdout_output(self):
+        self.stdout_output = self.argparse_args.stdout
+    # end def
+
+    def _set_compression_level(self):
+        if not self.argparse_args.compression_level is None:
+            self.compression_level = int(self.argparse_args.compression_level)
+        # end if
+    # end def
+
+    def _set_compression_threads(self):
+        if not self.argparse_args.compression_threads is None:
+            self.compression_threads = int(self.argparse_args.compression_threads)
+        # end if
+    # end def
+
+    def _set_bgzf(self):
+        self.bgzf = self.argparse_args.bgzf
+    # end def
+
+    def _set_ordered_output(self):
+        self.ordered_output = self.argparse_args.ordered_output
+    # end def
+
     def _set_min_len(self):
         if not self.argparse_args.min_len is None:
             min_len_string = self.argparse_args.min_len
@@ -203,6 +408,12 @@ class KromsatelArgs:
         # end if
     # end def
 
+    def _set_cascade_task(self):
+        if not self.argparse_args.cascade_task is None:
+            self.cascade_task = self.argparse_args.cascade_task
+        # end if
+    # end def
+
     def _set_fixed_crop_len(self):
         if not self.argparse_args.crop_len is None:
             if self.argparse_args.crop_len == 'auto':
@@ -240,6 +451,70 @@ class KromsatelArgs:
             # end if
         # end if
     # end def
+
+    def _set_aligner(self):
+        if not self.argparse_args.aligner is None:
+            self.aligner = self.argparse_args.aligner
+        # end if
+    # end def
+
+    def _set_db_cache_dirpath(self):
+        if not self.argparse_args.db_cache is None:
+            self.db_cache_dirpath = os.path.abspath(self.argparse_args.db_cache)
+        # end if
+    # end def
+
+    def _set_dedup_window(self):
+        if not self.argparse_args.dedup_window is None:
+            self.dedup_window = int(self.argparse_args.dedup_window)
+        # end if
+    # end def
+
+    def _set_alignment_memo_fpath(self):
+        if not self.argparse_args.alignment_memo is None:
+            self.alignment_memo_fpath = os.path.abspath(self.argparse_args.alignment_memo)
+        # end if
+    # end def
+
+    def _set_save_alignments_fpath(self):
+        if not self.argparse_args.save_alignments is None:
+            self.save_alignments_fpath = os.path.abspath(self.argparse_args.save_alignments)
+        # end if
+    # end def
+
+    def _set_reclassify_fpath(self):
+        if not self.argparse_args.reclassify is None:
+            self.reclassify_fpath = os.path.abspath(self.argparse_args.reclassify)
+        # end if
+    # end def
+
+    def _set_alignments_fpath(self):
+        if not self.argparse_args.alignments is None:
+            self.alignments_fpath = os.path.abspath(self.argparse_args.alignments)
+        # end if
+    # end def
+
+    def _set_primer_fast_path(self):
+        self.primer_fast_path = not self.argparse_args.no_primer_fast_path
+    # end def
+
+    def _set_prefilter_min_kmers(self):
+        if not self.argparse_args.prefilter_min_kmers is None:
+            self.prefilter_min_kmers = int(self.argparse_args.prefilter_min_kmers)
+        # end if
+    # end def
+
+    def _set_write_discarded(self):
+        self.write_discarded = self.argparse_args.write_discarded
+    # end def
+
+    def _set_count_reads(self):
+        self.count_reads = self.argparse_args.count_reads
+    # end def
+
+    def _set_merge_mates(self):
+        self.merge_mates = self.argparse_args.merge_mates
+    # end def
 # end class
 
 
@@ -256,13 +531,26 @@ class KromsatelArgumentChecker:
         self._check_primers_fpath()
         self._check_reference_fpath()
         self._check_outdpath()
+        self._check_stdout_output()
+        self._check_compression()
         self._check_min_len()
         self._check_threads_num()
         self._check_chunk_size()
         self._check_blast_task()
+        self._check_cascade_task()
         self._check_fixed_crop_len()
         self._check_primer_ext_len()
         self._check_use_index()
+        self._check_aligner()
+        self._check_db_cache_dirpath()
+        self._check_dedup_window()
+        self._check_alignment_memo_fpath()
+        self._check_save_alignments_fpath()
+        self._check_reclassify_fpath()
+        self._check_alignments_fpath()
+        self._check_prefilter_min_kmers()
+        self._check_count_reads()
+        self._check_merge_mates()
     # end def
 
     def _check_mandatory_args(self):
@@ -285,12 +573,37 @@ class KromsatelArgumentChecker:
     # end def
 
     def _check_reads_fpaths(self):
+        if not self.argparse_args.samples is None:
+            self._check_samples_fpath()
+            return
+        # end if
+
+        if not self.argparse_args.watch is None:
+            self._check_watch_dirpath()
+            return
+        # end if
+        if not self.argparse_args.watch_timeout is None:
+            error_msg = '\nError: option `--watch-timeout` requires option `--watch`'
+            raise FatalError(error_msg)
+        # end if
+        if not self.argparse_args.watch_settle_time is None:
+            error_msg = '\nError: option `--watch-settle-time` requires option `--watch`'
+            raise FatalError(error_msg)
+        # end if
+
         try:
             _check_file_type_combination(self.argparse_args)
         except _InvalidFileCombinationError as err:
             raise FatalError(str(err))
         # end try
 
+        if self.argparse_args.interleaved \
+           and _create_read_pass_string(self.argparse_args) != 'Frl':
+            error_msg = '\nError: option `--interleaved` requires a single file' \
+                ' of paired-end reads passed with `-1/--reads-R1`'
+            raise FatalError(error_msg)
+        # end if
+
         kromsatel_mode = _detect_kromsatel_mode(self.argparse_args)
         try:
             self._reads_files_exist(kromsatel_mode)
@@ -313,7 +626,11 @@ class KromsatelArgumentChecker:
 
         file_paths_to_check_existance = None
 
-        if kromsatel_mode == KromsatelModes.IlluminaPE:
+        if kromsatel_mode == KromsatelModes.IlluminaPE and self.argparse_args.interleaved:
+            file_paths_to_check_existance = (
+                self.argparse_args.reads_R1,
+            )
+        elif kromsatel_mode == KromsatelModes.IlluminaPE:
             file_paths_to_check_existance = (
                 self.argparse_args.reads_R1,
                 self.argparse_args.reads_R2,
@@ -331,6 +648,9 @@ class KromsatelArgumentChecker:
         non_extant_file_paths = list()
 
         for file_path in file_paths_to_check_existance:
+            if file_path == fs.STDIN_FPATH:
+                continue
+            # end if
             if not os.path.exists(file_path):
                 non_extant_file_paths.append(file_path)
             # end if
@@ -345,6 +665,94 @@ class KromsatelArgumentChecker:
         # end if
     # end def
 
+    def _check_samples_fpath(self):
+        reads_passed = not self.argparse_args.reads_R1   is None \
+                    or not self.argparse_args.reads_R2   is None \
+                    or not self.argparse_args.reads_long is None
+        if reads_passed or self.argparse_args.interleaved \
+           or not self.argparse_args.watch is None:
+            error_msg = '\nError: option `--samples` cannot be used together' \
+                ' with options `-1`, `-2`, `-l`, `--interleaved` and `--watch`'
+            raise FatalError(error_msg)
+        # end if
+
+        incompatible_options = (
+            (self.argparse_args.stdout,                      '--stdout'),
+            (self.argparse_args.count_reads,                 '--count-reads'),
+            (not self.argparse_args.save_alignments is None, '--save-alignments'),
+            (not self.argparse_args.reclassify is None,      '--reclassify'),
+            (not self.argparse_args.alignments is None,      '--alignments'),
+        )
+        for option_passed, option_name in incompatible_options:
+            if option_passed:
+                error_msg = '\nError: options `--samples` and `{}`' \
+                    ' cannot be used together'.format(option_name)
+                raise FatalError(error_msg)
+            # end if
+        # end for
+
+        if not os.path.exists(self.argparse_args.samples):
+            error_msg = '\nError: file `{}` does not exist' \
+                .format(self.argparse_args.samples)
+            raise FatalError(error_msg)
+        # end if
+
+        src.sample_sheet.parse_sample_sheet(self.argparse_args.samples)
+    # end def
+
+    def _check_watch_dirpath(self):
+        reads_passed = not self.argparse_args.reads_R1   is None \
+                    or not self.argparse_args.reads_R2   is None \
+                    or not self.argparse_args.reads_long is None
+        if reads_passed or self.argparse_args.interleaved:
+            error_msg = '\nError: option `--watch` cannot be used together' \
+                ' with options `-1`, `-2`, `-l` and `--interleaved`'
+            raise FatalError(error_msg)
+        # end if
+
+        incompatible_options = (
+            (self.argparse_args.count_reads,                 '--count-reads'),
+            (not self.argparse_args.save_alignments is None, '--save-alignments'),
+            (not self.argparse_args.reclassify is None,      '--reclassify'),
+            (not self.argparse_args.alignments is None,      '--alignments'),
+        )
+        for option_passed, option_name in incompatible_options:
+            if option_passed:
+                error_msg = '\nError: options `--watch` and `{}`' \
+                    ' cannot be used together'.format(option_name)
+                raise FatalError(error_msg)
+            # end if
+        # end for
+
+        if not os.path.isdir(self.argparse_args.watch):
+            error_msg = '\nError: directory `{}` does not exist' \
+                .format(self.argparse_args.watch)
+            raise FatalError(error_msg)
+        # end if
+
+        if not self.argparse_args.watch_timeout is None:
+            watch_timeout_string = self.argparse_args.watch_timeout
+            try:
+                _check_int_string_gt0(watch_timeout_string)
+            except _AtoiGreaterThanZeroError as err:
+                error_msg = '\nError: invalid watch timeout: `{}`\n {}' \
+                    .format(watch_timeout_string, err)
+                raise FatalError(error_msg)
+            # end try
+        # end if
+
+        if not self.argparse_args.watch_settle_time is None:
+            settle_time_string = self.argparse_args.watch_settle_time
+            try:
+                _check_int_string_gt0(settle_time_string)
+            except _AtoiGreaterThanZeroError as err:
+                error_msg = '\nError: invalid watch settle time: `{}`\n {}' \
+                    .format(settle_time_string, err)
+                raise FatalError(error_msg)
+            # end try
+        # end if
+    # end def
+
     def _check_primers_fpath(self):
         if not os.path.exists(self.argparse_args.primers):
             error_msg = '\nError: file `{}` does not exist' \
@@ -362,7 +770,8 @@ class KromsatelArgumentChecker:
     # end def
 
     def _check_outdpath(self):
-        if self.argparse_args.outdir is None:
+        # With `--stdout`, the directory is created only if something is written to it
+        if self.argparse_args.outdir is None or self.argparse_args.stdout:
             return
         # end if
         try:
@@ -374,6 +783,59 @@ class KromsatelArgumentChecker:
         # end if
     # end def
 
+    def _check_stdout_output(self):
+        if not self.argparse_args.stdout:
+            return
+        # end if
+
+        if self.argparse_args.split_output:
+            error_msg = '\nError: options `--stdout` and `-s/--split-output`' \
+                ' cannot be used together'
+            raise FatalError(error_msg)
+        # end if
+    # end def
+
+    def _check_compression(self):
+        if not self.argparse_args.compression_level is None:
+            compression_level_string = self.argparse_args.compression_level
+            try:
+                compression_level = int(compression_level_string)
+            except ValueError:
+                compression_level = None
+            # end try
+            if not compression_level in range(1, 10):
+                error_msg = '\nError: invalid compression level: `{}`\n' \
+                    ' This value must be integer from 1 to 9' \
+                        .format(compression_level_string)
+                raise FatalError(error_msg)
+            # end if
+        # end if
+
+        if not self.argparse_args.compression_threads is None:
+            compression_threads_string = self.argparse_args.compression_threads
+            try:
+                _check_int_string_gt0(compression_threads_string)
+            except _AtoiGreaterThanZeroError as err:
+                error_msg = '\nError: invalid number of compression threads: `{}`\n {}' \
+                    .format(compression_threads_string, err)
+                raise FatalError(error_msg)
+            # end try
+        # end if
+
+        compression_options = (
+            (not self.argparse_args.compression_level is None,   '--compression-level'),
+            (not self.argparse_args.compression_threads is None, '--compression-threads'),
+            (self.argparse_args.bgzf,                            '--bgzf'),
+        )
+        for option_passed, option_name in compression_options:
+            if option_passed and self.argparse_args.stdout:
+                error_msg = '\nError: options `--stdout` and `{}` cannot be used together:' \
+                    ' output to standard output is not compressed'.format(option_name)
+                raise FatalError(error_msg)
+            # end if
+        # end for
+    # end def
+
     def _check_min_len(self):
         if self.argparse_args.min_len is None:
             return
@@ -429,6 +891,30 @@ class KromsatelArgumentChecker:
         # end if
     # end def
 
+    def _check_cascade_task(self):
+        if self.argparse_args.cascade_task is None:
+            return
+        # end if
+        cascade_task_argument = self.argparse_args.cascade_task
+        if not cascade_task_argument in src.blast.BLAST_TASKS:
+            error_msg = '\nError: invalid name of a cascade blast task: `{}`.' \
+                'Allowed values: {}' \
+                .format(cascade_task_argument, ', '.join(src.blast.BLAST_TASKS))
+            raise FatalError(error_msg)
+        # end if
+
+        blast_task = self.argparse_args.blast_task
+        if blast_task is None:
+            blast_task = src.blast.BLAST_TASKS[0]
+        # end if
+        aligner = self.argparse_args.aligner
+        if (aligner is None or aligner == 'blast') and cascade_task_argument == blast_task:
+            error_msg = '\nError: cascade blast task `{}` is the same as the main one.' \
+                .format(cascade_task_argument)
+            raise FatalError(error_msg)
+        # end if
+    # end def
+
     def _check_fixed_crop_len(self):
         if self.argparse_args.crop_len is None:
             return
@@ -489,6 +975,159 @@ class KromsatelArgumentChecker:
             raise FatalError(error_msg)
         # end if
     # end def
+
+    def _check_aligner(self):
+        if self.argparse_args.aligner is None:
+            return
+        # end if
+        aligner_argument = self.argparse_args.aligner
+        if not aligner_argument in src.aligners.ALIGNERS:
+            error_msg = '\nError: invalid aligner: `{}`. ' \
+                'Allowed values: {}' \
+                .format(aligner_argument, ', '.join(src.aligners.ALIGNERS))
+            raise FatalError(error_msg)
+        # end if
+    # end def
+
+    def _check_db_cache_dirpath(self):
+        if self.argparse_args.db_cache is None:
+            return
+        # end if
+        try:
+            fs.create_dir(self.argparse_args.db_cache)
+        except FatalError as err:
+            error_msg = '\nError: cannot create database cache directory `{}`:\n {}' \
+                .format(self.argparse_args.db_cache, err)
+            raise FatalError(error_msg)
+        # end try
+    # end def
+
+    def _check_dedup_window(self):
+        if self.argparse_args.dedup_window is None:
+            return
+        # end if
+        dedup_window_string = self.argparse_args.dedup_window
+        try:
+            _check_int_string_ge0(dedup_window_string)
+        except _AtoiGreaterOrEqualToZeroError as err:
+            error_msg = '\nError: invalid size of deduplication window: `{}`\n  {}' \
+                .format(dedup_window_string, err)
+            raise FatalError(error_msg)
+        # end try
+    # end def
+
+    def _check_alignment_memo_fpath(self):
+        if self.argparse_args.alignment_memo is None:
+            return
+        # end if
+        memo_dirpath = os.path.dirname(
+            os.path.abspath(self.argparse_args.alignment_memo)
+        )
+        if not os.path.isdir(memo_dirpath):
+            error_msg = '\nError: directory of alignment memo file `{}` does not exist' \
+                .format(self.argparse_args.alignment_memo)
+            raise FatalError(error_msg)
+        # end if
+    # end def
+
+    def _check_save_alignments_fpath(self):
+        if self.argparse_args.save_alignments is None:
+            return
+        # end if
+        if not self.argparse_args.reclassify is None:
+            error_msg = '\nError: options `--save-alignments` and `--reclassify`' \
+                ' cannot be used together'
+            raise FatalError(error_msg)
+        # end if
+    # end def
+
+    def _check_reclassify_fpath(self):
+        if self.argparse_args.reclassify is None:
+            return
+        # end if
+        if not os.path.exists(self.argparse_args.reclassify):
+            error_msg = '\nError: file `{}` does not exist' \
+                .format(self.argparse_args.reclassify)
+            raise FatalError(error_msg)
+        # end if
+    # end def
+
+    def _check_alignments_fpath(self):
+        if self.argparse_args.alignments is None:
+            return
+        # end if
+        if not self.argparse_args.reclassify is None:
+            error_msg = '\nError: options `--alignments` and `--reclassify`' \
+                ' cannot be used together'
+            raise FatalError(error_msg)
+        # end if
+        if not os.path.exists(self.argparse_args.alignments):
+            error_msg = '\nError: file `{}` does not exist' \
+                .format(self.argparse_args.alignments)
+            raise FatalError(error_msg)
+        # end if
+    # end def
+
+    def _check_prefilter_min_kmers(self):
+        if self.argparse_args.prefilter_min_kmers is None:
+            return
+        # end if
+        min_kmers_string = self.argparse_args.prefilter_min_kmers
+        try:
+            _check_int_string_ge0(min_kmers_string)
+        except _AtoiGreaterOrEqualToZeroError as err:
+            error_msg = '\nError: invalid number of shared k-mers for prefilter: `{}`\n  {}' \
+                .format(min_kmers_string, err)
+            raise FatalError(error_msg)
+        # end try
+    # end def
+
+    def _check_count_reads(self):
+        if not self.argparse_args.count_reads:
+            return
+        # end if
+
+        reads_fpaths = (
+            self.argparse_args.reads_R1,
+            self.argparse_args.reads_R2,
+            self.argparse_args.reads_long,
+        )
+        if fs.STDIN_FPATH in reads_fpaths:
+            error_msg = '\nError: reads from standard input cannot be counted' \
+                ' beforehand: option `--count-reads` cannot be used'
+            raise FatalError(error_msg)
+        # end if
+    # end def
+
+    def _check_merge_mates(self):
+        if not self.argparse_args.merge_mates:
+            return
+        # end if
+
+        # In batch mode, mates are merged for paired-end samples only
+        paired_reads_passed = not self.argparse_args.reads_R2 is None \
+                              or self.argparse_args.interleaved \
+                              or not self.argparse_args.samples is None
+        if not paired_reads_passed:
+            error_msg = '\nError: option `--merge-mates` requires paired-end reads'
+            raise FatalError(error_msg)
+        # end if
+
+        # Alignments of merged fragments cannot be saved or taken from a file
+        #   as alignments of mates
+        incompatible_options = (
+            (self.argparse_args.save_alignments, '--save-alignments'),
+            (self.argparse_args.reclassify,      '--reclassify'),
+            (self.argparse_args.alignments,      '--alignments'),
+        )
+        for option_value, option_name in incompatible_options:
+            if not option_value is None:
+                error_msg = '\nError: options `--merge-mates` and `{}`' \
+                    ' cannot be used together'.format(option_name)
+                raise FatalError(error_msg)
+            # end if
+        # end for
+    # end def
 # end class
 
 
@@ -512,6 +1151,8 @@ def _detect_kromsatel_mode(argparse_args):
 
     if read_pass_string == 'FRl':
         return KromsatelModes.IlluminaPE
+    elif read_pass_string == 'Frl' and argparse_args.interleaved:
+        return KromsatelModes.IlluminaPE
     elif read_pass_string == 'frL':
         return KromsatelModes.Nanopore
     elif read_pass_string == 'Frl':
@@ -545,7 +1186,7 @@ def _check_int_string_ge0(string_value):
             raise ValueError
         # end if
     except ValueError:
-        raise _AtoiGreaterThanZeroError('This value must be integer >= 0')
+        raise _AtoiGreaterOrEqualToZeroError('This value must be integer >= 0')
     # end try
 # end def
 
@@ -0,0 +1,188 @@
+
+import src.fastq
+import src.kromsatel_core as core
+from src.printing import getwt
+from src.progress import Progress
+from src.reorder_buffer import ReorderBuffer
+from src.output_writer import OutputWriterProcess
+from src.kromsatel_modes import KromsatelModes
+
+
+_CORE_CLASSES = {
+    KromsatelModes.IlluminaPE: core.IlluminaPEKromsatelCore,
+    KromsatelModes.IlluminaSE: core.IlluminaSEKromsatelCore,
+    KromsatelModes.Nanopore:   core.LongReadKromsatelCore,
+}
+
+
+class BatchKromsatelCore:
+    # Cleans reads of a batch of samples in a single pool of workers.
+    # Samples of the same mode share the primer scheme, the aligner and the prefilter.
+    # Chunks of several samples are sent to the pool in turn, so that a sample
+    #   with little reads does not leave workers idle. Reads of a sample are read
+    #   only while the sample is active, which bounds number of input files open at once.
+
+    def __init__(self, kromsatel_args):
+        self.kromsatel_args = kromsatel_args
+        self.threads_num = kromsatel_args.threads_num
+        self.samples = kromsatel_args.samples
+
+        # All cores are created in the main process before the pool is started,
+        #   and worker processes inherit them
+        self.cores = list()
+        shared_cores = dict()
+        for sample in self.samples:
+            sample_args = kromsatel_args.get_sample_args(sample)
+            sample_core = _CORE_CLASSES[sample.kromsatel_mode](
+                sample_args,
+                shared_cores.get(sample.kromsatel_mode)
+            )
+            shared_cores.setdefault(sample.kromsatel_mode, sample_core)
+            self.cores.append(sample_core)
+        # end for
+
+        self.max_active_samples = max(1, self.threads_num)
+
+        self.progress = Progress(
+            sum(sample_core.get_input_size() for sample_core in self.cores)
+        )
+        self.num_done_reads = [0] * len(self.samples)
+        self.num_done_bytes = [0] * len(self.samples)
+
+        self.reorder_buffer = None
+        if kromsatel_args.ordered_output:
+            self.reorder_buffer = ReorderBuffer()
+        # end if
+    # end def
+
+    def run(self):
+
+        self.progress.print_status_bar()
+
+        self._clean_chunks()
+
+        self.progress.print_status_bar()
+        print()
+
+        self._print_samples_summary()
+        # Counters of the run summary are common for all samples
+        self.cores[0].print_run_summary()
+        if not self.reorder_buffer is None:
+            print('{} - {}'.format(getwt(), self.reorder_buffer.get_stall_summary()))
+        # end if
+    # end def
+
+    def _clean_chunks(self):
+        # Task: (<SAMPLE_NUM>, <TASK_OF_THE_SAMPLE>)
+        # Result: (<SAMPLE_NUM>, <RESULT_OF_THE_SAMPLE>)
+        clean_chunk_funcs = [
+            sample_core.get_input_spec()[0] for sample_core in self.cores
+        ]
+
+        # Output of all samples is written by a single writer
+        output_writer = OutputWriterProcess(self.kromsatel_args)
+        for sample_core in self.cores:
+            sample_core.output_writer = output_writer
+        # end for
+
+        # Readers are started before the pool and passed from a sample
+        #   to the next one: enough of them for all active samples
+        num_readers = min(self.max_active_samples, len(self.cores)) \
+            * max(sample_core.get_num_readers() for sample_core in self.cores)
+        readers = [src.fastq.FastqReaderProcess() for _ in range(num_readers)]
+
+        results = core.clean_tasks_in_pool(
+            self.threads_num,
+            BatchChunkCleaner(clean_chunk_funcs),
+            self._make_tasks(list(readers)),
+            self.reorder_buffer
+        )
+
+        try:
+            for sample_num, (num_reads, input_num_bytes, chunk_output) in results:
+                if not chunk_output is None:
+                    output_writer.write(chunk_output)
+                # end if
+                self._update_progress(sample_num, num_reads, input_num_bytes)
+            # end for
+        except BaseException:
+            # Workers are terminated before the writer
+            results.close()
+            output_writer.stop()
+            raise
+        finally:
+            # The pool is terminated before readers are stopped
+            results.close()
+            for reader in readers:
+                reader.stop()
+            # end for
+        # end try
+
+        output_writer.close()
+    # end def
+
+    def _make_tasks(self, free_readers):
+        # Takes a task from each active sample in turn. Once a sample is over,
+        #   the next one becomes active and takes over its readers.
+        next_sample_num = 0
+        active_samples = list()
+
+        while next_sample_num < len(self.cores) or len(active_samples) != 0:
+
+            while len(active_samples) < self.max_active_samples \
+                  and next_sample_num < len(self.cores):
+                sample_core = self.cores[next_sample_num]
+                readers = [free_readers.pop() for _ in range(sample_core.get_num_readers())]
+                sample_tasks = sample_core.make_tasks(
+                    sample_core.iter_input_chunks(readers)
+                )
+                active_samples.append((next_sample_num, sample_tasks, readers))
+                next_sample_num += 1
+            # end while
+
+            still_active_samples = list()
+            for sample_num, sample_tasks, readers in active_samples:
+                task = next(sample_tasks, None)
+                if task is None:
+                    free_readers.extend(readers)
+                    continue
+                # end if
+                still_active_samples.append((sample_num, sample_tasks, readers))
+                yield sample_num, task
+            # end for
+            active_samples = still_active_samples
+        # end while
+    # end def
+
+    def _update_progress(self, sample_num, increment, input_num_bytes):
+        # Bytes are counted for each sample, since samples are read simultaneously
+        self.num_done_reads[sample_num] += increment
+        self.num_done_bytes[sample_num] = max(
+            self.num_done_bytes[sample_num],
+            input_num_bytes
+        )
+        self.progress.increment_done(increment, sum(self.num_done_bytes))
+        self.progress.print_status_bar()
+    # end def
+
+    def _print_samples_summary(self):
+        print('{} - Reads processed:'.format(getwt()))
+        for sample, num_reads in zip(self.samples, self.num_done_reads):
+            print('  {}: {}'.format(sample.name, num_reads))
+        # end for
+    # end def
+# end class
+
+
+class BatchChunkCleaner:
+    # Dispatches a task to the cleaning function of the corresponding sample
+
+    def __init__(self, clean_chunk_funcs):
+        self.clean_chunk_funcs = clean_chunk_funcs
+    # end def
+
+    def __call__(self, task):
+        sample_num, sample_task = task
+        return sample_num, self.clean_chunk_funcs[sample_num](sample_task)
+    # end def
+# end class
@@ -1,10 +1,11 @@
 
-import gzip
 
-from src.fastq import write_fastq_record
+import src.filesystem as fs
+from src.fastq import format_fastq_record
 from src.classification_marks import MAJOR, MINOR, UNCERTAIN
 from src.output import SimpleUnpairedOutput, SimplePairedOutput, \
-                       SplitUnpairedOutput, SplitPairedOutput
+                       SplitUnpairedOutput, SplitPairedOutput, \
+                       DiscardedUnpairedOutput, DiscardedPairedOutput
 
 
 class Binner:
@@ -13,27 +14,16 @@ class Binner:
         self.min_len = min_len
     # end def
 
-    def write_binned_reads(self):
-        raise NotImplementedError
-    # end def
-
-    def write_binned_reads(self):
-
-        for outfpath, reads in zip(self.outfpaths, self.read_collections):
-            if len(reads) != 0:
-                self._append_to_outfile(reads, outfpath)
-            # end if
-        # end for
-
+    def pop_binned_output(self):
+        # Returns binned reads formatted for output files: a list of (<OUTFPATH>, <DATA>),
+        #   empty bins are omitted. Bins are cleared.
+        binned_output = [
+            (outfpath, _format_reads(reads))
+            for outfpath, reads in zip(self.outfpaths, self.read_collections)
+                if len(reads) != 0
+        ]
         self._clear()
-    # end def
-
-    def _append_to_outfile(self, reads, outfpath):
-        with gzip.open(outfpath, 'at') as outfile:
-            for read in reads:
-                write_fastq_record(read, outfile)
-            # end for
-        # end with
+        return binned_output
     # end def
 
     def _clear(self):
@@ -54,15 +44,14 @@ class SimpleUnpairedBinner(Binner):
         super().__init__(min_len)
         self.output = SimpleUnpairedOutput(outdir_path, output_prefix)
         self.output_reads = list()
-    # end def
 
-    def write_binned_reads(self):
-        self._append_to_outfile(self.output_reads, self.output.outfpath)
-        self._clear()
-    # end def
+        self.outfpaths = (
+            self.output.outfpath,
+        )
 
-    def _clear(self):
-        self.output_reads.clear()
+        self.read_collections = (
+            self.output_reads,
+        )
     # end def
 
     def add_read(self, read, classification_mark=None):
@@ -246,3 +235,119 @@ class SplitPairedBinner(Binner):
         self.uncertain_rvr_reads.append(rvr_read)
     # end def
 # end class
+
+
+class StdoutUnpairedBinner(Binner):
+    # Streams cleaned reads to standard output, uncompressed.
+
+    def __init__(self, min_len):
+        super().__init__(min_len)
+        self.output_reads = list()
+
+        self.outfpaths = (
+            fs.STDOUT_FPATH,
+        )
+
+        self.read_collections = (
+            self.output_reads,
+        )
+    # end def
+
+    def add_read(self, read, classification_mark=None):
+        if self._check_read_long_enough(read):
+            self.output_reads.append(read)
+        # end if
+    # end def
+# end class
+
+
+class StdoutPairedBinner(Binner):
+    # Streams cleaned read pairs to standard output, uncompressed and interleaved.
+    # Pairs are not broken in the output stream: if a mate of a read is too short,
+    #   the read is not written.
+
+    def __init__(self, min_len):
+        super().__init__(min_len)
+        self.output_reads = list()
+
+        self.outfpaths = (
+            fs.STDOUT_FPATH,
+        )
+
+        self.read_collections = (
+            self.output_reads,
+        )
+    # end def
+
+    def add_read_pair(self, frw_read, rvr_read, classification_mark=None):
+
+        frw_long_enough = self._check_read_long_enough(frw_read)
+        rvr_long_enough = self._check_read_long_enough(rvr_read)
+
+        if frw_long_enough and rvr_long_enough:
+            self.output_reads.append(frw_read)
+            self.output_reads.append(rvr_read)
+        # end if
+    # end def
+# end class
+
+
+class DiscardedUnpairedBinner(Binner):
+    # Collects reads discarded before alignment. They are written as is,
+    #   regardless of their length.
+
+    def __init__(self, outdir_path, output_prefix):
+
+        super().__init__(min_len=0)
+        self.output = DiscardedUnpairedOutput(outdir_path, output_prefix)
+
+        self.discarded_reads = list()
+
+        self.outfpaths = (
+            self.output.outfpath,
+        )
+
+        self.read_collections = (
+            self.discarded_reads,
+        )
+    # end def
+
+    def add_read(self, read):
+        self.discarded_reads.append(read)
+    # end def
+# end class
+
+
+class DiscardedPairedBinner(Binner):
+    # Collects read pairs discarded before alignment. They are written as is,
+    #   regardless of their length.
+
+    def __init__(self, outdir_path, output_prefix):
+
+        super().__init__(min_len=0)
+        self.output = DiscardedPairedOutput(outdir_path, output_prefix)
+
+        self.discarded_frw_reads = list()
+        self.discarded_rvr_reads = list()
+
+        self.outfpaths = (
+            self.output.frw_outfpath,
+            self.output.rvr_outfpath,
+        )
+
+        self.read_collections = (
+            self.discarded_frw_reads,
+            self.discarded_rvr_reads,
+        )
+    # end def
+
+    def add_read_pair(self, frw_read, rvr_read):
+        self.discarded_frw_reads.append(frw_read)
+        self.discarded_rvr_reads.append(rvr_read)
+    # end def
+# end class
+
+
+def _format_reads(reads):
+    return ''.join(map(format_fastq_record, reads)).encode('utf-8')
+# end def
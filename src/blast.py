@@ -1,13 +1,15 @@
 
 import os
-import json
+import hashlib
+import threading
 import subprocess as sp
 
-import src.fastq
+import src.db_cache
 import src.filesystem as fs
 from src.printing import getwt
 from src.fatal_errors import FatalError
 from src.kromsatel_modes import KromsatelModes
+from src.alignment import parse_blast_tabular, make_query_id, TABULAR_COLUMNS
 
 
 BLAST_TASKS = (
@@ -23,6 +25,10 @@ TASKS_SUPPORT_INDEXED_SEARCH = {
 }
 
 
+# Tabular output: only the columns required by `src.alignment.Alignment`
+TABULAR_OUTFMT = '6 {}'.format(' '.join(TABULAR_COLUMNS))
+
+
 def get_blastplus_dependencies(krosatel_args):
 
     dependencies = [
@@ -86,25 +92,87 @@ def _configure_makembindex_cmd(db_fpath):
 # end def
 
 
+DATABASE_NAME = 'kromsatel_blast_database'
+
+
 def create_reference_database(kromsatel_args):
 
-    db_dirpath = os.path.join(kromsatel_args.outdir_path, 'blast_database')
-    fs.create_dir(db_dirpath)
-    db_fpath = os.path.join(db_dirpath, 'kromsatel_blast_database')
+    if kromsatel_args.db_cache_dirpath is None:
+        if kromsatel_args.uses_outdir():
+            db_dirpath = os.path.join(kromsatel_args.outdir_path, 'blast_database')
+        else:
+            db_dirpath = os.path.join(kromsatel_args.tmp_dir_path, 'blast_database')
+        # end if
+        fs.create_dir(db_dirpath)
+        db_fpath = os.path.join(db_dirpath, DATABASE_NAME)
+        _build_reference_database(
+            kromsatel_args.reference_fpath,
+            db_fpath,
+            kromsatel_args.use_index
+        )
+    else:
+        db_fpath = _get_cached_reference_database(kromsatel_args)
+    # end if
+
+    return db_fpath
+# end def
+
+
+def _get_cached_reference_database(kromsatel_args):
+
+    cache_key = _make_database_cache_key(
+        kromsatel_args.reference_fpath,
+        kromsatel_args.use_index
+    )
+
+    def build_entry(entry_dirpath):
+        _build_reference_database(
+            kromsatel_args.reference_fpath,
+            os.path.join(entry_dirpath, DATABASE_NAME),
+            kromsatel_args.use_index
+        )
+    # end def
+
+    print('{} - Looking up the reference database in cache directory\n  `{}`...' \
+        .format(getwt(), kromsatel_args.db_cache_dirpath))
+    entry_dirpath = src.db_cache.get_or_build_entry(
+        kromsatel_args.db_cache_dirpath,
+        cache_key,
+        build_entry
+    )
+    db_fpath = os.path.join(entry_dirpath, DATABASE_NAME)
+    print('{} - Database: `{}`'.format(getwt(), db_fpath))
+
+    return db_fpath
+# end def
+
+
+def _make_database_cache_key(reference_fpath, use_index):
+    # The key depends on the reference content and on database build options
+    build_options = '{};index={}'.format(
+        _configure_makeblastdb_cmd('', ''),
+        use_index
+    )
+    return '{}_{}'.format(
+        fs.hash_file(reference_fpath),
+        hashlib.sha256(build_options.encode('utf-8')).hexdigest()[:16]
+    )
+# end def
+
+
+def _build_reference_database(reference_fpath, db_fpath, use_index):
 
     print('{} - Creating a reference database for BLAST:\n  `{}`...'.format(getwt(), db_fpath))
-    _make_blast_db(kromsatel_args.reference_fpath, db_fpath)
+    _make_blast_db(reference_fpath, db_fpath)
     print('{} - Database: created'.format(getwt()))
 
-    if kromsatel_args.use_index:
+    if use_index:
         print('{} - Indexing the database...'.format(getwt()))
         _index_database(db_fpath)
         print('{} - Index: created'.format(getwt()))
     else:
         print('Index will not be created for the database.')
     # end if
-
-    return db_fpath
 # end def
 
 
@@ -138,112 +206,169 @@ def _index_database(db_fpath):
 # end def
 
 
-def _configure_blastn_cmd_illumina(query_fpath, db_fpath, blast_task, use_index, alignment_fpath):
+def _configure_blastn_cmd_illumina(db_fpath, blast_task, use_index):
 
-    outfmt = 15 # Single-file BLAST JSON
+    outfmt = TABULAR_OUTFMT
 
-    if use_index:
-        use_index_opt_value = 'true'
-    else:
-        use_index_opt_value = 'false'
-    # end if
-
-    blast_cmd = ' '.join(
-        [
-            'blastn',
-            '-query {}'.format(query_fpath),
-            '-db {}'.format(db_fpath),
-            '-task {}'.format(blast_task),
-            '-use_index {}'.format(use_index_opt_value),
-            '-evalue 1e-3',
-            '-gapopen 3 -gapextend 1',
-            '-max_hsps 1', '-max_target_seqs 1',
-            '-outfmt {}'.format(outfmt),
-            '> {}'.format(alignment_fpath),
-        ]
-    )
+    blast_cmd = [
+        'blastn',
+        '-query', '-', # read queries from stdin
+        '-db', db_fpath,
+        '-task', blast_task,
+        '-use_index', _format_use_index_opt_value(use_index),
+        '-evalue', '1e-3',
+        '-gapopen', '3', '-gapextend', '1',
+        '-max_hsps', '1', '-max_target_seqs', '1',
+        '-outfmt', outfmt,
+    ]
 
     return blast_cmd
 # end def
 
 
-def _configure_blastn_cmd_nanopore(query_fpath, db_fpath, blast_task, use_index, alignment_fpath):
+def _configure_blastn_cmd_nanopore(db_fpath, blast_task, use_index):
 
-    outfmt = 15 # Single-file BLAST JSON
-
-    if use_index:
-        use_index_opt_value = 'true'
-    else:
-        use_index_opt_value = 'false'
-    # end if
+    outfmt = TABULAR_OUTFMT
 
-    blast_cmd = ' '.join(
-        [
-            'blastn',
-            '-query {}'.format(query_fpath),
-            '-db {}'.format(db_fpath),
-            '-task {}'.format(blast_task),
-            '-use_index {}'.format(use_index_opt_value),
-            '-evalue 1e-3',
-            '-max_hsps 3', '-max_target_seqs 1',
-            '-outfmt {}'.format(outfmt),
-            '> {}'.format(alignment_fpath),
-        ]
-    )
+    blast_cmd = [
+        'blastn',
+        '-query', '-', # read queries from stdin
+        '-db', db_fpath,
+        '-task', blast_task,
+        '-use_index', _format_use_index_opt_value(use_index),
+        '-evalue', '1e-3',
+        '-max_hsps', '3', '-max_target_seqs', '1',
+        '-outfmt', outfmt,
+    ]
 
     return blast_cmd
 # end def
 
 
-def blast_align(reads_chunk, kromsatel_args):
+def _format_use_index_opt_value(use_index):
+    if use_index:
+        return 'true'
+    else:
+        return 'false'
+    # end if
+# end def
 
-    query_fpath = os.path.join(
-        kromsatel_args.tmp_dir_path,
-        'kromsatel_query_{}.fasta'.format(os.getpid())
-    )
 
-    src.fastq.write_fastq2fasta(reads_chunk, query_fpath)
+class BlastAligner:
+    # Aligner session of a single worker process.
+    # The blastn command is configured once, and each chunk is passed to blastn
+    #   through pipes, so that neither shell nor temporary files are involved.
 
-    alignment_fpath = os.path.join(
-        kromsatel_args.tmp_dir_path,
-        'kromsatel_alignment_{}.json'.format(os.getpid())
-    )
+    def __init__(self, kromsatel_args, blast_task=None):
+        # `blast_task` overrides the task specified by `kromsatel_args`
+        if blast_task is None:
+            blast_task = kromsatel_args.blast_task
+        # end if
+        use_index = kromsatel_args.use_index \
+                    and blast_task in TASKS_SUPPORT_INDEXED_SEARCH
+
+        if kromsatel_args.kromsatel_mode == KromsatelModes.Nanopore:
+            self.blast_cmd = _configure_blastn_cmd_nanopore(
+                kromsatel_args.db_fpath,
+                blast_task,
+                use_index
+            )
+        else:
+            self.blast_cmd = _configure_blastn_cmd_illumina(
+                kromsatel_args.db_fpath,
+                blast_task,
+                use_index
+            )
+        # end if
 
-    if kromsatel_args.kromsatel_mode == KromsatelModes.Nanopore:
-        blast_cmd = _configure_blastn_cmd_nanopore(
-            query_fpath,
-            kromsatel_args.db_fpath,
-            kromsatel_args.blast_task,
-            kromsatel_args.use_index,
-            alignment_fpath
-        )
-    else:
-        blast_cmd = _configure_blastn_cmd_illumina(
-            query_fpath,
-            kromsatel_args.db_fpath,
-            kromsatel_args.blast_task,
-            kromsatel_args.use_index,
-            alignment_fpath
+        # Aligner parameters, which affect alignments
+        self.params_key = ' '.join(
+            arg for arg in self.blast_cmd if arg != kromsatel_args.db_fpath
         )
-    # end if
+    # end def
 
-    # Launch blastn
-    pipe = sp.Popen(blast_cmd, shell=True, stderr=sp.PIPE)
-    stdout_stderr = pipe.communicate()
+    def align(self, seqs):
+        # Returns a list of alignment lists: i-th list corresponds to i-th sequence.
+        # Query identifiers are made from sequence indices by `make_query_id`.
 
-    if pipe.returncode != 0:
-        error_msg = '\nError: an error occured while performing BLAST search:' \
-            '{}'.format(stdout_stderr[1].decode('utf-8'))
-        raise FatalError(error_msg)
-    # end if
+        if len(seqs) == 0:
+            return list()
+        # end if
 
-    fs.rm_file_warn_on_error(query_fpath)
+        query = ''.join(
+            '>{}\n{}\n'.format(make_query_id(i), seq) for i, seq in enumerate(seqs)
+        ).encode('ascii')
 
-    with open(alignment_fpath, 'rt') as alignment_file:
-        aligmnents = json.load(alignment_file)
-    # end with
+        alignments = [list() for _ in seqs]
 
-    fs.rm_file_warn_on_error(alignment_fpath)
+        pipe = sp.Popen(
+            self.blast_cmd,
+            stdin=sp.PIPE,
+            stdout=sp.PIPE,
+            stderr=sp.PIPE
+        )
+
+        # Queries are fed and stderr is drained in background threads
+        #   in order to parse the results as soon as blastn emits them.
+        stderr_chunks = list()
+        feeder = threading.Thread(
+            target=_feed_query,
+            args=(pipe.stdin, query)
+        )
+        drainer = threading.Thread(
+            target=_drain_stream,
+            args=(pipe.stderr, stderr_chunks)
+        )
+        feeder.start()
+        drainer.start()
+
+        try:
+            for query_index, alignment in parse_blast_tabular(pipe.stdout):
+                alignments[query_index].append(alignment)
+            # end for
+            parsing_error = None
+        except (ValueError, IndexError) as err:
+            parsing_error = err
+            # Otherwise, blastn would block on writing the rest of its output,
+            #   and the threads would never finish
+            pipe.kill()
+        # end try
+
+        feeder.join()
+        drainer.join()
+        pipe.stdout.close()
+        pipe.wait()
+
+        if pipe.returncode != 0 or not parsing_error is None:
+            error_msg = '\nError: an error occured while performing BLAST search:' \
+                '{}'.format(b''.join(stderr_chunks).decode('utf-8'))
+            if not parsing_error is None:
+                error_msg += '\nCannot parse BLAST output: {}'.format(parsing_error)
+            # end if
+            raise FatalError(error_msg)
+        # end if
 
-    return aligmnents['BlastOutput2']
-# end def blast_align
+        return alignments
+    # end def
+# end class
+
+
+def _feed_query(stdin, query):
+    try:
+        stdin.write(query)
+    except BrokenPipeError:
+        # blastn has terminated: the error is reported by the exit code
+        pass
+    # end try
+    try:
+        stdin.close()
+    except BrokenPipeError:
+        pass
+    # end try
+# end def
+
+
+def _drain_stream(stream, collected_chunks):
+    collected_chunks.append(stream.read())
+    stream.close()
+# end def
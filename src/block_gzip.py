@@ -0,0 +1,121 @@
+
+import gzip
+import zlib
+import struct
+import collections
+import concurrent.futures
+
+
+# Uncompressed size of a block. A BGZF block must not exceed 64 KiB compressed,
+#   so its data must be a bit smaller than that, as in `bgzip`
+_GZIP_BLOCK_SIZE = 256 * 1024 # bytes
+_BGZF_BLOCK_SIZE = 0xff00 # bytes
+
+# Gzip header of a BGZF block up to the compressed size of the block:
+#   flags FEXTRA, no modification time, unknown OS, extra subfield `BC` of 2 bytes
+_BGZF_HEADER_PREFIX = b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00'
+_BGZF_HEADER_LEN = 18
+_BGZF_FOOTER_LEN = 8
+
+# Empty BGZF block terminating a BGZF file
+_BGZF_EOF = bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+
+
+class BlockCompressor:
+    # Compresses blocks of data in a pool of threads: zlib releases the GIL
+    #   while compressing, so blocks are compressed in parallel.
+    # Each block is compressed into a separate gzip member. BGZF blocks
+    #   are gzip members, headers of which contain sizes of the blocks.
+
+    def __init__(self, num_threads, compression_level, bgzf):
+        self.compression_level = compression_level
+        self.bgzf = bgzf
+        self.block_size = _BGZF_BLOCK_SIZE if bgzf else _GZIP_BLOCK_SIZE
+        # Number of blocks of a file being compressed at once
+        self.max_pending_blocks = num_threads + 1
+        self._executor = concurrent.futures.ThreadPoolExecutor(num_threads)
+    # end def
+
+    def submit(self, block):
+        # Returns a future of the compressed block
+        if self.bgzf:
+            return self._executor.submit(_compress_bgzf_block, block, self.compression_level)
+        # end if
+        return self._executor.submit(_compress_gzip_block, block, self.compression_level)
+    # end def
+
+    def shutdown(self):
+        self._executor.shutdown()
+    # end def
+# end class
+
+
+class BlockGzipFile:
+    # A file opened for appending, data written to which is split into blocks
+    #   compressed by a BlockCompressor. Compressed blocks are written in order.
+
+    def __init__(self, fpath, compressor):
+        self._file = open(fpath, 'ab')
+        self._compressor = compressor
+        self._buffer = bytearray()
+        self._pending_blocks = collections.deque()
+    # end def
+
+    def write(self, data):
+        self._buffer += data
+        block_size = self._compressor.block_size
+
+        while len(self._buffer) >= block_size:
+            self._submit_block(bytes(self._buffer[:block_size]))
+            del self._buffer[:block_size]
+        # end while
+    # end def
+
+    def flush(self):
+        if len(self._buffer) != 0:
+            self._submit_block(bytes(self._buffer))
+            self._buffer.clear()
+        # end if
+
+        while len(self._pending_blocks) != 0:
+            self._file.write(self._pending_blocks.popleft().result())
+        # end while
+        self._file.flush()
+    # end def
+
+    def close(self):
+        self.flush()
+        if self._compressor.bgzf:
+            self._file.write(_BGZF_EOF)
+        # end if
+        self._file.close()
+    # end def
+
+    def _submit_block(self, block):
+        self._pending_blocks.append(self._compressor.submit(block))
+
+        # Blocks already compressed are written right away
+        while len(self._pending_blocks) != 0 \
+              and (self._pending_blocks[0].done()
+                   or len(self._pending_blocks) > self._compressor.max_pending_blocks):
+            self._file.write(self._pending_blocks.popleft().result())
+        # end while
+    # end def
+# end class
+
+
+def _compress_gzip_block(block, compression_level):
+    return gzip.compress(block, compresslevel=compression_level, mtime=0)
+# end def
+
+
+def _compress_bgzf_block(block, compression_level):
+    compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    deflated_block = compressor.compress(block) + compressor.flush()
+
+    block_size = _BGZF_HEADER_LEN + len(deflated_block) + _BGZF_FOOTER_LEN
+    return _BGZF_HEADER_PREFIX \
+         + struct.pack('<H', block_size - 1) \
+         + deflated_block \
+         + struct.pack('<II', zlib.crc32(block), len(block))
+# end def
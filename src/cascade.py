@@ -0,0 +1,87 @@
+
+import src.synchronization as synchron
+
+
+class CascadingAligner:
+    # Aligns sequences with a cascade of aligners, from the fastest one
+    #   to the most sensitive one: each tier receives only sequences,
+    #   which have no alignments after the previous tiers.
+
+    def __init__(self, tiers):
+        self.tiers = tiers
+
+        # Aligner parameters, which affect alignments
+        self.params_key = ' | '.join(
+            aligner.params_key for aligner in self.tiers
+        )
+    # end def
+
+    def align(self, seqs):
+        # Returns a list of alignment lists: i-th list corresponds to i-th sequence.
+
+        alignment_lists = [list() for _ in seqs]
+        leftover_indices = list(range(len(seqs)))
+
+        for tier_num, aligner in enumerate(self.tiers):
+            if len(leftover_indices) == 0:
+                break
+            # end if
+
+            tier_alignment_lists = aligner.align(
+                [seqs[i] for i in leftover_indices]
+            )
+
+            next_leftover_indices = list()
+            for i, read_alignments in zip(leftover_indices, tier_alignment_lists):
+                if len(read_alignments) == 0:
+                    next_leftover_indices.append(i)
+                else:
+                    alignment_lists[i] = read_alignments
+                # end if
+            # end for
+
+            _count_tier_hits(
+                tier_num,
+                len(leftover_indices),
+                len(leftover_indices) - len(next_leftover_indices)
+            )
+            leftover_indices = next_leftover_indices
+        # end for
+
+        return alignment_lists
+    # end def
+# end class
+
+
+def _count_tier_hits(tier_num, num_seqs, num_hits):
+    if tier_num >= synchron.MAX_CASCADE_TIERS:
+        return
+    # end if
+    with synchron.cascade_tier_num_seqs.get_lock():
+        synchron.cascade_tier_num_seqs[tier_num] += num_seqs
+    # end with
+    with synchron.cascade_tier_num_hits.get_lock():
+        synchron.cascade_tier_num_hits[tier_num] += num_hits
+    # end with
+# end def
+
+
+def get_tier_hits_summary(tier_names):
+    # Per-tier numbers of sequences aligned. Identical reads within a chunk
+    #   are aligned once, therefore distinct sequences are counted.
+    if synchron.cascade_tier_num_seqs[0] == 0:
+        return None
+    # end if
+
+    summary_lines = ['Alignment cascade:']
+    for tier_num, tier_name in enumerate(tier_names[:synchron.MAX_CASCADE_TIERS]):
+        num_seqs = synchron.cascade_tier_num_seqs[tier_num]
+        num_hits = synchron.cascade_tier_num_hits[tier_num]
+        summary_lines.append(
+            '  tier {} ({}): {}/{} sequences aligned'
+                .format(tier_num+1, tier_name, num_hits, num_seqs)
+        )
+    # end for
+
+    return '\n'.join(summary_lines)
+# end def
@@ -0,0 +1,124 @@
+
+import os
+import shutil
+
+import src.filesystem as fs
+from src.printing import print_err
+from src.fatal_errors import FatalError
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (e.g. on Windows):
+    #   concurrent runs then rely on atomic renaming only.
+    fcntl = None
+# end try
+
+
+# An entry is complete only if it contains this file
+_COMPLETE_MARKER = '.kromsatel_complete'
+
+
+def get_or_build_entry(cache_dirpath, key, build_entry):
+    # Returns path to the cache entry (directory) named `key`.
+    # If the entry does not exist, it is built by calling `build_entry(dirpath)`
+    #   in a temporary directory, which is then atomically renamed.
+    # Concurrent kromsatel runs building the same entry are serialized with a lock file.
+
+    fs.create_dir(cache_dirpath)
+    entry_dirpath = os.path.join(cache_dirpath, key)
+
+    if _entry_is_complete(entry_dirpath):
+        return entry_dirpath
+    # end if
+
+    lock_fpath = os.path.join(cache_dirpath, '{}.lock'.format(key))
+
+    with _CacheLock(lock_fpath):
+        # Another run might have built the entry while we were waiting for the lock
+        if _entry_is_complete(entry_dirpath):
+            return entry_dirpath
+        # end if
+
+        tmp_dirpath = os.path.join(
+            cache_dirpath,
+            '.{}.tmp.{}'.format(key, os.getpid())
+        )
+        _rm_directory_if_exists(tmp_dirpath)
+        fs.create_dir(tmp_dirpath)
+
+        try:
+            build_entry(tmp_dirpath)
+            fs.init_file(os.path.join(tmp_dirpath, _COMPLETE_MARKER))
+            # An incomplete entry may be left by an interrupted run
+            _rm_directory_if_exists(entry_dirpath)
+            os.rename(tmp_dirpath, entry_dirpath)
+        except OSError as err:
+            _rm_directory_if_exists(tmp_dirpath)
+            if _entry_is_complete(entry_dirpath):
+                return entry_dirpath
+            # end if
+            error_msg = '\nError: cannot create cache entry `{}`:\n  {}' \
+                .format(entry_dirpath, err)
+            raise FatalError(error_msg)
+        except FatalError:
+            _rm_directory_if_exists(tmp_dirpath)
+            raise
+        # end try
+    # end with
+
+    return entry_dirpath
+# end def
+
+
+def _entry_is_complete(entry_dirpath):
+    return os.path.exists(
+        os.path.join(entry_dirpath, _COMPLETE_MARKER)
+    )
+# end def
+
+
+def _rm_directory_if_exists(dirpath):
+    if os.path.exists(dirpath):
+        shutil.rmtree(dirpath, ignore_errors=True)
+    # end if
+# end def
+
+
+class _CacheLock:
+
+    def __init__(self, lock_fpath):
+        self.lock_fpath = lock_fpath
+        self.lock_file = None
+    # end def
+
+    def __enter__(self):
+        if fcntl is None:
+            return self
+        # end if
+        try:
+            self.lock_file = open(self.lock_fpath, 'a')
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_EX)
+        except OSError as err:
+            print_err('\nWarning: cannot lock file `{}`: {}' \
+                .format(self.lock_fpath, err))
+            self._close()
+        # end try
+        return self
+    # end def
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.lock_file is None:
+            fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+            self._close()
+        # end if
+        return False
+    # end def
+
+    def _close(self):
+        if not self.lock_file is None:
+            self.lock_file.close()
+            self.lock_file = None
+        # end if
+    # end def
+# end class
@@ -0,0 +1,111 @@
+
+from collections import OrderedDict
+
+import src.process_cache
+
+
+class DeduplicatingAligner:
+    # Aligns each distinct sequence of a chunk only once and
+    #   fans the alignments out to all sequences identical to it.
+    # Optionally, alignments of recently seen distinct sequences are kept
+    #   in an LRU cache of bounded size, which spans several chunks.
+
+    def __init__(self, aligner, lru_size=0):
+        self.aligner = aligner
+        self.lru_size = lru_size
+    # end def
+
+    def align(self, seqs):
+
+        lru_cache = self._get_lru_cache()
+
+        unique_seqs = list()
+        unique_seq_indices = dict()
+        seq_indices = [None] * len(seqs)
+
+        for i, seq in enumerate(seqs):
+            if not lru_cache is None and seq in lru_cache:
+                continue
+            # end if
+            try:
+                seq_indices[i] = unique_seq_indices[seq]
+            except KeyError:
+                seq_indices[i] = len(unique_seqs)
+                unique_seq_indices[seq] = len(unique_seqs)
+                unique_seqs.append(seq)
+            # end try
+        # end for
+
+        unique_alignments = list()
+        if len(unique_seqs) != 0:
+            unique_alignments = self.aligner.align(unique_seqs)
+        # end if
+
+        if lru_cache is None:
+            return self._fan_out(seq_indices, unique_alignments)
+        else:
+            return self._fan_out_with_cache(
+                seqs,
+                seq_indices,
+                unique_seqs,
+                unique_alignments,
+                lru_cache
+            )
+        # end if
+    # end def
+
+    def _fan_out(self, seq_indices, unique_alignments):
+        # Alignments are modified in place during trimming,
+        #   so each read but the first one receives a copy.
+        alignments = [None] * len(seq_indices)
+        is_handed_out = [False] * len(unique_alignments)
+
+        for i, unique_index in enumerate(seq_indices):
+            if is_handed_out[unique_index]:
+                alignments[i] = _copy_alignments(unique_alignments[unique_index])
+            else:
+                alignments[i] = unique_alignments[unique_index]
+                is_handed_out[unique_index] = True
+            # end if
+        # end for
+
+        return alignments
+    # end def
+
+    def _fan_out_with_cache(self, seqs, seq_indices, unique_seqs, unique_alignments, lru_cache):
+
+        for seq, seq_alignments in zip(unique_seqs, unique_alignments):
+            lru_cache[seq] = seq_alignments
+        # end for
+
+        alignments = [None] * len(seqs)
+
+        for i, seq in enumerate(seqs):
+            # Cached alignments are never handed out: only their copies are
+            alignments[i] = _copy_alignments(lru_cache[seq])
+            lru_cache.move_to_end(seq)
+        # end for
+
+        while len(lru_cache) > self.lru_size:
+            lru_cache.popitem(last=False)
+        # end while
+
+        return alignments
+    # end def
+
+    def _get_lru_cache(self):
+        if self.lru_size == 0:
+            return None
+        # end if
+        # Each worker process keeps its own cache
+        return src.process_cache.get_or_build(
+            ('dedup_lru_cache', self.lru_size),
+            OrderedDict
+        )
+    # end def
+# end class
+
+
+def _copy_alignments(alignments):
+    return [alignment.get_copy() for alignment in alignments]
+# end def
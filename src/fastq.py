@@ -1,12 +1,16 @@
 
 import os
+import sys
+import gzip
+import zlib
+import queue
+import multiprocessing as mp
+from array import array
+from itertools import accumulate
 
 import src.filesystem as fs
-from src.fatal_errors import InvalidFastqError
-from src.sequences import verify_sequence, get_non_iupac_chars
-
-
-SPACE_HOLDER = '__<SPACE>__'
+from src.fatal_errors import FatalError, InvalidFastqError
+from src.sequences import verify_sequence_lines_bytes, get_non_iupac_chars
 
 
 class FastqRecord:
@@ -25,6 +29,13 @@ class FastqRecord:
         )
     # end def
 
+    def get_trimmed(self, start, end):
+        return FastqRecord(
+            self.header, self.seq[start : end],
+            self.comment, self.quality_str[start : end]
+        )
+    # end def
+
     def modify_header(self, alignment):
         identifier = self._get_seqid()
         modified_identifier = '{}_{}-{}' \
@@ -34,7 +45,7 @@ class FastqRecord:
     # end def
 
     def _get_seqid(self):
-        return self.header.partition(SPACE_HOLDER)[0]
+        return self.header.partition(' ')[0]
     # end def
 
     def __len__(self):
@@ -43,122 +54,496 @@ class FastqRecord:
 # end class
 
 
-def count_reads(file_path):
-    is_gzipped = file_path.endswith('.gz')
-    return sum(
-        1 for _ in fs.open_file_may_by_gzipped(file_path)
-    ) // 4
+class ReadBatch:
+    # A chunk of reads stored column-wise: headers, sequences, comments
+    #   and quality strings of all reads are kept in four newline-separated buffers,
+    #   along with arrays of offsets of reads in the buffers.
+    # Thus, a chunk consists of a few large objects rather than of
+    #   a record object and four strings per read.
+    # Reads are accessed via lightweight views (see `ReadView`).
+
+    def __init__(self, num_reads, headers, seqs, comments, quality_strs):
+        # Arguments following `num_reads` are newline-joined columns
+        self.num_reads = num_reads
+        self.columns = (headers, seqs, comments, quality_strs)
+        self.column_offsets = tuple(
+            _make_offsets(column, num_reads) for column in self.columns
+        )
+    # end def
+
+    def __len__(self):
+        return self.num_reads
+    # end def
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.num_reads:
+            raise IndexError('read index out of range')
+        # end if
+        return ReadView(self, i)
+    # end def
+
+    def __iter__(self):
+        for i in range(self.num_reads):
+            yield ReadView(self, i)
+        # end for
+    # end def
+
+    def get_seqs(self):
+        if self.num_reads == 0:
+            return list()
+        # end if
+        return self.columns[_SEQ_COLUMN].split('\n')
+    # end def
+
+    def get_field(self, column_index, i):
+        offsets = self.column_offsets[column_index]
+        return self.columns[column_index][offsets[i] : offsets[i+1]-1]
+    # end def
+
+    def get_field_slice(self, column_index, i, start, end):
+        # Same as `get_field(column_index, i)[start : end]` for non-negative `start` and `end`
+        offsets = self.column_offsets[column_index]
+        field_start = offsets[i]
+        field_end = offsets[i+1] - 1
+        return self.columns[column_index][
+            min(field_start + start, field_end) : min(field_start + end, field_end)
+        ]
+    # end def
+
+    def get_seq_len(self, i):
+        offsets = self.column_offsets[_SEQ_COLUMN]
+        return offsets[i+1] - offsets[i] - 1
+    # end def
+# end class
+
+
+_HEADER_COLUMN  = 0
+_SEQ_COLUMN     = 1
+_COMMENT_COLUMN = 2
+_QUALITY_COLUMN = 3
+
+
+class ReadView:
+    # A read of a ReadBatch: fields are sliced from the batch buffers on access.
+
+    __slots__ = ('batch', 'index')
+
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+    # end def
+
+    @property
+    def header(self):
+        return self.batch.get_field(_HEADER_COLUMN, self.index)
+    # end def
+
+    @property
+    def seq(self):
+        return self.batch.get_field(_SEQ_COLUMN, self.index)
+    # end def
+
+    @property
+    def comment(self):
+        return self.batch.get_field(_COMMENT_COLUMN, self.index)
+    # end def
+
+    @property
+    def quality_str(self):
+        return self.batch.get_field(_QUALITY_COLUMN, self.index)
+    # end def
+
+    def get_copy(self):
+        return FastqRecord(
+            self.header, self.seq,
+            self.comment, self.quality_str
+        )
+    # end def
+
+    def get_trimmed(self, start, end):
+        # Only trimmed parts of the sequence and quality string are copied
+        return FastqRecord(
+            self.header,
+            self.batch.get_field_slice(_SEQ_COLUMN, self.index, start, end),
+            self.comment,
+            self.batch.get_field_slice(_QUALITY_COLUMN, self.index, start, end)
+        )
+    # end def
+
+    def __len__(self):
+        return self.batch.get_seq_len(self.index)
+    # end def
+# end class
+
+
+def _make_offsets(column, num_reads):
+    # Offsets of items of a newline-joined column; the last one is the end of the column.
+    if num_reads == 0:
+        return array('q', (0,))
+    # end if
+    return array(
+        'q',
+        accumulate((len(item) + 1 for item in column.split('\n')), initial=0)
+    )
 # end def
 
 
-def form_chunk(fastq_file, chunk_size):
+def count_reads(file_path, block_size=4194304):
+    num_lines = 0
+    last_byte = b'\n'
 
-    eof = False
-    fq_chunk = [None] * chunk_size
+    with fs.open_file_may_by_gzipped(file_path, 'rb') as fastq_file:
+        block = fastq_file.read(block_size)
+        while block != b'':
+            num_lines += block.count(b'\n')
+            last_byte = block[-1:]
+            block = fastq_file.read(block_size)
+        # end while
+    # end with
 
-    for i in range(chunk_size):
+    # The last line may lack a trailing newline
+    if last_byte != b'\n':
+        num_lines += 1
+    # end if
+
+    return num_lines // 4
+# end def
 
-        header = fastq_file.readline().strip()
 
-        if header == '': # if eof is reached, terminate reading
-            eof = True
-            break
+class FastqBlockReader:
+    # Reads lines of a binary fastq file by large blocks
+    #   instead of calling `readline` for each line.
+
+    def __init__(self, binary_file, block_size=4194304):
+        self.name = binary_file.name
+        self.block_size = block_size # bytes
+
+        self._file = binary_file
+        self._lines = list()
+        self._pos = 0 # position of the next line to return
+        self._tail = b'' # incomplete last line of the last block
+        self._eof = False
+
+        self._num_read_bytes = 0 # (decompressed) bytes read from the file
+        self._num_consumed_bytes = 0 # bytes of lines returned
+    # end def
+
+    def get_num_consumed_bytes(self):
+        num_consumed_bytes = min(self._num_consumed_bytes, self._num_read_bytes)
+
+        if isinstance(self._file, gzip.GzipFile):
+            # Scale the offset in compressed data, which runs ahead
+            #   of the lines returned because of block reading
+            try:
+                num_compressed_bytes = self._file.fileobj.tell()
+            except OSError:
+                # E.g. standard input
+                return num_consumed_bytes
+            # end try
+            return round(
+                num_compressed_bytes * num_consumed_bytes / max(1, self._num_read_bytes)
+            )
         # end if
 
-        formatted_header = header[1:].replace(' ', SPACE_HOLDER)
+        return num_consumed_bytes
+    # end def
 
-        seq_line = fastq_file.readline().strip()
-        seq = seq_line.upper()
-        if not verify_sequence(seq):
-            non_iupac_chars = get_non_iupac_chars(seq_line)
-            msg_to_print = '\nError: a non-IUPAC character encountered' \
-                ' in a sequence line of file `{}`\n' \
-                'Bad characters are the following:\n  {}' \
-                    .format(fastq_file.name, non_iupac_chars)
-            msg_to_log_only = 'Bad sequence line is the following:\n{}' \
-                .format(seq_line)
-            raise InvalidFastqError(msg_to_print, msg_to_log_only)
+    def read_lines(self, num_lines):
+        # Returns up to `num_lines` lines without trailing newlines.
+        while len(self._lines) - self._pos < num_lines and not self._eof:
+            self._read_block()
+        # end while
+
+        lines = self._lines[self._pos : self._pos+num_lines]
+        self._pos += len(lines)
+        self._num_consumed_bytes += sum(map(len, lines)) + len(lines) # with newlines
+
+        return lines
+    # end def
+
+    def _read_block(self):
+        block = self._file.read(self.block_size)
+        self._num_read_bytes += len(block)
+        lines = self._lines[self._pos:]
+
+        if block == b'':
+            self._eof = True
+            if self._tail != b'':
+                lines.append(self._tail)
+                self._tail = b''
+            # end if
+        else:
+            block_lines = (self._tail + block).split(b'\n')
+            self._tail = block_lines.pop()
+            lines.extend(block_lines)
         # end if
 
-        comment     = fastq_file.readline().strip()
-        quality_str = fastq_file.readline().strip()
+        self._lines = lines
+        self._pos = 0
+    # end def
+# end class
 
-        fq_chunk[i] = FastqRecord(
-            formatted_header,
-            seq,
-            comment,
-            quality_str
-        )
-    # end for
 
-    not_none = lambda x: not x is None
+def read_raw_chunk(fastq_reader, chunk_size):
+    # Reads up to `chunk_size` records without parsing them.
+    # Returns (<RAW_CHUNK>, <NUM_READS>), where raw chunk is lines
+    #   of the records joined by newlines.
+    # `fastq_reader` is a FastqBlockReader.
+
+    lines = fastq_reader.read_lines(4 * chunk_size)
+
+    # The last record may be truncated
+    lines.extend([b''] * (-len(lines) % 4))
 
-    return tuple(filter(not_none, fq_chunk)), eof
+    # Reading terminates at the first empty header line (i.e. at eof)
+    headers = [line.strip() for line in lines[0::4]]
+    try:
+        num_reads = headers.index(b'')
+    except ValueError:
+        num_reads = len(headers)
+    # end try
+
+    return b'\n'.join(lines[: 4*num_reads]), num_reads
 # end def
 
 
-def fastq_chunks_unpaired(fq_fpath, chunk_size):
+def parse_raw_chunk(raw_chunk, fastq_fpath):
+    # Parses a raw chunk returned by `read_raw_chunk`.
+    # Returns a ReadBatch.
 
-    with fs.open_file_may_by_gzipped(fq_fpath, 'rt') as fastq_file:
+    lines = raw_chunk.split(b'\n')
+    num_reads = len(lines) // 4
 
-        eof = False # end of file
+    if num_reads == 0:
+        return ReadBatch(0, '', '', '', '')
+    # end if
 
-        while not eof:
+    # Sequences of all reads are verified at once
+    seq_lines = [line.strip() for line in lines[1::4]]
+    seqs_bytes = b'\n'.join(seq_lines).upper()
+    if not verify_sequence_lines_bytes(seqs_bytes):
+        _raise_non_iupac_error(fastq_fpath, seq_lines)
+    # end if
 
-            fq_chunk, eof = form_chunk(fastq_file, chunk_size)
+    return ReadBatch(
+        num_reads,
+        _decode_lines([line.strip()[1:] for line in lines[0::4]]),
+        seqs_bytes.decode('ascii'),
+        _decode_lines([line.strip() for line in lines[2::4]]),
+        _decode_lines([line.strip() for line in lines[3::4]])
+    )
+# end def
 
-            if len(fq_chunk) == 0:
-                return
-            # end if
 
-            yield fq_chunk
+def split_interleaved_raw_chunk(raw_chunk, fastq_fpath):
+    # Splits a raw chunk of interleaved paired-end reads
+    #   into raw chunks of forward and reverse reads.
+    if raw_chunk == b'':
+        return b'', b''
+    # end if
+
+    lines = raw_chunk.split(b'\n')
+    num_records = len(lines) // 4
+    if num_records % 2 != 0:
+        error_msg = '\nError: file `{}` of interleaved paired-end reads' \
+            ' contains odd number of reads'.format(fastq_fpath)
+        raise FatalError(error_msg)
+    # end if
+
+    frw_lines = list()
+    rvr_lines = list()
+    for i in range(0, len(lines), 8):
+        frw_lines.extend(lines[i : i+4])
+        rvr_lines.extend(lines[i+4 : i+8])
+    # end for
 
-            if eof:
-                return
-            # end if
-        # end while
-    # end with
+    return b'\n'.join(frw_lines), b'\n'.join(rvr_lines)
+# end def
+
+
+def get_raw_chunk_read_names(raw_chunk):
+    # Returns identifiers of reads of a raw chunk (without parsing it entirely)
+    return [
+        header.strip()[1:].split(b' ', 1)[0].decode('utf-8')
+        for header in raw_chunk.split(b'\n')[0::4]
+    ]
+# end def
+
+
+def _decode_lines(lines):
+    return b'\n'.join(lines).decode('utf-8')
+# end def
+
+
+def _raise_non_iupac_error(fastq_fpath, seq_lines):
+    for seq_line in seq_lines:
+        if not verify_sequence_lines_bytes(seq_line.upper()):
+            seq_line = seq_line.decode('utf-8', errors='replace')
+            non_iupac_chars = get_non_iupac_chars(seq_line)
+            msg_to_print = '\nError: a non-IUPAC character encountered' \
+                ' in a sequence line of file `{}`\n' \
+                'Bad characters are the following:\n  {}' \
+                    .format(fastq_fpath, non_iupac_chars)
+            msg_to_log_only = 'Bad sequence line is the following:\n{}' \
+                .format(seq_line)
+            raise InvalidFastqError(msg_to_print, msg_to_log_only)
+        # end if
+    # end for
 # end def
 
 
-def fastq_chunks_paired(frw_read_fpath, rvr_read_fpath, chunk_size):
+class FastqReaderProcess:
+    # Reads fastq files in a separate process: the process decompresses
+    #   a file and splits it into raw chunks, which are passed
+    #   to the main process through a bounded queue.
+    # Thus, decompression does not occupy the main process,
+    #   and paired files are decompressed concurrently.
+    # The process is started once and reads files one after another, as they are
+    #   requested: readers are started in the main thread before the pool of workers,
+    #   since a process must not be forked while threads of the pool are running.
+
+    def __init__(self, read_stdin=False, max_queued_chunks=4):
+        self.fq_fpath = None
+        self._is_reading = False
+        self._request_queue = mp.SimpleQueue()
+        self._queue = mp.Queue(max_queued_chunks)
+        self._skip_event = mp.Event()
+
+        # Standard input is closed in child processes: pass a duplicate of its descriptor
+        stdin_fd = None
+        if read_stdin:
+            stdin_fd = os.dup(sys.stdin.fileno())
+        # end if
 
-    with fs.open_file_may_by_gzipped(frw_read_fpath) as frw_file, \
-         fs.open_file_may_by_gzipped(rvr_read_fpath) as rvr_file:
+        self._process = mp.Process(
+            target=_read_requested_files,
+            args=(self._request_queue, stdin_fd, self._queue, self._skip_event),
+            daemon=True
+        )
+        self._process.start()
 
-        eof = False
+        if not stdin_fd is None:
+            os.close(stdin_fd)
+        # end if
+    # end def
 
-        while not eof:
+    def start_reading(self, fq_fpath, chunk_size):
+        self.fq_fpath = fq_fpath
+        self._is_reading = True
+        self._request_queue.put((fq_fpath, chunk_size))
+    # end def
 
-            frw_chunk, f_eof = form_chunk(frw_file, chunk_size)
-            rvr_chunk, r_eof = form_chunk(rvr_file, chunk_size)
+    def iter_raw_chunks(self):
+        # Yields (<RAW_CHUNK>, <NUM_CONSUMED_BYTES>).
+        # For gzipped files, bytes of compressed data are counted.
+        while True:
+            item = self._get_item()
 
-            if len(frw_chunk) == 0 or len(rvr_chunk) == 0:
+            if isinstance(item, BaseException):
+                raise item
+            # end if
+            if item is None:
                 return
             # end if
 
-            yield (frw_chunk, rvr_chunk)
+            yield item
+        # end while
+    # end def
 
-            eof = f_eof or r_eof
+    def skip_rest(self):
+        # Drops the rest of the file being read, so that the next one can be read.
+        # Errors in the dropped part are ignored.
+        if not self._is_reading:
+            return
+        # end if
+        self._skip_event.set()
+        item = self._get_item()
+        while not item is None and not isinstance(item, BaseException):
+            item = self._get_item()
         # end while
-    # end with
+        self._skip_event.clear()
+    # end def
+
+    def _get_item(self):
+        # Returns a raw chunk, None at the end of the file, or an error
+        while True:
+            try:
+                item = self._queue.get(timeout=1)
+            except queue.Empty:
+                if not self._process.is_alive() and self._queue.empty():
+                    error_msg = '\nError: reading of file `{}` has terminated unexpectedly' \
+                        .format(self.fq_fpath)
+                    raise FatalError(error_msg)
+                # end if
+                continue
+            # end try
+
+            if item is None or isinstance(item, BaseException):
+                self._is_reading = False
+            # end if
+            return item
+        # end while
+    # end def
+
+    def stop(self):
+        if self._process.is_alive():
+            self._process.terminate()
+        # end if
+        self._process.join()
+    # end def
+# end class
+
+
+def _read_requested_files(request_queue, stdin_fd, chunk_queue, skip_event):
+    while True:
+        fq_fpath, chunk_size = request_queue.get()
+        _read_raw_chunks_to_queue(fq_fpath, stdin_fd, chunk_size, chunk_queue, skip_event)
+    # end while
 # end def
 
 
-def write_fastq2fasta(reads_chunk, query_fpath):
+def _read_raw_chunks_to_queue(fq_fpath, stdin_fd, chunk_size, chunk_queue, skip_event):
+    try:
+        if fq_fpath == fs.STDIN_FPATH:
+            fastq_file = fs.open_stdin_may_be_gzipped(stdin_fd)
+        else:
+            fastq_file = fs.open_file_may_by_gzipped(fq_fpath, 'rb')
+        # end if
 
-    with open(query_fpath, 'wt') as query_file:
-        for fq_record in reads_chunk:
-            query_file.write('>{}\n{}\n'.format(fq_record.header, fq_record.seq))
-    # end with
+        with fastq_file:
+            fastq_reader = FastqBlockReader(fastq_file)
+
+            while not skip_event.is_set():
+                raw_chunk, num_reads = read_raw_chunk(fastq_reader, chunk_size)
+
+                if num_reads == 0:
+                    break
+                # end if
+
+                chunk_queue.put(
+                    (raw_chunk, fastq_reader.get_num_consumed_bytes())
+                )
+
+                if num_reads < chunk_size:
+                    break
+                # end if
+            # end while
+        # end with
+    except (OSError, EOFError, zlib.error) as err:
+        error_msg = '\nError: cannot read file `{}`:\n  {}'.format(fq_fpath, err)
+        chunk_queue.put(FatalError(error_msg))
+    except Exception as err:
+        # Is re-raised in the main process
+        chunk_queue.put(err)
+    else:
+        chunk_queue.put(None)
+    # end try
 # end def
 
 
-def write_fastq_record(fq_record, outfile):
-    # `outfile` should be opened for appending
-    outfile.write('@{}\n{}\n{}\n{}\n'.format(
-        fq_record.header.replace(SPACE_HOLDER, ' '),
-        fq_record.seq, fq_record.comment, fq_record.quality_str
-        )
+def format_fastq_record(fq_record):
+    return '@{}\n{}\n{}\n{}\n'.format(
+        fq_record.header, fq_record.seq,
+        fq_record.comment, fq_record.quality_str
     )
 # end def
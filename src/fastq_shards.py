@@ -0,0 +1,304 @@
+
+import os
+import gzip
+import struct
+
+import src.filesystem as fs
+from src.fatal_errors import FatalError
+
+
+_BGZF_HEADER_LEN = 18
+_BGZF_FOOTER_LEN = 8
+_GZIP_MAGIC = b'\x1f\x8b\x08'
+_GZIP_FLAG_EXTRA = 0x04
+
+_SAMPLE_SIZE = 4194304 # bytes
+
+
+class FastqShard:
+    # Byte range of a fastq file, which is read by a worker process itself.
+    # A shard owns all the records, header lines of which start
+    #   in (<START>, <START> + <LENGTH>] (in decompressed data):
+    #   the first shard owns also the record at position 0.
+    # For BGZF files, `seek_offset` is the offset of the first BGZF block
+    #   of the shard; for uncompressed files, it is equal to the start.
+
+    def __init__(self, fq_fpath, seek_offset, length, is_first, is_bgzf, end_offset):
+        self.fq_fpath = fq_fpath
+        self.seek_offset = seek_offset
+        self.length = length
+        self.is_first = is_first
+        self.is_bgzf = is_bgzf
+        self.end_offset = end_offset # offset in the file, for the progress bar
+    # end def
+# end class
+
+
+def can_shard(fq_fpath):
+    # Uncompressed and BGZF-compressed files can be read from an arbitrary shard
+    if fq_fpath == fs.STDIN_FPATH:
+        return False
+    # end if
+    return not fs.is_gzipped(fq_fpath) or is_bgzf(fq_fpath)
+# end def
+
+
+def is_bgzf(fpath):
+    with open(fpath, 'rb') as infile:
+        header = infile.read(_BGZF_HEADER_LEN)
+    # end with
+    return not _parse_bgzf_block_size(header) is None
+# end def
+
+
+def make_shards(fq_fpath, chunk_size):
+    # Yields shards of approximately `chunk_size` records each
+    shard_length = chunk_size * _estimate_record_size(fq_fpath)
+
+    if is_bgzf(fq_fpath):
+        yield from _make_bgzf_shards(fq_fpath, shard_length)
+    else:
+        yield from _make_plain_shards(fq_fpath, shard_length)
+    # end if
+# end def
+
+
+def read_shard(shard):
+    # Returns a raw chunk (see `src.fastq.read_raw_chunk`) of records owned by the shard.
+
+    with open(shard.fq_fpath, 'rb') as infile:
+        infile.seek(shard.seek_offset)
+        if shard.is_bgzf:
+            # BGZF blocks are regular gzip members, and
+            #   decompression continues to further blocks if needed
+            stream = gzip.GzipFile(fileobj=infile, mode='rb')
+        else:
+            stream = infile
+        # end if
+        lines = _ShardLines(stream)
+
+        if shard.is_first:
+            owned_data = stream.read(shard.length)
+        else:
+            # Skip the incomplete line, which belongs to the previous shard
+            num_skipped_bytes = len(stream.readline())
+            if num_skipped_bytes > shard.length:
+                return b''
+            # end if
+            owned_data = stream.read(shard.length - num_skipped_bytes)
+        # end if
+        # Complete the last line, or take the line starting right after the shard
+        owned_data += stream.readline()
+
+        owned_lines = owned_data.split(b'\n')
+        if owned_data == b'' or owned_data.endswith(b'\n'):
+            owned_lines.pop()
+        # end if
+        lines.extend(owned_lines)
+        num_owned_lines = len(owned_lines)
+
+        if shard.is_first:
+            first_header_index = 0
+        else:
+            first_header_index = _find_first_header(lines, num_owned_lines)
+        # end if
+
+        if first_header_index is None:
+            # E.g. a long read spans the whole shard
+            return b''
+        # end if
+
+        num_reads = 0
+        record_start = first_header_index
+        while record_start < num_owned_lines:
+            # Reading terminates at the first empty header line (i.e. at eof)
+            if lines.get(record_start).strip() == b'':
+                break
+            # end if
+            num_reads += 1
+            record_start += 4
+        # end while
+
+        last_line_index = first_header_index + 4*num_reads
+        # The last record may be truncated
+        record_lines = [
+            lines.get(i) for i in range(first_header_index, last_line_index)
+        ]
+    # end with
+
+    return b'\n'.join(record_lines)
+# end def
+
+
+class _ShardLines:
+    # Lines of a shard, which are read further on demand
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lines = list()
+    # end def
+
+    def extend(self, lines):
+        self._lines.extend(lines)
+    # end def
+
+    def get(self, index):
+        # Returns an empty line after eof
+        while len(self._lines) <= index:
+            line = self._stream.readline()
+            if line == b'':
+                return b''
+            # end if
+            self._lines.append(line.rstrip(b'\n'))
+        # end while
+        return self._lines[index]
+    # end def
+# end class
+
+
+def _find_first_header(lines, num_owned_lines):
+    # A header line starts with '@', and the line after the next one starts with '+'.
+    # A quality line may start with '@', but it is followed by a header line
+    #   and a sequence line, which never starts with '+'.
+    for i in range(num_owned_lines):
+        if lines.get(i).startswith(b'@') and lines.get(i+2).startswith(b'+'):
+            return i
+        # end if
+    # end for
+    return None
+# end def
+
+
+def _estimate_record_size(fq_fpath):
+    # Average size of a record (in decompressed bytes) in the beginning of a file
+    with fs.open_file_may_by_gzipped(fq_fpath, 'rb') as infile:
+        sample = infile.read(_SAMPLE_SIZE)
+    # end with
+
+    num_lines = sample.count(b'\n')
+    num_records = num_lines // 4
+    if num_records == 0:
+        return max(1, len(sample))
+    # end if
+
+    records_end = 0
+    for _ in range(4 * num_records):
+        records_end = sample.index(b'\n', records_end) + 1
+    # end for
+
+    return max(1, records_end // num_records)
+# end def
+
+
+def _make_plain_shards(fq_fpath, shard_length):
+    file_size = os.path.getsize(fq_fpath)
+
+    start = 0
+    while True:
+        end = min(start + shard_length, file_size)
+        yield FastqShard(
+            fq_fpath,
+            seek_offset=start,
+            length=end - start,
+            is_first=(start == 0),
+            is_bgzf=False,
+            end_offset=end
+        )
+        if end >= file_size:
+            return
+        # end if
+        start = end
+    # end while
+# end def
+
+
+def _make_bgzf_shards(fq_fpath, shard_length):
+    # Shards consist of whole BGZF blocks
+    shard_offset = 0
+    shard_decompr_length = 0
+    is_first = True
+
+    for block_offset, block_size, block_decompr_size in _iter_bgzf_blocks(fq_fpath):
+        shard_decompr_length += block_decompr_size
+        block_end = block_offset + block_size
+
+        if shard_decompr_length >= shard_length:
+            yield FastqShard(
+                fq_fpath,
+                seek_offset=shard_offset,
+                length=shard_decompr_length,
+                is_first=is_first,
+                is_bgzf=True,
+                end_offset=block_end
+            )
+            shard_offset = block_end
+            shard_decompr_length = 0
+            is_first = False
+        # end if
+    # end for
+
+    if shard_decompr_length > 0 or is_first:
+        yield FastqShard(
+            fq_fpath,
+            seek_offset=shard_offset,
+            length=shard_decompr_length,
+            is_first=is_first,
+            is_bgzf=True,
+            end_offset=os.path.getsize(fq_fpath)
+        )
+    # end if
+# end def
+
+
+def _iter_bgzf_blocks(fpath):
+    # Yields (<BLOCK_OFFSET>, <BLOCK_SIZE>, <DECOMPRESSED_SIZE>) without decompression
+    with open(fpath, 'rb', buffering=1048576) as infile:
+        block_offset = 0
+        while True:
+            header = infile.read(_BGZF_HEADER_LEN)
+            if header == b'':
+                return
+            # end if
+
+            block_size = _parse_bgzf_block_size(header)
+            if block_size is None:
+                error_msg = '\nError: invalid BGZF block at offset {} of file `{}`' \
+                    .format(block_offset, fpath)
+                raise FatalError(error_msg)
+            # end if
+
+            infile.seek(block_offset + block_size - 4)
+            footer = infile.read(4)
+            if len(footer) != 4:
+                error_msg = '\nError: truncated BGZF file `{}`'.format(fpath)
+                raise FatalError(error_msg)
+            # end if
+            block_decompr_size = struct.unpack('<I', footer)[0]
+
+            yield block_offset, block_size, block_decompr_size
+
+            block_offset += block_size
+        # end while
+    # end with
+# end def
+
+
+def _parse_bgzf_block_size(header):
+    # Returns total size of a BGZF block, or None if the header is not a BGZF one
+    if len(header) < _BGZF_HEADER_LEN \
+       or header[:3] != _GZIP_MAGIC \
+       or not header[3] & _GZIP_FLAG_EXTRA:
+        return None
+    # end if
+
+    extra_len = struct.unpack('<H', header[10:12])[0]
+    if extra_len < 6 or header[12:16] != b'BC\x02\x00':
+        return None
+    # end if
+
+    block_size = struct.unpack('<H', header[16:18])[0] + 1
+    if block_size < _BGZF_HEADER_LEN + _BGZF_FOOTER_LEN:
+        return None
+    # end if
+    return block_size
+# end def
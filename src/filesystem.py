@@ -1,14 +1,24 @@
 
 import re
 import os
+import sys
 import gzip
 import shutil
+import hashlib
 from time import strftime, gmtime
 
 from src.printing import print_err, START_TIME
 from src.fatal_errors import FatalError
 
 
+# Input file path standing for standard input
+STDIN_FPATH = '-'
+# Output file path standing for standard output
+STDOUT_FPATH = '-'
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
 def open_file_may_by_gzipped(fpath, mode='rt'):
     file_is_gzipped = is_gzipped(fpath)
 
@@ -22,7 +32,37 @@ def open_file_may_by_gzipped(fpath, mode='rt'):
 # end def
 
 
+def open_stdin_may_be_gzipped(stdin_fd):
+    # Opens a descriptor of standard input for binary reading.
+    # Gzipped data is recognized by its magic bytes, since there is no file name.
+    stdin_file = os.fdopen(stdin_fd, 'rb')
+    if stdin_file.peek(len(_GZIP_MAGIC))[:len(_GZIP_MAGIC)] == _GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stdin_file, mode='rb')
+    # end if
+    return stdin_file
+# end def
+
+
+def write_to_stdout(data):
+    # Writes bytes directly to the descriptor of standard output:
+    #   `sys.stdout` is redirected to stderr when reads are streamed to stdout.
+    data = memoryview(data)
+    try:
+        while len(data) != 0:
+            num_written = os.write(sys.__stdout__.fileno(), data)
+            data = data[num_written:]
+        # end while
+    except OSError as err:
+        error_msg = '\nError: cannot write to standard output:\n {}'.format(err)
+        raise FatalError(error_msg)
+    # end try
+# end def
+
+
 def is_gzipped(fpath):
+    if fpath == STDIN_FPATH:
+        return False
+    # end if
     if fpath.endswith('.gz'):
         try:
             with gzip.open(fpath) as _:
@@ -93,6 +133,8 @@ def log_to_file(message, outdir_path):
     )
     print_err('Logging to file `{}`'.format(log_fpath))
 
+    # The output directory is not created in advance if reads are written to stdout
+    create_dir(outdir_path)
     with open(log_fpath, 'wt') as log_file:
         log_file.write('kromsatel start time: {}\n' \
             .format(strftime('%Y-%m-%d %H:%M:%S', gmtime(START_TIME)))
@@ -120,3 +162,22 @@ def try_rm_directory(dirpath):
         print_err(str(err))
     # end try
 # end def
+
+
+def hash_file(fpath, chunk_size=1048576):
+    # Returns hex SHA-256 digest of file content
+    file_hash = hashlib.sha256()
+    try:
+        with open(fpath, 'rb') as infile:
+            chunk = infile.read(chunk_size)
+            while chunk != b'':
+                file_hash.update(chunk)
+                chunk = infile.read(chunk_size)
+            # end while
+        # end with
+    except OSError as err:
+        error_msg = '\nError: cannot read file `{}`:\n {}'.format(fpath, err)
+        raise FatalError(error_msg)
+    # end try
+    return file_hash.hexdigest()
+# end def
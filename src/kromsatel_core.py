@@ -1,48 +1,424 @@
 
 import os
+import threading
 import multiprocessing as mp
 
+import src.cascade
+import src.aligners
 import src.fastq
+import src.fastq_shards
+import src.prefilter
+import src.mate_merging
+import src.primer_fast_path
+import src.watch
 import src.filesystem as fs
-from src.printing import getwt
-from src.progress import Progress
+from src.printing import getwt, print_err
+from src.progress import Progress, ConcurrentReadCounter
 import src.synchronization as synchron
 from src.binning import SimpleUnpairedBinner, SimplePairedBinner, \
-                        SplitUnpairedBinner, SplitPairedBinner
-from src.alignment import parse_alignments_nanopore, parse_alignments_illumina
+                        SplitUnpairedBinner, SplitPairedBinner, \
+                        StdoutUnpairedBinner, StdoutPairedBinner, \
+                        DiscardedUnpairedBinner, DiscardedPairedBinner
+from src.fatal_errors import FatalError
+from src.reorder_buffer import ReorderBuffer
+from src.output_writer import OutputWriterProcess
+from src.kromsatel_modes import KromsatelModes
+from src.prefilter import KmerPrefilter, LengthPrefilter
+from src.precomputed_alignments import PrecomputedAlignments
+from src.alignment import parse_alignments_nanopore, parse_alignments_illumina, \
+                          select_single_alignment
+from src.alignment_sidecar import AlignmentSidecarWriter, AlignmentSidecarReader
 from src.reads_cleaning import NanoporeReadsCleaner, \
                                IlluminaPEReadsCleaner, \
                                IlluminaSEReadsCleaner
 
 
 class KromsatelCore:
+    # `shared_core` is a core of the same mode, the primer scheme, aligner
+    #   and prefilter of which are reused (e.g. by cores of a batch of samples).
 
-    def __init__(self, kromsatel_args):
+    def __init__(self, kromsatel_args, shared_core=None):
         self.kromsatel_args = kromsatel_args
         self.threads_num = kromsatel_args.threads_num
+
+        self.aligner = None
+        self.sidecar_reader = None
+        self.sidecar_writer = None
+        self.precomputed_alignments = None
+        self.prefilter = None
+        self.length_prefilter = None
+        self.discarded_binner = None
+        # Is started for each run, before the pool of workers
+        self.output_writer = None
+        self.reorder_buffer = None
+
+        if not kromsatel_args.reclassify_fpath is None:
+            self._init_sidecar_reader()
+        elif not kromsatel_args.alignments_fpath is None:
+            self.precomputed_alignments = PrecomputedAlignments(
+                kromsatel_args.alignments_fpath,
+                paired=(kromsatel_args.kromsatel_mode == KromsatelModes.IlluminaPE)
+            )
+        elif not shared_core is None:
+            self.aligner = shared_core.aligner
+            self.prefilter = shared_core.prefilter
+        else:
+            self.aligner = src.aligners.create_aligner(
+                kromsatel_args,
+                self.cleaner.primer_scheme
+            )
+            if kromsatel_args.prefilter_min_kmers > 0:
+                self.prefilter = KmerPrefilter(
+                    kromsatel_args.reference_fpath,
+                    kromsatel_args.prefilter_min_kmers
+                )
+            # end if
+        # end if
+
+        if not kromsatel_args.save_alignments_fpath is None:
+            self.sidecar_writer = AlignmentSidecarWriter(
+                kromsatel_args.save_alignments_fpath,
+                kromsatel_args.kromsatel_mode,
+                kromsatel_args.chunk_size
+            )
+        # end if
+
+        # Saved alignments must cover all reads: they may be re-classified
+        #   with another minimum length
+        if not self.aligner is None and self.sidecar_writer is None:
+            self.length_prefilter = LengthPrefilter(
+                kromsatel_args.min_len,
+                self.cleaner.trimmer.get_min_trimmed_len()
+            )
+        # end if
     # end def
 
     def run(self):
         raise NotImplementedError
     # end def
 
-    def _write_output(self):
-        with synchron.output_lock:
-            self.binner.write_binned_reads()
-        # end with
+    def _init_sidecar_reader(self):
+        self.sidecar_reader = AlignmentSidecarReader(
+            self.kromsatel_args.reclassify_fpath
+        )
+
+        if self.sidecar_reader.kromsatel_mode != self.kromsatel_args.kromsatel_mode:
+            error_msg = '\nError: alignment file `{}` has been created for another' \
+                ' type of input reads' \
+                    .format(self.kromsatel_args.reclassify_fpath)
+            raise FatalError(error_msg)
+        # end if
+
+        # Reads must be split into chunks in the same way as they were on alignment
+        if self.sidecar_reader.chunk_size != self.kromsatel_args.chunk_size:
+            print('{} - Chunk size is set to {} reads according to the alignment file' \
+                .format(getwt(), self.sidecar_reader.chunk_size))
+            self.kromsatel_args.chunk_size = self.sidecar_reader.chunk_size
+        # end if
+    # end def
+
+    def get_input_spec(self):
+        # Returns (<CLEAN_CHUNK_FUNC>, <FASTQ_FPATHS>, <NUM_RECORDS_PER_READ>).
+        # `num_records_per_read` is number of fastq records per read
+        #   (2 for interleaved paired-end reads).
+        raise NotImplementedError
+    # end def
+
+    def get_input_size(self):
+        return _get_input_size(*self.get_input_spec()[1])
+    # end def
+
+    def make_tasks(self, input_chunks):
+        # Task: (<CHUNK_NUM>, <RAW_CHUNK_PARTS or FASTQ_SHARD>,
+        #   <PRECOMPUTED_ALIGNMENTS or None>, <NUMBER_OF_INPUT_BYTES_CONSUMED>)
+        numbered_chunks = enumerate(input_chunks)
+
+        if self.precomputed_alignments is None:
+            tasks = (
+                (chunk_num, input_chunk, None)
+                for chunk_num, input_chunk in numbered_chunks
+            )
+        else:
+            tasks = self.precomputed_alignments.attach(
+                numbered_chunks,
+                lambda input_chunk: self._get_chunk_read_names(input_chunk[0])
+            )
+        # end if
+
+        for chunk_num, (chunk_input, input_num_bytes), precomputed_alignments in tasks:
+            yield chunk_num, chunk_input, precomputed_alignments, input_num_bytes
+        # end for
+    # end def
+
+    def get_num_readers(self):
+        # Returns number of reader processes needed to read input files.
+        # Shards of input files are read by worker processes themselves.
+        _, fastq_fpaths, _ = self.get_input_spec()
+        if self._input_can_be_sharded(fastq_fpaths):
+            return 0
+        # end if
+        return len(fastq_fpaths)
+    # end def
+
+    def start_readers(self):
+        # Reader processes are started in the main thread before the pool of workers:
+        #   input chunks are then taken from them by a thread of the pool.
+        #   The caller is to stop the readers.
+        _, fastq_fpaths, _ = self.get_input_spec()
+        return [
+            src.fastq.FastqReaderProcess(read_stdin=(fq_fpath == fs.STDIN_FPATH))
+            for fq_fpath in fastq_fpaths[:self.get_num_readers()]
+        ]
+    # end def
+
+    def iter_input_chunks(self, readers):
+        # Yields (<RAW_CHUNK_PARTS or FASTQ_SHARD>, <NUM_INPUT_BYTES_CONSUMED>).
+        # Input files are either read by worker processes themselves by shards,
+        #   or by `readers` returned by `start_readers`.
+        _, fastq_fpaths, num_records_per_read = self.get_input_spec()
+        yield from self._iter_fastq_chunks(fastq_fpaths, num_records_per_read, readers)
+    # end def
+
+    def _iter_fastq_chunks(self, fastq_fpaths, num_records_per_read, readers):
+        if self._input_can_be_sharded(fastq_fpaths):
+            for shard in src.fastq_shards.make_shards(fastq_fpaths[0], self.chunk_size):
+                yield shard, shard.end_offset
+            # end for
+            return
+        # end if
+
+        file_readers = readers[:len(fastq_fpaths)]
+        for reader, fq_fpath in zip(file_readers, fastq_fpaths):
+            reader.start_reading(fq_fpath, num_records_per_read * self.chunk_size)
+        # end for
+
+        yield from _zip_raw_chunks(file_readers)
+
+        # Readers are reused for the next files
+        for reader in file_readers:
+            reader.skip_rest()
+        # end for
+    # end def
+
+    def _get_chunk_read_names(self, raw_chunk_parts):
+        return src.fastq.get_raw_chunk_read_names(raw_chunk_parts[0])
     # end def
 
-    def _update_progress(self, increment):
-        with synchron.status_update_lock:
-            self.progress.increment_done(increment)
-            self.progress.increment_next_report()
-        # end with
+    def _clean_chunks(self):
+        # Worker processes parse and clean chunks and return
+        #   (<NUM_READS>, <NUM_INPUT_BYTES>, <CHUNK_OUTPUT or None>);
+        #   progress is updated in the main process.
+        # For ordered output, workers return output of chunks, and the main process
+        #   passes it to the writer in order of chunks.
+        clean_chunk_func, fastq_fpaths, num_records_per_read = self.get_input_spec()
+
+        read_counter = None
+        if self.kromsatel_args.count_reads:
+            read_counter = ConcurrentReadCounter(fastq_fpaths[0], num_records_per_read)
+        # end if
+
+        self.output_writer = OutputWriterProcess(self.kromsatel_args)
+        if self.kromsatel_args.ordered_output:
+            self.reorder_buffer = ReorderBuffer()
+        # end if
+
+        readers = self.start_readers()
+        results = clean_tasks_in_pool(
+            self.threads_num,
+            clean_chunk_func,
+            self.make_tasks(self.iter_input_chunks(readers)),
+            self.reorder_buffer
+        )
+
+        try:
+            for num_reads, input_num_bytes, chunk_output in results:
+                if not chunk_output is None:
+                    self.output_writer.write(chunk_output)
+                # end if
+                self._update_progress(num_reads, input_num_bytes, read_counter)
+            # end for
+        except BaseException:
+            # Workers are terminated before the writer
+            results.close()
+            self.output_writer.stop()
+            raise
+        finally:
+            # The pool is terminated before readers are stopped
+            results.close()
+            for reader in readers:
+                reader.stop()
+            # end for
+            if not read_counter is None:
+                read_counter.stop()
+            # end if
+        # end try
+
+        self.output_writer.close()
     # end def
 
-    def _print_progress(self):
-        with synchron.print_lock:
-            self.progress.print_status_bar()
-        # end with
+    def _input_can_be_sharded(self, fastq_fpaths):
+        # Shards cannot be synchronized between paired files.
+        # Saved and precomputed alignments require chunks of exactly `chunk_size` reads
+        #   and reads read in the main process, respectively.
+        return len(fastq_fpaths) == 1 \
+           and not self.kromsatel_args.interleaved \
+           and self.sidecar_reader is None \
+           and self.sidecar_writer is None \
+           and self.precomputed_alignments is None \
+           and src.fastq_shards.can_shard(fastq_fpaths[0])
+    # end def
+
+    def _init_discarded_binner(self, binner_class, output_prefix):
+        if not self.prefilter is None and self.kromsatel_args.write_discarded:
+            self.discarded_binner = binner_class(
+                self.kromsatel_args.outdir_path,
+                output_prefix
+            )
+        # end if
+    # end def
+
+    def _prefilter_reads(self, reads_chunk):
+        # Returns mask of reads passed the prefilters, or None if there are no prefilters.
+        # Reads, which are too short to be output, are discarded first:
+        #   only the rest ones are checked for shared k-mers.
+        if self.length_prefilter is None and self.prefilter is None:
+            return None
+        # end if
+
+        if self.length_prefilter is None:
+            passed_mask = [True] * len(reads_chunk)
+        else:
+            passed_mask = self.length_prefilter.get_passed_mask(reads_chunk)
+        # end if
+        num_too_short = passed_mask.count(False)
+
+        num_off_target = 0
+        if not self.prefilter is None:
+            seqs = reads_chunk.get_seqs()
+            checked_indices = [i for i, passed in enumerate(passed_mask) if passed]
+            kmer_passed_mask = self.prefilter.get_passed_mask(
+                [seqs[i] for i in checked_indices]
+            )
+            for i, passed in zip(checked_indices, kmer_passed_mask):
+                if not passed:
+                    passed_mask[i] = False
+                    num_off_target += 1
+                    if not self.discarded_binner is None:
+                        self.discarded_binner.add_read(reads_chunk[i])
+                    # end if
+                # end if
+            # end for
+        # end if
+
+        src.prefilter.count_discarded(len(reads_chunk), num_too_short, num_off_target)
+
+        return passed_mask
+    # end def
+
+    def _align_chunk(self, chunk_num, reads_chunk, precomputed_alignments, passed_mask=None):
+        return self._align_chunk_parts(
+            chunk_num,
+            (reads_chunk,),
+            precomputed_alignments,
+            passed_mask
+        )[0]
+    # end def
+
+    def _align_chunk_parts(self, chunk_num, reads_chunk_parts, precomputed_alignments,
+                           passed_mask=None):
+        # Aligns several parts of a chunk (e.g. forward and reverse reads)
+        #   with a single call to the aligner.
+        # Returns a list of alignment lists for each part.
+
+        if not self.sidecar_reader is None:
+            return [
+                self.sidecar_reader.read_chunk(chunk_num, part, len(reads_chunk))
+                for part, reads_chunk in enumerate(reads_chunk_parts)
+            ]
+        # end if
+
+        if not precomputed_alignments is None:
+            alignment_lists_of_parts = precomputed_alignments
+        else:
+            if passed_mask is None:
+                passed_mask = [True] * len(reads_chunk_parts[0])
+            # end if
+
+            # Reads discarded by the prefilter are left unaligned
+            seqs = [
+                seq
+                for reads_chunk in reads_chunk_parts
+                    for seq, passed in zip(reads_chunk.get_seqs(), passed_mask) if passed
+            ]
+            passed_alignment_lists = iter(self.aligner.align(seqs))
+            alignment_lists_of_parts = [
+                [
+                    next(passed_alignment_lists) if passed else list()
+                    for passed in passed_mask
+                ]
+                for _ in reads_chunk_parts
+            ]
+        # end if
+
+        if not self.sidecar_writer is None:
+            # Save alignments before they are modified by trimming
+            with synchron.sidecar_lock:
+                for part, alignment_lists in enumerate(alignment_lists_of_parts):
+                    self.sidecar_writer.write_chunk(chunk_num, part, alignment_lists)
+                # end for
+            # end with
+        # end if
+
+        return alignment_lists_of_parts
+    # end def
+
+    def print_run_summary(self):
+        summaries = (
+            src.prefilter.get_discarded_summary(),
+            src.mate_merging.get_merged_summary(),
+            src.primer_fast_path.get_hit_rate_summary(),
+            src.cascade.get_tier_hits_summary(
+                src.aligners.get_cascade_tier_names(self.kromsatel_args)
+            ),
+        )
+        for summary in summaries:
+            if not summary is None:
+                print('{} - {}'.format(getwt(), summary))
+            # end if
+        # end for
+
+        if not self.reorder_buffer is None:
+            print('{} - {}'.format(getwt(), self.reorder_buffer.get_stall_summary()))
+        # end if
+    # end def
+
+    def _write_output(self):
+        # Returns output of the chunk, if it is to be written in order of chunks:
+        #   then the main process passes it to the writer. Otherwise, passes the output
+        #   to the writer right away and returns None.
+        chunk_output = self.binner.pop_binned_output()
+        if not self.discarded_binner is None:
+            chunk_output += self.discarded_binner.pop_binned_output()
+        # end if
+
+        if len(chunk_output) == 0:
+            return None
+        # end if
+        if self.kromsatel_args.ordered_output:
+            return chunk_output
+        # end if
+
+        self.output_writer.write(chunk_output)
+        return None
+    # end def
+
+    def _update_progress(self, increment, input_num_bytes, read_counter):
+        if not read_counter is None and self.progress.num_reads_total is None:
+            self.progress.set_num_reads_total(read_counter.get_num_reads())
+        # end if
+
+        self.progress.increment_done(increment, input_num_bytes)
+        self.progress.print_status_bar()
     # end def
 # end class
 
@@ -50,22 +426,42 @@ class KromsatelCore:
 class LongReadKromsatelCore(KromsatelCore):
 
     # TODO: do not save reference to kromsatel args by creating some "BlastArguments" class
-    def __init__(self, kromsatel_args):
-        super().__init__(kromsatel_args)
-        self.cleaner = NanoporeReadsCleaner(kromsatel_args)
+    def __init__(self, kromsatel_args, shared_core=None):
+        # The cleaner goes first: its primer scheme is used for aligning reads
+        if shared_core is None:
+            self.cleaner = NanoporeReadsCleaner(kromsatel_args)
+        else:
+            self.cleaner = shared_core.cleaner
+        # end if
+        super().__init__(kromsatel_args, shared_core)
 
-        self.reads_fpath = self.kromsatel_args.long_read_fpath
         self.chunk_size = self.kromsatel_args.chunk_size
+        self.watcher = None
 
-        num_reads_total = \
-            _count_unpaired_reads_verbosely(self.reads_fpath)
-        self.progress = Progress(num_reads_total)
-
-        output_prefix = fs.rm_fastq_extention(
-            os.path.basename(self.reads_fpath)
-        )
+        if kromsatel_args.watch_dirpath is None:
+            self.reads_fpath = self.kromsatel_args.long_read_fpath
+            self.progress = Progress(
+                _get_input_size(self.reads_fpath)
+            )
+            output_prefix = _get_output_prefix(self.reads_fpath)
+        else:
+            # Files of reads are picked up as they appear in the directory:
+            #   amount of input data is unknown
+            self.reads_fpath = kromsatel_args.watch_dirpath
+            self.watcher = src.watch.FastqDirectoryWatcher(
+                kromsatel_args.watch_dirpath,
+                kromsatel_args.watch_timeout,
+                kromsatel_args.watch_settle_time
+            )
+            self.progress = Progress(None)
+            output_prefix = os.path.basename(
+                os.path.normpath(kromsatel_args.watch_dirpath)
+            )
+        # end if
 
-        if kromsatel_args.split_output:
+        if kromsatel_args.stdout_output:
+            self.binner = StdoutUnpairedBinner(self.kromsatel_args.min_len)
+        elif kromsatel_args.split_output:
             self.binner = SplitUnpairedBinner(
                 self.kromsatel_args.outdir_path,
                 output_prefix,
@@ -78,74 +474,111 @@ class LongReadKromsatelCore(KromsatelCore):
                 self.kromsatel_args.min_len
             )
         # end if
+
+        self._init_discarded_binner(DiscardedUnpairedBinner, output_prefix)
     # end def
 
 
     def run(self):
 
-        reads_chunks = src.fastq.fastq_chunks_unpaired(
-            fq_fpath=self.reads_fpath,
-            chunk_size=self.chunk_size
-        )
-
         self.progress.print_status_bar()
 
-        self._clean_chunks(reads_chunks)
+        self._clean_chunks()
 
         self.progress.print_status_bar()
         print()
+
+        if not self.watcher is None:
+            print('{} - Files of reads cleaned: {}' \
+                .format(getwt(), self.watcher.num_completed_files))
+            truncated_fpaths = self.watcher.get_truncated_fpaths()
+            if len(truncated_fpaths) != 0:
+                print_err('\nWarning: the following gzipped files are truncated' \
+                    ' and have not been cleaned:\n  {}'.format('\n  '.join(truncated_fpaths)))
+            # end if
+        # end if
+        self.print_run_summary()
     # end def
 
-    def _clean_chunks(self, reads_chunks):
-        with mp.Pool(self.threads_num) as pool:
-            task_iterator = pool.imap(
-                self._clean_nanopore_chunk,
-                reads_chunks,
-                chunksize=1
-            )
-            for task in task_iterator:
-                pass
-            # end for
-        # end with
+    def get_input_spec(self):
+        return self._clean_nanopore_chunk, (self.reads_fpath,), 1
+    # end def
+
+    def get_num_readers(self):
+        if self.watcher is None:
+            return super().get_num_readers()
+        # end if
+        # Files appearing in the directory are read one by one with the same reader
+        return 1
+    # end def
+
+    def iter_input_chunks(self, readers):
+        if self.watcher is None:
+            yield from super().iter_input_chunks(readers)
+            return
+        # end if
 
-        pool.close()
-        pool.join()
+        # The pool is kept running between files, and outputs are appended
+        #   as soon as each chunk is cleaned.
+        num_bytes_before = 0
+        for fq_fpath in self.watcher.iter_completed_files():
+            num_file_bytes = 0
+            for chunk_input, num_file_bytes in self._iter_fastq_chunks((fq_fpath,), 1, readers):
+                yield chunk_input, num_bytes_before + num_file_bytes
+            # end for
+            num_bytes_before += num_file_bytes
+        # end for
     # end def
 
-    def _clean_nanopore_chunk(self, reads_chunk):
+    def _clean_nanopore_chunk(self, task):
+
+        chunk_num, chunk_input, precomputed_alignments, input_num_bytes = task
+
+        raw_chunk_parts = _load_raw_chunk_parts(chunk_input)
+        reads_chunk = src.fastq.parse_raw_chunk(raw_chunk_parts[0], self.reads_fpath)
+
+        passed_mask = self._prefilter_reads(reads_chunk)
 
         alignments = parse_alignments_nanopore(
-            src.blast.blast_align(reads_chunk, self.kromsatel_args)
+            reads_chunk,
+            self._align_chunk(
+                chunk_num, reads_chunk, precomputed_alignments,
+                passed_mask=passed_mask
+            )
         )
 
         self.cleaner.fill_binner(reads_chunk, alignments, self.binner)
 
-        self._write_output()
-        increment = len(reads_chunk)
-        self._update_progress(increment)
-        self._print_progress()
+        chunk_output = self._write_output()
+
+        return len(reads_chunk), input_num_bytes, chunk_output
     # end def
 # end class
 
 
 class IlluminaSEKromsatelCore(KromsatelCore):
 
-    def __init__(self, kromsatel_args):
-        super().__init__(kromsatel_args)
-        self.cleaner = IlluminaSEReadsCleaner(kromsatel_args)
+    def __init__(self, kromsatel_args, shared_core=None):
+        # The cleaner goes first: its primer scheme is used for aligning reads
+        if shared_core is None:
+            self.cleaner = IlluminaSEReadsCleaner(kromsatel_args)
+        else:
+            self.cleaner = shared_core.cleaner
+        # end if
+        super().__init__(kromsatel_args, shared_core)
 
         self.reads_fpath = self.kromsatel_args.frw_read_fpath
         self.chunk_size = self.kromsatel_args.chunk_size
 
-        num_reads_total = \
-            _count_unpaired_reads_verbosely(self.reads_fpath)
-        self.progress = Progress(num_reads_total)
-
-        output_prefix = fs.rm_fastq_extention(
-            os.path.basename(self.reads_fpath)
+        self.progress = Progress(
+            _get_input_size(self.reads_fpath)
         )
 
-        if kromsatel_args.split_output:
+        output_prefix = _get_output_prefix(self.reads_fpath)
+
+        if kromsatel_args.stdout_output:
+            self.binner = StdoutUnpairedBinner(self.kromsatel_args.min_len)
+        elif kromsatel_args.split_output:
             self.binner = SplitUnpairedBinner(
                 self.kromsatel_args.outdir_path,
                 output_prefix,
@@ -158,54 +591,53 @@ class IlluminaSEKromsatelCore(KromsatelCore):
                 self.kromsatel_args.min_len
             )
         # end if
+
+        self._init_discarded_binner(DiscardedUnpairedBinner, output_prefix)
     # end def
 
     def run(self):
 
-        reads_chunks = src.fastq.fastq_chunks_unpaired(
-            fq_fpath=self.reads_fpath,
-            chunk_size=self.chunk_size
-        )
-
         self.progress.print_status_bar()
 
-        self._clean_chunks(reads_chunks)
+        self._clean_chunks()
 
         self.progress.print_status_bar()
         print()
-    # end def
 
-    def _clean_chunks(self, reads_chunks):
-        with mp.Pool(self.threads_num) as pool:
-            task_iterator = pool.imap(
-                self._clean_illumina_se_chunk,
-                reads_chunks,
-                chunksize=1
-            )
-            for task in task_iterator:
-                pass
-            # end for
-        # end with
+        self.print_run_summary()
+    # end def
 
-        pool.close()
-        pool.join()
+    def get_input_spec(self):
+        return self._clean_illumina_se_chunk, (self.reads_fpath,), 1
     # end def
 
-    def _clean_illumina_se_chunk(self, reads_chunk):
+    def _clean_illumina_se_chunk(self, task):
+
+        chunk_num, chunk_input, precomputed_alignments, input_num_bytes = task
 
-        alignments = self._align_reads(reads_chunk)
+        raw_chunk_parts = _load_raw_chunk_parts(chunk_input)
+        reads_chunk = src.fastq.parse_raw_chunk(raw_chunk_parts[0], self.reads_fpath)
+
+        passed_mask = self._prefilter_reads(reads_chunk)
+
+        alignments = self._align_reads(
+            chunk_num, reads_chunk, precomputed_alignments, passed_mask
+        )
 
         self.cleaner.fill_binner(reads_chunk, alignments, self.binner)
 
-        self._write_output()
-        increment = len(reads_chunk)
-        self._update_progress(increment)
-        self._print_progress()
+        chunk_output = self._write_output()
+
+        return len(reads_chunk), input_num_bytes, chunk_output
     # end def
 
-    def _align_reads(self, reads_chunk):
+    def _align_reads(self, chunk_num, reads_chunk, precomputed_alignments, passed_mask):
         alignments = parse_alignments_illumina(
-            src.blast.blast_align(reads_chunk, self.kromsatel_args)
+            reads_chunk,
+            self._align_chunk(
+                chunk_num, reads_chunk, precomputed_alignments,
+                passed_mask=passed_mask
+            )
         )
 
         return alignments
@@ -215,23 +647,42 @@ class IlluminaSEKromsatelCore(KromsatelCore):
 
 class IlluminaPEKromsatelCore(KromsatelCore):
 
-    def __init__(self, kromsatel_args):
-        super().__init__(kromsatel_args)
-        self.cleaner = IlluminaPEReadsCleaner(kromsatel_args)
+    def __init__(self, kromsatel_args, shared_core=None):
+        # The cleaner goes first: its primer scheme is used for aligning reads
+        if shared_core is None:
+            self.cleaner = IlluminaPEReadsCleaner(kromsatel_args)
+        else:
+            self.cleaner = shared_core.cleaner
+        # end if
+        super().__init__(kromsatel_args, shared_core)
 
         self.frw_read_fpath = self.kromsatel_args.frw_read_fpath
         self.rvr_read_fpath = self.kromsatel_args.rvr_read_fpath
+        self.interleaved = self.kromsatel_args.interleaved
         self.chunk_size = self.kromsatel_args.chunk_size
 
-        num_reads_total = \
-            _count_paired_reads_verbosely(self.frw_read_fpath)
-        self.progress = Progress(num_reads_total)
+        self.mate_merger = None
+        if kromsatel_args.merge_mates:
+            self.mate_merger = src.mate_merging.MateMerger()
+        # end if
 
-        output_prefix = fs.rm_fastq_extention(
-            os.path.basename(self.frw_read_fpath)
+        if self.interleaved:
+            # Forward and reverse reads alternate in a single file
+            self.reads_fpaths = (self.frw_read_fpath,)
+            self.rvr_read_fpath = self.frw_read_fpath
+        else:
+            self.reads_fpaths = (self.frw_read_fpath, self.rvr_read_fpath)
+        # end if
+
+        self.progress = Progress(
+            _get_input_size(*self.reads_fpaths)
         )
 
-        if kromsatel_args.split_output:
+        output_prefix = _get_output_prefix(self.frw_read_fpath)
+
+        if kromsatel_args.stdout_output:
+            self.binner = StdoutPairedBinner(self.kromsatel_args.min_len)
+        elif kromsatel_args.split_output:
             self.binner = SplitPairedBinner(
                 self.kromsatel_args.outdir_path,
                 output_prefix,
@@ -244,63 +695,196 @@ class IlluminaPEKromsatelCore(KromsatelCore):
                 self.kromsatel_args.min_len
             )
         # end if
+
+        self._init_discarded_binner(DiscardedPairedBinner, output_prefix)
     # end def
 
     def run(self):
 
-        reads_chunks = src.fastq.fastq_chunks_paired(
-            frw_read_fpath=self.frw_read_fpath,
-            rvr_read_fpath=self.rvr_read_fpath,
-            chunk_size=self.chunk_size
-        )
-
         self.progress.print_status_bar()
 
-        self._clean_chunks(reads_chunks)
+        self._clean_chunks()
 
         self.progress.print_status_bar()
         print()
+
+        self.print_run_summary()
     # end def
 
-    def _clean_chunks(self, reads_chunks):
-        with mp.Pool(self.threads_num) as pool:
-            task_iterator = pool.imap(
-                self._clean_illumina_pe_chunk,
-                reads_chunks,
-                chunksize=1
+    def get_input_spec(self):
+        num_records_per_read = 2 if self.interleaved else 1
+        return self._clean_illumina_pe_chunk, self.reads_fpaths, num_records_per_read
+    # end def
+
+    def _get_chunk_read_names(self, raw_chunk_parts):
+        read_names = src.fastq.get_raw_chunk_read_names(raw_chunk_parts[0])
+        if self.interleaved:
+            return read_names[0::2]
+        # end if
+        return read_names
+    # end def
+
+    def _clean_illumina_pe_chunk(self, task):
+
+        chunk_num, chunk_input, precomputed_alignments, input_num_bytes = task
+
+        raw_chunk_parts = _load_raw_chunk_parts(chunk_input)
+        if self.interleaved:
+            frw_raw_chunk, rvr_raw_chunk = src.fastq.split_interleaved_raw_chunk(
+                raw_chunk_parts[0],
+                self.frw_read_fpath
             )
-            for task in task_iterator:
-                pass
-            # end for
-        # end with
+        else:
+            frw_raw_chunk, rvr_raw_chunk = raw_chunk_parts
+        # end if
+        reads_chunk = (
+            src.fastq.parse_raw_chunk(frw_raw_chunk, self.frw_read_fpath),
+            src.fastq.parse_raw_chunk(rvr_raw_chunk, self.rvr_read_fpath),
+        )
+
+        passed_mask = self._prefilter_read_pairs(reads_chunk)
+
+        if self.mate_merger is None:
+            alignments = self._align_read_pairs(
+                chunk_num, reads_chunk, precomputed_alignments, passed_mask
+            )
+            merged_fragments = None
+        else:
+            alignments, merged_fragments = self._align_merged_read_pairs(
+                reads_chunk, passed_mask
+            )
+        # end if
+
+        self.cleaner.fill_binner(reads_chunk, alignments, self.binner, merged_fragments)
+
+        chunk_output = self._write_output()
 
-        pool.close()
-        pool.join()
+        return len(reads_chunk[0]), input_num_bytes, chunk_output
     # end def
 
-    def _clean_illumina_pe_chunk(self, reads_chunk):
+    def _prefilter_read_pairs(self, reads_chunk):
+        # A pair is discarded only if both mates are too short,
+        #   or if both mates share too few k-mers with the reference
+        if self.length_prefilter is None and self.prefilter is None:
+            return None
+        # end if
 
-        alignments = self._align_read_pairs(reads_chunk)
+        frw_chunk, rvr_chunk = reads_chunk
 
-        self.cleaner.fill_binner(reads_chunk, alignments, self.binner)
+        if self.length_prefilter is None:
+            passed_mask = [True] * len(frw_chunk)
+        else:
+            passed_mask = [
+                frw_passed or rvr_passed
+                for frw_passed, rvr_passed in zip(
+                    self.length_prefilter.get_passed_mask(frw_chunk),
+                    self.length_prefilter.get_passed_mask(rvr_chunk)
+                )
+            ]
+        # end if
+        num_too_short = passed_mask.count(False)
+
+        num_off_target = 0
+        if not self.prefilter is None:
+            frw_seqs = frw_chunk.get_seqs()
+            rvr_seqs = rvr_chunk.get_seqs()
+            checked_indices = [i for i, passed in enumerate(passed_mask) if passed]
+            frw_passed_mask = self.prefilter.get_passed_mask(
+                [frw_seqs[i] for i in checked_indices]
+            )
+            rvr_passed_mask = self.prefilter.get_passed_mask(
+                [rvr_seqs[i] for i in checked_indices]
+            )
+            for i, frw_passed, rvr_passed \
+                    in zip(checked_indices, frw_passed_mask, rvr_passed_mask):
+                if not (frw_passed or rvr_passed):
+                    passed_mask[i] = False
+                    num_off_target += 1
+                    if not self.discarded_binner is None:
+                        self.discarded_binner.add_read_pair(frw_chunk[i], rvr_chunk[i])
+                    # end if
+                # end if
+            # end for
+        # end if
+
+        src.prefilter.count_discarded(
+            2 * len(frw_chunk),
+            2 * num_too_short,
+            2 * num_off_target
+        )
 
-        self._write_output()
-        increment = len(reads_chunk[0])
-        self._update_progress(increment)
-        self._print_progress()
+        return passed_mask
     # end def
 
-    def _align_read_pairs(self, reads_chunk):
-        frw_chunk = reads_chunk[0]
-        frw_alignments = parse_alignments_illumina(
-            src.blast.blast_align(frw_chunk, self.kromsatel_args)
+    def _align_merged_read_pairs(self, reads_chunk, passed_mask):
+        # Overlapping mates are merged into fragments, which are aligned
+        #   instead of the mates. Mates of the other pairs are aligned as usual.
+        #   All sequences are aligned with a single call to the aligner.
+        # Returns (<ALIGNMENTS_OF_UNMERGED_MATES>, <MERGED_FRAGMENTS>), see
+        #   `IlluminaPEReadsCleaner.fill_binner`.
+
+        frw_chunk, rvr_chunk = reads_chunk
+        if passed_mask is None:
+            passed_mask = [True] * len(frw_chunk)
+        # end if
+
+        merged_pairs = [
+            self.mate_merger.merge(frw_read, rvr_read) if passed else None
+            for frw_read, rvr_read, passed in zip(frw_chunk, rvr_chunk, passed_mask)
+        ]
+        merged_indices = [
+            i for i, merged_pair in enumerate(merged_pairs) if not merged_pair is None
+        ]
+        unmerged_indices = [
+            i for i, (passed, merged_pair) in enumerate(zip(passed_mask, merged_pairs))
+                if passed and merged_pair is None
+        ]
+        src.mate_merging.count_merged(passed_mask.count(True), len(merged_indices))
+
+        frw_seqs = frw_chunk.get_seqs()
+        rvr_seqs = rvr_chunk.get_seqs()
+        seqs = [merged_pairs[i].seq for i in merged_indices] \
+             + [frw_seqs[i] for i in unmerged_indices] \
+             + [rvr_seqs[i] for i in unmerged_indices]
+        alignment_lists = iter(self.aligner.align(seqs))
+
+        merged_fragments = dict()
+        for i in merged_indices:
+            merged_fragments[i] = (
+                merged_pairs[i],
+                select_single_alignment(next(alignment_lists))
+            )
+        # end for
+
+        frw_alignment_lists = [list() for _ in range(len(frw_chunk))]
+        rvr_alignment_lists = [list() for _ in range(len(rvr_chunk))]
+        for mate_alignment_lists in (frw_alignment_lists, rvr_alignment_lists):
+            for i in unmerged_indices:
+                mate_alignment_lists[i] = next(alignment_lists)
+            # end for
+        # end for
+
+        alignments = (
+            parse_alignments_illumina(frw_chunk, frw_alignment_lists),
+            parse_alignments_illumina(rvr_chunk, rvr_alignment_lists),
         )
 
-        rvr_chunk = reads_chunk[1]
-        rvr_alignments = parse_alignments_illumina(
-            src.blast.blast_align(rvr_chunk, self.kromsatel_args)
+        return alignments, merged_fragments
+    # end def
+
+    def _align_read_pairs(self, chunk_num, reads_chunk, precomputed_alignments, passed_mask):
+        # Both mates are aligned at once
+        frw_chunk, rvr_chunk = reads_chunk
+        frw_alignment_lists, rvr_alignment_lists = self._align_chunk_parts(
+            chunk_num,
+            (frw_chunk, rvr_chunk),
+            precomputed_alignments,
+            passed_mask
         )
 
+        frw_alignments = parse_alignments_illumina(frw_chunk, frw_alignment_lists)
+        rvr_alignments = parse_alignments_illumina(rvr_chunk, rvr_alignment_lists)
+
         alignments = (frw_alignments, rvr_alignments)
 
         return alignments
@@ -308,17 +892,116 @@ class IlluminaPEKromsatelCore(KromsatelCore):
 # end class
 
 
-def _count_unpaired_reads_verbosely(fastq_fpath):
-    print('{} - Counting reads...'.format(getwt()))
-    num_reads_total = src.fastq.count_reads(fastq_fpath)
-    print('{} - {} reads.'.format(getwt(), num_reads_total))
-    return num_reads_total
+def _get_input_size(*fastq_fpaths):
+    # Size of standard input is unknown
+    if fs.STDIN_FPATH in fastq_fpaths:
+        return None
+    # end if
+    return sum(
+        os.path.getsize(fpath) for fpath in fastq_fpaths
+    )
+# end def
+
+
+def _get_output_prefix(reads_fpath):
+    if reads_fpath == fs.STDIN_FPATH:
+        return 'stdin'
+    # end if
+    return fs.rm_fastq_extention(
+        os.path.basename(reads_fpath)
+    )
+# end def
+
+
+def clean_tasks_in_pool(threads_num, clean_chunk_func, tasks, reorder_buffer=None):
+    # Yields results of `clean_chunk_func` applied to `tasks` in a pool of workers.
+    # `clean_chunk_func` is passed to each worker once on start
+    #   instead of being pickled along with every task.
+    # Results are yielded as soon as they are done or, if `reorder_buffer` is passed,
+    #   in order of tasks.
+    # Number of tasks sent to the pool but not yielded yet is bounded:
+    #   otherwise the pool would consume whole input at once,
+    #   and the reorder buffer would grow behind a slow task.
+
+    pending_tasks = threading.Semaphore(2 * threads_num + 2)
+    stop_event = threading.Event()
+
+    with mp.Pool(threads_num,
+                 initializer=_init_worker,
+                 initargs=(clean_chunk_func,)) as pool:
+        try:
+            task_iterator = pool.imap_unordered(
+                _clean_chunk_in_worker,
+                enumerate(_bound_tasks(tasks, pending_tasks, stop_event)),
+                chunksize=1
+            )
+            for task_num, result in task_iterator:
+                if reorder_buffer is None:
+                    pending_tasks.release()
+                    yield result
+                    continue
+                # end if
+
+                reorder_buffer.add(task_num, result)
+                for ready_result in reorder_buffer.pop_ready():
+                    pending_tasks.release()
+                    yield ready_result
+                # end for
+            # end for
+        finally:
+            # Unblock the task generator, so that the pool can be terminated
+            stop_event.set()
+            pending_tasks.release()
+        # end try
+    # end with
+
+    pool.close()
+    pool.join()
+# end def
+
+
+def _bound_tasks(tasks, pending_tasks, stop_event):
+    for task in tasks:
+        pending_tasks.acquire()
+        if stop_event.is_set():
+            return
+        # end if
+        yield task
+    # end for
+# end def
+
+
+# Function cleaning chunks in the current worker process
+_worker_clean_chunk = None
+
+
+def _init_worker(clean_chunk_func):
+    global _worker_clean_chunk
+    _worker_clean_chunk = clean_chunk_func
+# end def
+
+
+def _clean_chunk_in_worker(numbered_task):
+    task_num, task = numbered_task
+    return task_num, _worker_clean_chunk(task)
+# end def
+
+
+def _load_raw_chunk_parts(chunk_input):
+    # Workers read shards of input files by themselves
+    if isinstance(chunk_input, src.fastq_shards.FastqShard):
+        return (src.fastq_shards.read_shard(chunk_input),)
+    # end if
+    return chunk_input
 # end def
 
 
-def _count_paired_reads_verbosely(frw_fastq_fpath):
-    print('{} - Counting reads...'.format(getwt()))
-    num_reads_total = src.fastq.count_reads(frw_fastq_fpath)
-    print('{} - {} read pairs.'.format(getwt(), num_reads_total))
-    return num_reads_total
+def _zip_raw_chunks(readers):
+    # Yields (<RAW_CHUNK_PARTS>, <NUM_INPUT_BYTES_CONSUMED>);
+    #   stops as soon as any of input files is over.
+    for items in zip(*(reader.iter_raw_chunks() for reader in readers)):
+        raw_chunk_parts = tuple(raw_chunk for raw_chunk, _ in items)
+        num_consumed_bytes = sum(num_bytes for _, num_bytes in items)
+        yield raw_chunk_parts, num_consumed_bytes
+    # end for
 # end def
@@ -2,6 +2,8 @@
 import os
 
 import src.blast
+import src.aligners
+import src.batch
 import src.parse_args
 import src.filesystem as fs
 import src.kromsatel_core as core
@@ -15,12 +17,16 @@ def main():
 
     args = _parse_arguments()
 
-    _check_blastplus_dependencies(args)
+    if src.aligners.aligner_uses_blast(args):
+        _check_blastplus_dependencies(args)
+    # end if
 
     print(str(args), end='\n\n')
 
-    db_fpath = _create_database(args)
-    args.set_database_path(db_fpath)
+    if src.aligners.aligner_uses_blast(args):
+        db_fpath = _create_database(args)
+        args.set_database_path(db_fpath)
+    # end if
 
     print('{} - Start.'.format(getwt()))
 
@@ -30,7 +36,9 @@ def main():
 
     if result_status == 0:
         print('\n{} - Completed.'.format(getwt()))
-        print('  Output directory: `{}`'.format(args.outdir_path))
+        if args.uses_outdir():
+            print('  Output directory: `{}`'.format(args.outdir_path))
+        # end if
     else:
         print_err('\n\a{} - Completed with errors.'.format(getwt()))
     # end if
@@ -81,7 +89,9 @@ def _clean_reads(kromsatel_args):
     result_status = 1
 
     try:
-        if kromsatel_args.kromsatel_mode == KromsatelModes.IlluminaPE:
+        if not kromsatel_args.samples is None:
+            runner = src.batch.BatchKromsatelCore(kromsatel_args)
+        elif kromsatel_args.kromsatel_mode == KromsatelModes.IlluminaPE:
             runner = core.IlluminaPEKromsatelCore(kromsatel_args)
         elif kromsatel_args.kromsatel_mode == KromsatelModes.Nanopore:
             runner = core.LongReadKromsatelCore(kromsatel_args)
@@ -110,11 +120,17 @@ def _clean_reads(kromsatel_args):
 
 
 def _cleanup(kromsatel_args):
-    fs.try_rm_directory(kromsatel_args.tmp_dir_path)
-
-    fs.try_rm_directory(
-        os.path.dirname(
-            kromsatel_args.db_fpath
+    database_is_temporary = not kromsatel_args.db_fpath is None \
+                            and kromsatel_args.db_cache_dirpath is None
+
+    if database_is_temporary:
+        fs.try_rm_directory(
+            os.path.dirname(
+                kromsatel_args.db_fpath
+            )
         )
-    )
+    # end if
+
+    # The temporary database may be located in the temporary directory
+    fs.try_rm_directory(kromsatel_args.tmp_dir_path)
 # end def
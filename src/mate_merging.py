@@ -0,0 +1,166 @@
+
+import src.synchronization as synchron
+from src.sequences import reverse_complement
+
+
+class MergedPair:
+    # A fragment merged from overlapping mates: the forward read spans
+    #   [0, frw_len) of the fragment, and the reverse-complement reverse read
+    #   spans [offset, offset + rvr_len).
+
+    def __init__(self, seq, offset, frw_len, rvr_len):
+        self.seq = seq
+        self.offset = offset
+        self.frw_len = frw_len
+        self.rvr_len = rvr_len
+    # end def
+
+    def project_span(self, fragment_from, fragment_to):
+        # Projects a span of the fragment (0-based, right-closed)
+        #   onto the mates. Returns ((<FRW_START>, <FRW_END>), (<RVR_START>, <RVR_END>)),
+        #   0-based, right-open coordinates. Spans, which miss a mate, are empty.
+        frw_start = max(fragment_from, 0)
+        frw_end = max(frw_start, min(fragment_to, self.frw_len - 1) + 1)
+
+        # Coordinates on the reverse-complement reverse read
+        rc_from = max(fragment_from, self.offset) - self.offset
+        rc_to = min(fragment_to, self.offset + self.rvr_len - 1) - self.offset
+        rvr_end = self.rvr_len - rc_from
+        rvr_start = min(rvr_end, self.rvr_len - 1 - rc_to)
+
+        return (frw_start, frw_end), (rvr_start, rvr_end)
+    # end def
+# end class
+
+
+class MateMerger:
+    # Merges mates, which overlap each other, into a single fragment.
+    # The overlap is searched for by seeds: consecutive `seed_len`-mers
+    #   at the start of the reverse-complement reverse read, up to `num_seeds`
+    #   of them, until one is found in the forward read. Candidate overlaps are verified
+    #   by the number of mismatches. At mismatching positions, the base
+    #   of higher quality goes to the fragment.
+    # Mates, which read through each other into adapters, are not merged.
+
+    def __init__(self, min_overlap=20, max_mismatch_rate=0.1, seed_len=12, num_seeds=4):
+        self.min_overlap = min_overlap
+        self.max_mismatch_rate = max_mismatch_rate
+        self.seed_len = seed_len
+        self.num_seeds = num_seeds
+    # end def
+
+    def merge(self, frw_read, rvr_read):
+        # Returns a MergedPair, or None if the mates do not overlap
+        frw_seq = frw_read.seq
+        rc_rvr_seq = reverse_complement(rvr_read.seq)
+
+        offset = self._find_overlap_offset(frw_seq, rc_rvr_seq)
+        if offset is None:
+            return None
+        # end if
+
+        overlap_len = len(frw_seq) - offset
+        frw_overlap = frw_seq[offset:]
+        rvr_overlap = rc_rvr_seq[:overlap_len]
+
+        if frw_overlap == rvr_overlap:
+            consensus = frw_overlap
+        else:
+            frw_quality = frw_read.quality_str
+            rvr_quality = rvr_read.quality_str
+            if len(frw_quality) != len(frw_seq) or len(rvr_quality) != len(rc_rvr_seq):
+                return None
+            # end if
+            consensus = self._make_consensus(
+                frw_overlap,
+                rvr_overlap,
+                frw_quality[offset:],
+                rvr_quality[::-1][:overlap_len]
+            )
+        # end if
+
+        return MergedPair(
+            frw_seq[:offset] + consensus + rc_rvr_seq[overlap_len:],
+            offset,
+            len(frw_seq),
+            len(rc_rvr_seq)
+        )
+    # end def
+
+    def _find_overlap_offset(self, frw_seq, rc_rvr_seq):
+        seed_len = self.seed_len
+
+        for seed_start in range(0, seed_len * self.num_seeds, seed_len):
+            seed = rc_rvr_seq[seed_start : seed_start+seed_len]
+            if len(seed) < seed_len:
+                return None
+            # end if
+
+            # Smaller offsets go first: longer overlaps are preferred
+            pos = frw_seq.find(seed)
+            while pos != -1:
+                offset = pos - seed_start
+                if offset >= 0 and self._overlap_is_valid(frw_seq, rc_rvr_seq, offset):
+                    return offset
+                # end if
+                pos = frw_seq.find(seed, pos + 1)
+            # end while
+        # end for
+
+        return None
+    # end def
+
+    def _overlap_is_valid(self, frw_seq, rc_rvr_seq, offset):
+        overlap_len = len(frw_seq) - offset
+
+        # The reverse read must reach the end of the forward one:
+        #   otherwise the forward read runs into an adapter
+        if overlap_len < self.min_overlap or overlap_len > len(rc_rvr_seq):
+            return False
+        # end if
+
+        max_mismatches = int(overlap_len * self.max_mismatch_rate)
+        num_mismatches = 0
+        for frw_base, rvr_base in zip(frw_seq[offset:], rc_rvr_seq):
+            if frw_base != rvr_base:
+                num_mismatches += 1
+                if num_mismatches > max_mismatches:
+                    return False
+                # end if
+            # end if
+        # end for
+
+        return True
+    # end def
+
+    def _make_consensus(self, frw_overlap, rvr_overlap, frw_quality, rvr_quality):
+        consensus = list(frw_overlap)
+        for i, (frw_base, rvr_base) in enumerate(zip(frw_overlap, rvr_overlap)):
+            if frw_base != rvr_base and rvr_quality[i] > frw_quality[i]:
+                consensus[i] = rvr_base
+            # end if
+        # end for
+        return ''.join(consensus)
+    # end def
+# end class
+
+
+def count_merged(num_pairs, num_merged):
+    with synchron.merging_num_pairs.get_lock():
+        synchron.merging_num_pairs.value += num_pairs
+    # end with
+    with synchron.merging_num_merged.get_lock():
+        synchron.merging_num_merged.value += num_merged
+    # end with
+# end def
+
+
+def get_merged_summary():
+    num_pairs = synchron.merging_num_pairs.value
+    if num_pairs == 0:
+        return None
+    # end if
+    num_merged = synchron.merging_num_merged.value
+    return 'Mate merging: {}/{} read pairs ({}%) merged and aligned as single fragments' \
+        .format(num_merged, num_pairs, round(num_merged / num_pairs * 100, 1))
+# end def
@@ -282,8 +282,74 @@ class SplitPairedOutput(Output):
 # end class
 
 
+class DiscardedUnpairedOutput(Output):
+
+    def __init__(self, outdir_path, output_prefix):
+
+        super().__init__(outdir_path, output_prefix)
+
+        self.outfpath = None
+        self._set_outfpath()
+        self._init_output()
+    # end def
+
+    def _set_outfpath(self):
+        suffix = 'discarded'
+        self.outfpath = _configure_unpaired_outfpath(
+            self.outdir_path,
+            self.output_prefix,
+            suffix
+        )
+    # end def
+
+    def _init_output(self):
+        fs.create_dir(self.outdir_path)
+        fs.init_file(self.outfpath)
+    # end def
+# end class
+
+
+class DiscardedPairedOutput(Output):
+
+    def __init__(self, outdir_path, output_prefix):
+
+        super().__init__(outdir_path, output_prefix)
+        self.sample_name = _get_sample_name(self.output_prefix)
+
+        self.frw_outfpath = None
+        self.rvr_outfpath = None
+        self._set_outfpaths()
+
+        self._init_output()
+    # end def
+
+    def _set_outfpaths(self):
+        suffix = 'discarded'
+        self.frw_outfpath = _configure_paired_outfpath(
+            self.outdir_path,
+            self.sample_name,
+            suffix,
+            forward=True
+        )
+        self.rvr_outfpath = _configure_paired_outfpath(
+            self.outdir_path,
+            self.sample_name,
+            suffix,
+            forward=False
+        )
+    # end def
+
+    def _init_output(self):
+        fs.create_dir(self.outdir_path)
+        for outfpath in (self.frw_outfpath, self.rvr_outfpath):
+            fs.init_file(outfpath)
+        # end for
+    # end def
+# end class
+
 def _get_sample_name(output_prefix):
 
+    sample_name = output_prefix
     for direction in ('_R1_001', '_R2_001'):
         if direction in output_prefix:
             sample_name = output_prefix.replace(direction, '')
@@ -293,6 +359,7 @@ def _get_sample_name(output_prefix):
 # end def
 
 
+
 def _configure_unpaired_outfpath(outdir_path, output_prefix, suffix):
     return os.path.join(
         outdir_path,
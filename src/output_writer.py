@@ -0,0 +1,224 @@
+
+import gzip
+import queue
+import collections
+import multiprocessing as mp
+
+import src.filesystem as fs
+from src.fatal_errors import FatalError
+from src.block_gzip import BlockCompressor, BlockGzipFile
+
+
+# The writer flushes output files, if it has had nothing to write for this time
+_IDLE_FLUSH_INTERVAL = 1.0 # seconds
+
+
+class OutputWriterProcess:
+    # Writes output files of the whole run in a separate process.
+    # The process keeps output files open, and worker processes pass
+    #   output of cleaned chunks to it through a pipe. Thus, workers do not wait
+    #   for each other to compress and write their output, and each output file
+    #   is a continuous gzip stream rather than a gzip member per chunk.
+    # Output is sent synchronously: once `write` returns, the output is in the pipe,
+    #   and the worker may be terminated safely. The pipe bounds amount of output
+    #   waiting to be written.
+    # With several compression threads or BGZF output, output files are compressed
+    #   by blocks in parallel, and consist of a gzip member per block.
+    # Output files are the same for the same sequence of writes: gzip headers
+    #   contain no modification time, and, for ordered output, files are not flushed
+    #   at arbitrary moments.
+
+    def __init__(self, kromsatel_args, max_open_files=64):
+        self._receiver, self._sender = mp.Pipe(duplex=False)
+        self._send_lock = mp.Lock()
+        self._error_queue = mp.Queue(1)
+
+        compression_params = (
+            kromsatel_args.compression_level,
+            kromsatel_args.compression_threads,
+            kromsatel_args.bgzf,
+        )
+        flush_when_idle = not kromsatel_args.ordered_output
+
+        self._process = mp.Process(
+            target=_write_received_output,
+            args=(
+                self._receiver,
+                self._error_queue,
+                max_open_files,
+                compression_params,
+                flush_when_idle,
+            ),
+            daemon=True
+        )
+        self._process.start()
+    # end def
+
+    def write(self, chunk_output):
+        # `chunk_output` is a list of (<OUTFPATH>, <DATA>) of a single chunk.
+        # Output of a chunk is written at once, so that mates of read pairs
+        #   go in the same order to forward and reverse output files.
+        with self._send_lock:
+            self._sender.send(chunk_output)
+        # end with
+    # end def
+
+    def close(self):
+        # Waits for all output to be written, and closes output files
+        self.write(None)
+
+        while True:
+            try:
+                error = self._error_queue.get(timeout=1)
+            except queue.Empty:
+                if not self._process.is_alive() and self._error_queue.empty():
+                    error_msg = '\nError: writing of output files has terminated unexpectedly'
+                    raise FatalError(error_msg)
+                # end if
+                continue
+            # end try
+            break
+        # end while
+        self._process.join()
+
+        if not error is None:
+            raise error
+        # end if
+    # end def
+
+    def stop(self):
+        if self._process.is_alive():
+            self._process.terminate()
+        # end if
+        self._process.join()
+    # end def
+# end class
+
+
+class _OpenOutputFiles:
+    # Output files opened by the writer.
+    # If too many files are open (e.g. for a batch of samples), the least recently
+    #   written one is closed. A file reopened afterwards is appended
+    #   with another gzip member.
+
+    def __init__(self, max_open_files, compression_level, block_compressor=None):
+        self.max_open_files = max_open_files
+        self.compression_level = compression_level
+        self.block_compressor = block_compressor
+        self._files = collections.OrderedDict()
+        # Each flush adds a few bytes to a gzip stream: flush only files written to
+        self._unflushed_fpaths = set()
+    # end def
+
+    def write(self, outfpath, data):
+        if outfpath == fs.STDOUT_FPATH:
+            fs.write_to_stdout(data)
+            return
+        # end if
+
+        outfile = self._files.get(outfpath)
+        if outfile is None:
+            if len(self._files) == self.max_open_files:
+                _, least_recent_file = self._files.popitem(last=False)
+                least_recent_file.close()
+            # end if
+            outfile = self._open_file(outfpath)
+            self._files[outfpath] = outfile
+        else:
+            self._files.move_to_end(outfpath)
+        # end if
+
+        outfile.write(data)
+        self._unflushed_fpaths.add(outfpath)
+    # end def
+
+    def _open_file(self, outfpath):
+        # Output files have been initialized by the main process
+        if self.block_compressor is None:
+            return gzip.GzipFile(
+                outfpath, 'ab',
+                compresslevel=self.compression_level,
+                mtime=0
+            )
+        # end if
+        return BlockGzipFile(outfpath, self.block_compressor)
+    # end def
+
+    def flush(self):
+        for outfpath in self._unflushed_fpaths:
+            if outfpath in self._files:
+                self._files[outfpath].flush()
+            # end if
+        # end for
+        self._unflushed_fpaths.clear()
+    # end def
+
+    def close(self):
+        while len(self._files) != 0:
+            _, outfile = self._files.popitem()
+            outfile.close()
+        # end while
+    # end def
+# end class
+
+
+def _write_received_output(receiver, error_queue, max_open_files, compression_params,
+                           flush_when_idle):
+    # Writes output until None is received. After an error, output is still
+    #   received and dropped, so that workers are not blocked.
+    # Puts the error, or None on success, to `error_queue`.
+    compression_level, compression_threads, bgzf = compression_params
+
+    # Threads of the compressor are started in the writer process
+    block_compressor = None
+    if compression_threads > 1 or bgzf:
+        block_compressor = BlockCompressor(compression_threads, compression_level, bgzf)
+    # end if
+
+    output_files = _OpenOutputFiles(max_open_files, compression_level, block_compressor)
+    error = None
+
+    while True:
+        if not receiver.poll(_IDLE_FLUSH_INTERVAL):
+            # E.g. the run waits for new files of reads in watch mode:
+            #   make output written so far readable
+            if error is None and flush_when_idle:
+                error = _call_catching_errors(output_files.flush)
+            # end if
+            continue
+        # end if
+
+        chunk_output = receiver.recv()
+        if chunk_output is None:
+            break
+        # end if
+
+        if error is None:
+            for outfpath, data in chunk_output:
+                error = _call_catching_errors(output_files.write, outfpath, data)
+                if not error is None:
+                    break
+                # end if
+            # end for
+        # end if
+    # end while
+
+    close_error = _call_catching_errors(output_files.close)
+    if not block_compressor is None:
+        block_compressor.shutdown()
+    # end if
+    error_queue.put(close_error if error is None else error)
+# end def
+
+
+def _call_catching_errors(func, *args):
+    # Returns an error to be re-raised in the main process, or None
+    try:
+        func(*args)
+    except OSError as err:
+        return FatalError('\nError: cannot write output files:\n  {}'.format(err))
+    except Exception as err:
+        return err
+    # end try
+    return None
+# end def
@@ -14,7 +14,9 @@ def parse_args():
 
 def _parse_command_line():
 
-    parser = argparse.ArgumentParser()
+    # Abbreviations are not allowed: `kromsatel.py` recognizes option `--stdout`
+    #   by its full name before the arguments are parsed
+    parser = argparse.ArgumentParser(allow_abbrev=False)
 
     parser.add_argument(
         '-1',
@@ -37,6 +39,37 @@ def _parse_command_line():
         required=False
     )
 
+    parser.add_argument(
+        '--interleaved',
+        help='TODO',
+        required=False,
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '--samples',
+        help='TODO',
+        required=False
+    )
+
+    parser.add_argument(
+        '--watch',
+        help='TODO',
+        required=False
+    )
+
+    parser.add_argument(
+        '--watch-timeout',
+        help='TODO',
+        required=False
+    )
+
+    parser.add_argument(
+        '--watch-settle-time',
+        help='TODO',
+        required=False
+    )
+
     parser.add_argument(
         '-p',
         '--primers',
@@ -66,6 +99,41 @@ def _parse_command_line():
         action='store_true'
     )
 
+    parser.add_argument(
+        '--stdout',
+        help='TODO',
+        required=False,
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '--compression-level',
+        help='TODO',
+        required=False,
+        type=int
+    )
+
+    parser.add_argument(
+        '--compression-threads',
+        help='TODO',
+        required=False,
+        type=int
+    )
+
+    parser.add_argument(
+        '--bgzf',
+        help='TODO',
+        required=False,
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '--ordered-output',
+        help='TODO',
+        required=False,
+        action='store_true'
+    )
+
     parser.add_argument(
         '-m',
         '--min-len',
@@ -97,6 +165,12 @@ def _parse_command_line():
         required=False
     )
 
+    parser.add_argument(
+        '--cascade-task',
+        help='TODO',
+        required=False
+    )
+
     parser.add_argument(
         '--crop-len',
         help='TODO',
@@ -116,6 +190,84 @@ def _parse_command_line():
         required=False
     )
 
+    parser.add_argument(
+        '--aligner',
+        help='TODO',
+        required=False
+    )
+
+    parser.add_argument(
+        '--db-cache',
+        help='TODO',
+        required=False
+    )
+
+    parser.add_argument(
+        '--dedup-window',
+        help='TODO',
+        required=False,
+        type=int
+    )
+
+    parser.add_argument(
+        '--alignment-memo',
+        help='TODO',
+        required=False
+    )
+
+    parser.add_argument(
+        '--save-alignments',
+        help='TODO',
+        required=False
+    )
+
+    parser.add_argument(
+        '--reclassify',
+        help='TODO',
+        required=False
+    )
+
+    parser.add_argument(
+        '--alignments',
+        help='TODO',
+        required=False
+    )
+
+    parser.add_argument(
+        '--no-primer-fast-path',
+        help='TODO',
+        required=False,
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '--prefilter-min-kmers',
+        help='TODO',
+        required=False,
+        type=int
+    )
+
+    parser.add_argument(
+        '--write-discarded',
+        help='TODO',
+        required=False,
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '--count-reads',
+        help='TODO',
+        required=False,
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '--merge-mates',
+        help='TODO',
+        required=False,
+        action='store_true'
+    )
+
     args = parser.parse_args()
 
     return args
@@ -0,0 +1,330 @@
+
+import re
+from collections import deque
+
+import src.filesystem as fs
+from src.alignment import Alignment
+from src.fatal_errors import FatalError
+
+
+SAM_FORMAT = 'SAM'
+PAF_FORMAT = 'PAF'
+
+_SAM_FLAG_UNMAPPED      = 0x4
+_SAM_FLAG_REVERSE       = 0x10
+_SAM_FLAG_FIRST_IN_PAIR = 0x40
+_SAM_FLAG_LAST_IN_PAIR  = 0x80
+_SAM_FLAG_SECONDARY     = 0x100
+_SAM_FLAG_SUPPLEMENTARY = 0x800
+
+_CIGAR_PATTERN = re.compile(r'([0-9]+)([MIDNSHP=X])')
+_CIGAR_QUERY_OPS = frozenset('MI=X')
+_CIGAR_REF_OPS   = frozenset('MDN=X')
+_CIGAR_CLIP_OPS  = frozenset('SH')
+
+# Number of reads, alignments of which are looked up ahead of the current one
+_NUM_LOOKAHEAD_GROUPS = 64
+
+
+class PrecomputedAlignments:
+    # Streams alignments from a SAM or PAF file alongside chunks of input reads.
+    # The file must list reads in the same order as the input fastq file(s),
+    #   which is the case for unsorted output of common aligners.
+    #   Reads missing from the file are considered unaligned.
+    # Alignments of a few next reads are looked up ahead: if an input read matches
+    #   one of them, alignments of the current read cannot be matched anymore,
+    #   and the error is reported at once, rather than after all the input.
+
+    def __init__(self, alignments_fpath, paired):
+        self.alignments_fpath = alignments_fpath
+        self.paired = paired
+        self.alignment_format = detect_format(alignments_fpath)
+
+        if paired and self.alignment_format == PAF_FORMAT:
+            error_msg = '\nError: PAF format cannot distinguish alignments of' \
+                ' forward and reverse reads. Please, use SAM format for paired-end reads:\n' \
+                '  `{}`'.format(alignments_fpath)
+            raise FatalError(error_msg)
+        # end if
+    # end def
+
+    def attach(self, numbered_chunks, get_read_names):
+        # Yields tasks: (<CHUNK_NUM>, <READS_CHUNK>, <ALIGNMENT_LISTS_OF_PARTS>)
+        # `get_read_names` returns identifiers of (forward) reads of a chunk.
+
+        with fs.open_file_may_by_gzipped(self.alignments_fpath, 'rt') as alignments_file:
+            groups = _LookaheadGroups(
+                _group_by_read_name(
+                    self._parse_records(alignments_file)
+                ),
+                _NUM_LOOKAHEAD_GROUPS
+            )
+            pending_group = groups.get_next()
+
+            for chunk_num, reads_chunk in numbered_chunks:
+                read_names = [
+                    _strip_mate_suffix(read_name)
+                    for read_name in get_read_names(reads_chunk)
+                ]
+                alignment_lists_of_parts = tuple(
+                    list() for _ in range(2 if self.paired else 1)
+                )
+
+                for read_name in read_names:
+                    if not pending_group is None and pending_group[0] == read_name:
+                        for alignment_lists, read_alignments \
+                                in zip(alignment_lists_of_parts, pending_group[1]):
+                            alignment_lists.append(read_alignments)
+                        # end for
+                        pending_group = groups.get_next()
+                    else:
+                        if groups.is_ahead(read_name):
+                            self._raise_order_error(pending_group[0])
+                        # end if
+                        for alignment_lists in alignment_lists_of_parts:
+                            alignment_lists.append(list())
+                        # end for
+                    # end if
+                # end for
+
+                if not pending_group is None:
+                    if pending_group[0] in set(read_names):
+                        self._raise_order_error(pending_group[0])
+                    # end if
+                # end if
+
+                yield chunk_num, reads_chunk, alignment_lists_of_parts
+            # end for
+
+            if not pending_group is None:
+                self._raise_order_error(pending_group[0])
+            # end if
+        # end with
+    # end def
+
+    def _parse_records(self, alignments_file):
+        if self.alignment_format == SAM_FORMAT:
+            parse_line = _parse_sam_line
+        else:
+            parse_line = _parse_paf_line
+        # end if
+
+        for line in alignments_file:
+            if line.startswith('@') or line.strip() == '':
+                continue
+            # end if
+            try:
+                record = parse_line(line)
+            except (ValueError, IndexError) as err:
+                error_msg = '\nError: cannot parse a line of {} file `{}`:\n  {}\n{}' \
+                    .format(self.alignment_format, self.alignments_fpath, line.strip(), err)
+                raise FatalError(error_msg)
+            # end try
+            if not record is None:
+                yield record
+            # end if
+        # end for
+    # end def
+
+    def _raise_order_error(self, read_name):
+        error_msg = '\nError: alignments of read `{}` from file `{}`' \
+            ' do not match order of input reads.\n' \
+            'Reads in the alignment file must be in the same order as in the fastq file(s)' \
+            ' (e.g. not sorted by coordinate), and must be present in the fastq file(s).' \
+                .format(read_name, self.alignments_fpath)
+        raise FatalError(error_msg)
+    # end def
+# end class
+
+
+def detect_format(alignments_fpath):
+    with fs.open_file_may_by_gzipped(alignments_fpath, 'rt') as alignments_file:
+        for line in alignments_file:
+            if line.startswith('@'):
+                return SAM_FORMAT
+            # end if
+            fields = line.split('\t')
+            if len(fields) >= 12 and fields[4] in ('+', '-'):
+                return PAF_FORMAT
+            # end if
+            if len(fields) >= 11:
+                return SAM_FORMAT
+            # end if
+        # end for
+    # end with
+
+    # Empty file: no reads are aligned, format does not matter
+    return SAM_FORMAT
+# end def
+
+
+def _group_by_read_name(records):
+    # Yields (<READ_NAME>, <ALIGNMENT_LISTS_OF_PARTS>) for consecutive records of a read.
+    # Alignments of a read are sorted so that the primary one is the first.
+    group_name = None
+    group = None
+
+    for read_name, part, is_primary, alignment in records:
+        if read_name != group_name:
+            if not group is None:
+                yield group_name, _sort_group(group)
+            # end if
+            group_name = read_name
+            group = (list(), list())
+        # end if
+        group[part].append((is_primary, alignment))
+    # end for
+
+    if not group is None:
+        yield group_name, _sort_group(group)
+    # end if
+# end def
+
+
+class _LookaheadGroups:
+    # Yields groups of alignments one by one, and keeps names of
+    #   `num_lookahead` groups following the yielded one.
+
+    def __init__(self, groups, num_lookahead):
+        self._groups = groups
+        self._next_groups = deque()
+        self._next_name_counts = dict()
+        for _ in range(num_lookahead + 1):
+            self._read_group()
+        # end for
+    # end def
+
+    def get_next(self):
+        # Returns the next group, or None if there are no more groups
+        if len(self._next_groups) == 0:
+            return None
+        # end if
+        group = self._next_groups.popleft()
+        self._next_name_counts[group[0]] -= 1
+        if self._next_name_counts[group[0]] == 0:
+            del self._next_name_counts[group[0]]
+        # end if
+        self._read_group()
+        return group
+    # end def
+
+    def is_ahead(self, read_name):
+        # Returns True if the read has alignments among the looked up groups
+        return read_name in self._next_name_counts
+    # end def
+
+    def _read_group(self):
+        group = next(self._groups, None)
+        if not group is None:
+            self._next_groups.append(group)
+            self._next_name_counts[group[0]] = self._next_name_counts.get(group[0], 0) + 1
+        # end if
+    # end def
+# end class
+
+
+def _sort_group(group):
+    return tuple(
+        [
+            alignment for _, alignment in sorted(
+                part_alignments,
+                key=lambda x: (not x[0], x[1].query_from - x[1].query_to)
+            )
+        ]
+        for part_alignments in group
+    )
+# end def
+
+
+def _strip_mate_suffix(read_name):
+    if read_name.endswith('/1') or read_name.endswith('/2'):
+        return read_name[:-2]
+    # end if
+    return read_name
+# end def
+
+
+def _parse_sam_line(line):
+
+    fields = line.split('\t', 11)
+    flag = int(fields[1])
+
+    if flag & (_SAM_FLAG_UNMAPPED | _SAM_FLAG_SECONDARY) or fields[5] == '*':
+        return None
+    # end if
+
+    part = 1 if flag & _SAM_FLAG_LAST_IN_PAIR else 0
+
+    leading_clip_len = 0
+    trailing_clip_len = 0
+    query_aligned_len = 0
+    ref_aligned_len = 0
+
+    cigar_ops = _CIGAR_PATTERN.findall(fields[5])
+    for op_len, op in cigar_ops:
+        op_len = int(op_len)
+        if op in _CIGAR_CLIP_OPS:
+            if query_aligned_len == 0 and ref_aligned_len == 0:
+                leading_clip_len += op_len
+            else:
+                trailing_clip_len += op_len
+            # end if
+        else:
+            if op in _CIGAR_QUERY_OPS:
+                query_aligned_len += op_len
+            # end if
+            if op in _CIGAR_REF_OPS:
+                ref_aligned_len += op_len
+            # end if
+        # end if
+    # end for
+
+    if query_aligned_len == 0 or ref_aligned_len == 0:
+        raise ValueError('Invalid CIGAR string: `{}`'.format(fields[5]))
+    # end if
+
+    ref_from = int(fields[3]) - 1 # 1-based to 0-based
+    ref_to   = ref_from + ref_aligned_len - 1
+
+    align_strand_plus = not (flag & _SAM_FLAG_REVERSE)
+
+    # SAM stores reverse-strand alignments as aligned reverse-complemented reads:
+    #   convert query coordinates to the ones of the original read
+    if align_strand_plus:
+        query_from = leading_clip_len
+    else:
+        query_from = trailing_clip_len
+    # end if
+    query_to = query_from + query_aligned_len - 1
+
+    is_primary = not (flag & _SAM_FLAG_SUPPLEMENTARY)
+
+    alignment = Alignment(query_from, query_to, ref_from, ref_to, align_strand_plus)
+
+    return _strip_mate_suffix(fields[0]), part, is_primary, alignment
+# end def
+
+
+def _parse_paf_line(line):
+
+    fields = line.rstrip('\n').split('\t')
+
+    # Skip secondary alignments
+    if 'tp:A:S' in fields[12:]:
+        return None
+    # end if
+
+    # Primary and supplementary alignments are not distinguished in PAF
+    is_primary = True
+
+    query_from = int(fields[2])
+    query_to   = int(fields[3]) - 1 # right-open to right-closed
+    ref_from   = int(fields[7])
+    ref_to     = int(fields[8]) - 1 # right-open to right-closed
+
+    align_strand_plus = (fields[4] == '+')
+
+    alignment = Alignment(query_from, query_to, ref_from, ref_to, align_strand_plus)
+
+    return _strip_mate_suffix(fields[0]), 0, is_primary, alignment
+# end def
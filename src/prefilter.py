@@ -0,0 +1,118 @@
+
+import src.fasta
+import src.process_cache
+import src.synchronization as synchron
+from src.sequences import reverse_complement
+
+
+class LengthPrefilter:
+    # Discards reads, which cannot be output whatever their alignments are:
+    #   an output read must be longer than `min_len`, and trimming
+    #   removes at least `min_trimmed_len` bases from a read.
+
+    def __init__(self, min_len, min_trimmed_len):
+        self.min_read_len = min_len + min_trimmed_len + 1
+    # end def
+
+    def get_passed_mask(self, reads_chunk):
+        # Returns a list of booleans: i-th one is True if i-th read passes.
+        # Lengths are taken from the chunk without extracting sequences.
+        min_read_len = self.min_read_len
+        return [
+            reads_chunk.get_seq_len(i) >= min_read_len
+            for i in range(len(reads_chunk))
+        ]
+    # end def
+# end class
+
+
+class KmerPrefilter:
+    # Discards off-target reads (e.g. host or bacterial ones) before alignment:
+    #   a read passes the prefilter if it shares at least `min_shared_kmers`
+    #   k-mers with the reference sequence (any strand).
+
+    def __init__(self, reference_fpath, min_shared_kmers, k=15):
+        self.reference_fpath = reference_fpath
+        self.min_shared_kmers = min_shared_kmers
+        self.k = k
+
+        # Build the k-mer set in the parent process:
+        #   worker processes inherit it
+        self._get_reference_kmers()
+    # end def
+
+    def get_passed_mask(self, seqs):
+        # Returns a list of booleans: i-th one is True if i-th sequence passes.
+        reference_kmers = self._get_reference_kmers()
+        return [
+            self._passes(seq, reference_kmers) for seq in seqs
+        ]
+    # end def
+
+    def _passes(self, seq, reference_kmers):
+        k = self.k
+        num_shared_kmers = 0
+
+        for pos in range(len(seq) - k + 1):
+            if seq[pos : pos+k] in reference_kmers:
+                num_shared_kmers += 1
+                if num_shared_kmers >= self.min_shared_kmers:
+                    return True
+                # end if
+            # end if
+        # end for
+
+        return False
+    # end def
+
+    def _get_reference_kmers(self):
+        return src.process_cache.get_or_build(
+            ('reference_kmers', self.reference_fpath, self.k),
+            self._collect_reference_kmers
+        )
+    # end def
+
+    def _collect_reference_kmers(self):
+        k = self.k
+        reference_kmers = set()
+
+        plus_seq = src.fasta.read_fasta_sequence(self.reference_fpath)
+        for seq in (plus_seq, reverse_complement(plus_seq)):
+            for pos in range(len(seq) - k + 1):
+                reference_kmers.add(seq[pos : pos+k])
+            # end for
+        # end for
+
+        return reference_kmers
+    # end def
+# end class
+
+
+def count_discarded(num_reads, num_too_short, num_off_target):
+    with synchron.prefilter_num_reads.get_lock():
+        synchron.prefilter_num_reads.value += num_reads
+    # end with
+    with synchron.prefilter_num_too_short.get_lock():
+        synchron.prefilter_num_too_short.value += num_too_short
+    # end with
+    with synchron.prefilter_num_off_target.get_lock():
+        synchron.prefilter_num_off_target.value += num_off_target
+    # end with
+# end def
+
+
+def get_discarded_summary():
+    num_reads = synchron.prefilter_num_reads.value
+    if num_reads == 0:
+        return None
+    # end if
+    num_too_short = synchron.prefilter_num_too_short.value
+    num_off_target = synchron.prefilter_num_off_target.value
+    num_discarded = num_too_short + num_off_target
+    return 'Prefilter: {}/{} reads ({}%) discarded before alignment:' \
+        ' {} too short, {} sharing too few k-mers with the reference' \
+            .format(
+                num_discarded, num_reads, round(num_discarded / num_reads * 100, 1),
+                num_too_short, num_off_target
+            )
+# end def
@@ -0,0 +1,156 @@
+
+import src.fasta
+import src.process_cache
+import src.synchronization as synchron
+from src.alignment import Alignment
+from src.sequences import reverse_complement
+
+
+class PrimerFastPathAligner:
+    # Aligns reads which start exactly with a primer and then match
+    #   the reference without a single mismatch along their whole length.
+    # Such reads get an alignment directly; other reads are passed
+    #   to the wrapped aligner.
+    # Primer prefixes of the reads are looked up in a hash of primer sequences:
+    #   left primers anneal to the plus strand of the reference,
+    #   right primers -- to the minus strand.
+
+    def __init__(self, aligner, primer_scheme, reference_fpath):
+        self.aligner = aligner
+        self.reference_fpath = reference_fpath
+
+        self.key_len = min(
+            len(primer.seq)
+            for pair in primer_scheme.primer_pairs
+                for primer in (pair.left_primer, pair.right_primer)
+        )
+
+        reference_len = len(self._get_reference_seqs()[0])
+
+        # Key: first `key_len` bases of a read;
+        # value: list of (<START_ON_STRAND>, <ALIGN_STRAND_PLUS>).
+        # Start coordinates of minus-strand sites are the ones
+        #   on the reverse-complement reference sequence.
+        self.primer_hash = dict()
+
+        ext_len = primer_scheme.primer_ext_len
+        for pair in primer_scheme.primer_pairs:
+            left_primer = pair.left_primer
+            self._add_site(
+                left_primer.seq,
+                left_primer.start + ext_len,
+                True
+            )
+
+            right_primer = pair.right_primer
+            anneal_end = right_primer.end - ext_len
+            self._add_site(
+                right_primer.seq,
+                reference_len - 1 - anneal_end,
+                False
+            )
+        # end for
+    # end def
+
+    def _add_site(self, primer_seq, start, align_strand_plus):
+        key = primer_seq[:self.key_len]
+        site = (start, align_strand_plus)
+        sites = self.primer_hash.setdefault(key, list())
+        if not site in sites:
+            sites.append(site)
+        # end if
+    # end def
+
+    def align(self, seqs):
+        # Returns a list of alignment lists: i-th list corresponds to i-th sequence.
+
+        alignment_lists = [None] * len(seqs)
+        missed_indices = list()
+
+        for i, seq in enumerate(seqs):
+            alignment = self._align_exactly(seq)
+            if alignment is None:
+                missed_indices.append(i)
+            else:
+                alignment_lists[i] = [alignment]
+            # end if
+        # end for
+
+        missed_alignment_lists = list()
+        if len(missed_indices) != 0:
+            missed_alignment_lists = self.aligner.align(
+                [seqs[i] for i in missed_indices]
+            )
+        # end if
+        for i, read_alignments in zip(missed_indices, missed_alignment_lists):
+            alignment_lists[i] = read_alignments
+        # end for
+
+        _count_hits(len(seqs), len(seqs) - len(missed_indices))
+
+        return alignment_lists
+    # end def
+
+    def _align_exactly(self, seq):
+
+        sites = self.primer_hash.get(seq[:self.key_len])
+        if sites is None:
+            return None
+        # end if
+
+        plus_seq, minus_seq = self._get_reference_seqs()
+        reference_len = len(plus_seq)
+        query_len = len(seq)
+
+        for start, align_strand_plus in sites:
+            strand_seq = plus_seq if align_strand_plus else minus_seq
+            if strand_seq[start : start+query_len] == seq:
+                if align_strand_plus:
+                    ref_from = start
+                else:
+                    ref_from = reference_len - start - query_len
+                # end if
+                return Alignment(
+                    0, query_len - 1,
+                    ref_from, ref_from + query_len - 1,
+                    align_strand_plus
+                )
+            # end if
+        # end for
+
+        return None
+    # end def
+
+    def _get_reference_seqs(self):
+        return src.process_cache.get_or_build(
+            ('reference_seqs', self.reference_fpath),
+            self._read_reference_seqs
+        )
+    # end def
+
+    def _read_reference_seqs(self):
+        plus_seq = src.fasta.read_fasta_sequence(self.reference_fpath)
+        return plus_seq, reverse_complement(plus_seq)
+    # end def
+# end class
+
+
+def _count_hits(num_reads, num_hits):
+    with synchron.fast_path_num_reads.get_lock():
+        synchron.fast_path_num_reads.value += num_reads
+    # end with
+    with synchron.fast_path_num_hits.get_lock():
+        synchron.fast_path_num_hits.value += num_hits
+    # end with
+# end def
+
+
+def get_hit_rate_summary():
+    num_reads = synchron.fast_path_num_reads.value
+    if num_reads == 0:
+        return None
+    # end if
+    num_hits = synchron.fast_path_num_hits.value
+    return 'Exact primer fast path: {}/{} reads ({}%) aligned without the aligner' \
+        .format(num_hits, num_reads, round(num_hits / num_reads * 100, 1))
+# end def
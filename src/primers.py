@@ -111,8 +111,8 @@ class PrimerScheme:
 
                     primer_pairs.append(
                         PrimerPair(
-                            Primer(left_start, left_end),
-                            Primer(right_start, right_end),
+                            Primer(left_start, left_end, left_primer_seq),
+                            Primer(right_start, right_end, right_primer_seq),
                         )
                     )
                 except ValueError as err:
@@ -210,8 +210,9 @@ class PrimerPair:
 
 
 class Primer:
-    def __init__(self, start, end):
+    def __init__(self, start, end, seq=None):
         self.start = start # 0-based, left-closed
         self.end   = end   # 0-based, right-closed
+        self.seq   = seq   # as in primer file, i.e. 5'->3'
     # end def
 # end class
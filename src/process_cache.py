@@ -0,0 +1,29 @@
+
+# Data which aligners and prefilters build once and then reuse for every chunk
+#   (e.g. reference k-mer sets and indices, LRU caches of alignments,
+#   database connections) is kept here, per process, rather than in their attributes.
+# Aligners and prefilters are passed to each worker process once, on start of
+#   the pool: worker processes inherit them on fork, or receive pickled copies
+#   of them on platforms without fork. Thus:
+#   - large data is not pickled, and is built by a worker process only if it
+#     has not been built by the main process before the pool is started;
+#   - data is shared by all aligners of a process which use the same reference
+#     (e.g. by samples of a batch);
+#   - objects, which must not be shared by processes (e.g. SQLite connections),
+#     should be stored under a key containing id of the process.
+
+_cache = dict()
+
+
+def get_or_build(key, build_value):
+    # Returns the value stored under `key` in the current process.
+    # The value is built by calling `build_value` on the first request.
+    # Keys should start with a name of the data, e.g. ('reference_index', <FPATH>, <K>).
+    try:
+        return _cache[key]
+    except KeyError:
+        value = build_value()
+        _cache[key] = value
+        return value
+    # end try
+# end def
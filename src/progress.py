@@ -1,53 +1,77 @@
 
 import os
 import sys
+import multiprocessing as mp
 
+import src.fastq
 from src.printing import getwt
-import src.synchronization as synchron
 
 
 class Progress:
+    # Progress is tracked in the main process.
+    # If total number of reads is unknown, progress is estimated
+    #   from the fraction of input bytes consumed.
+    # If input size is unknown as well (e.g. for standard input),
+    #   only the number of reads done is shown.
+
+    def __init__(self, num_bytes_total, num_reads_total=None):
+        if num_bytes_total is None:
+            self.NUM_BYTES_TOTAL = None
+        else:
+            self.NUM_BYTES_TOTAL = max(1, num_bytes_total)
+        # end if
+        self.num_reads_total = num_reads_total
 
-    def __init__(self, num_reads_total):
-        self.NUM_READS_TOTAL = num_reads_total
-        self._REPORT_DELAY = max(
-            1,
-            round(self.NUM_READS_TOTAL * 0.01)
-        )
-        self._DEFAULT_STATUS_BAR_LEN = 40
+        self.num_done_reads = 0
+        self.num_done_bytes = 0
 
-        synchron.next_report_num.value = self._REPORT_DELAY
+        self._DEFAULT_STATUS_BAR_LEN = 40
     # end def
 
 
-    def get_num_done_reads(self):
-        return synchron.num_done_reads.value
+    def set_num_reads_total(self, num_reads_total):
+        self.num_reads_total = num_reads_total
     # end def
 
 
-    def get_next_report_num(self):
-        return synchron.next_report_num.value
+    def increment_done(self, increment, num_done_bytes):
+        self.num_done_reads += increment
+        self.num_done_bytes = max(self.num_done_bytes, num_done_bytes)
     # end def
 
 
-    def increment_done(self, increment=1):
-        synchron.num_done_reads.value = synchron.num_done_reads.value + increment
+    def _get_ratio_done(self):
+        if self.num_reads_total is None:
+            ratio_done = self.num_done_bytes / self.NUM_BYTES_TOTAL
+        elif self.num_reads_total == 0:
+            ratio_done = 1.0
+        else:
+            ratio_done = self.num_done_reads / self.num_reads_total
+        # end if
+        return min(1.0, ratio_done)
     # end def
 
 
-    def increment_next_report(self):
-        while synchron.num_done_reads.value >= synchron.next_report_num.value:
-            synchron.next_report_num.value = synchron.next_report_num.value + self._REPORT_DELAY
-        # end while
+    def _format_reads_done(self):
+        if self.num_reads_total is None:
+            return '{} reads'.format(self.num_done_reads)
+        # end if
+        return '{}/{}'.format(self.num_done_reads, self.num_reads_total)
     # end def
 
 
     def print_status_bar(self):
 
-        curr_num_done_reads = self.get_num_done_reads()
+        if self.num_reads_total is None and self.NUM_BYTES_TOTAL is None:
+            sys.stdout.write(
+                '\r{} - {} reads done'.format(getwt(), self.num_done_reads)
+            )
+            sys.stdout.flush()
+            return
+        # end if
 
         bar_len = self._get_status_bar_len()
-        ratio_done = curr_num_done_reads / self.NUM_READS_TOTAL
+        ratio_done = self._get_ratio_done()
         percent_done = ratio_done * 100
         progress_line_len = round(bar_len * ratio_done)
 
@@ -60,13 +84,12 @@ class Progress:
         # end if
 
         sys.stdout.write(
-            '\r{} - [{}{}{}] {}/{} ({}%)'.format(
+            '\r{} - [{}{}{}] {} ({}%)'.format(
                 getwt(),
                 '=' * progress_line_len,
                 arrow,
                 ' ' * (bar_len - progress_line_len),
-                curr_num_done_reads,
-                self.NUM_READS_TOTAL,
+                self._format_reads_done(),
                 round(percent_done)
             )
         )
@@ -83,3 +106,41 @@ class Progress:
         return bar_len
     # end def
 # end class
+
+
+class ConcurrentReadCounter:
+    # Counts reads in a separate process while reads are being cleaned.
+    # `num_records_per_read` is number of fastq records per counted item,
+    #   e.g. 2 for interleaved paired-end reads.
+
+    def __init__(self, fastq_fpath, num_records_per_read=1):
+        self._num_reads = mp.Value('q', -1)
+        self._process = mp.Process(
+            target=_count_reads,
+            args=(fastq_fpath, num_records_per_read, self._num_reads),
+            daemon=True
+        )
+        self._process.start()
+    # end def
+
+    def get_num_reads(self):
+        # Returns None until counting is completed
+        num_reads = self._num_reads.value
+        if num_reads < 0:
+            return None
+        # end if
+        return num_reads
+    # end def
+
+    def stop(self):
+        if self._process.is_alive():
+            self._process.terminate()
+        # end if
+        self._process.join()
+    # end def
+# end class
+
+
+def _count_reads(fastq_fpath, num_records_per_read, num_reads):
+    num_reads.value = src.fastq.count_reads(fastq_fpath) // num_records_per_read
+# end def
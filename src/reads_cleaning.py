@@ -70,7 +70,7 @@ class ReadsCleaner:
             )
         # end if
 
-        trimming_rule = self._make_trimming_rule(
+        trimming_rule = self._make_unpaired_trimming_rule(
             start_primer_num,
             end_primer_num,
             read_orientation
@@ -99,7 +99,7 @@ class ReadsCleaner:
         return alignment_is_minor
     # end def
 
-    def _make_trimming_rule(self, start_primer_num, end_primer_num, read_orientation):
+    def _make_unpaired_trimming_rule(self, start_primer_num, end_primer_num, read_orientation):
         start_primer = self.primer_scheme.get_primer(
             start_primer_num,
             read_orientation
@@ -211,13 +211,27 @@ class IlluminaPEReadsCleaner(ReadsCleaner):
     def __init__(self, kromsatel_args):
         super().__init__(kromsatel_args)
         self.trimmer = PairedTrimmer(kromsatel_args, self.primer_scheme)
+        # Fragments merged from overlapping mates are trimmed as unpaired reads
+        self.fragment_trimmer = UnpairedTrimmer(kromsatel_args, self.primer_scheme)
     # end def
 
-    def fill_binner(self, reads_chunk, alignments, binner):
+    def fill_binner(self, reads_chunk, alignments, binner, merged_fragments=None):
+        # `merged_fragments` maps indices of pairs merged into fragments
+        #   to (<MERGED_PAIR>, <FRAGMENT_ALIGNMENT>).
 
         frw_alignments, rvr_alignments = alignments
 
-        for frw_read, rvr_read in zip(*reads_chunk):
+        for i, (frw_read, rvr_read) in enumerate(zip(*reads_chunk)):
+
+            if not merged_fragments is None and i in merged_fragments:
+                merged_pair, fragment_alignment = merged_fragments[i]
+                self._bin_merged_pair(
+                    frw_read, rvr_read,
+                    merged_pair, fragment_alignment,
+                    binner
+                )
+                continue
+            # end if
 
             frw_alignment = frw_alignments[frw_read.header]
             rvr_alignment = rvr_alignments[rvr_read.header]
@@ -252,6 +266,30 @@ class IlluminaPEReadsCleaner(ReadsCleaner):
         # end for
     # end def
 
+    def _bin_merged_pair(self, frw_read, rvr_read, merged_pair, fragment_alignment, binner):
+        # The fragment spans both primers of an amplicon: it is classified
+        #   and trimmed at once, and trimming is projected onto the mates
+        if fragment_alignment is None:
+            return
+        # end if
+
+        classification_mark, trimming_rule = self._classify_read(fragment_alignment)
+
+        fragment_alignment = \
+            self.fragment_trimmer.trim_aligment(fragment_alignment, trimming_rule)
+
+        (frw_start, frw_end), (rvr_start, rvr_end) = merged_pair.project_span(
+            fragment_alignment.query_from,
+            fragment_alignment.query_to
+        )
+
+        binner.add_read_pair(
+            frw_read.get_trimmed(frw_start, frw_end),
+            rvr_read.get_trimmed(rvr_start, rvr_end),
+            classification_mark
+        )
+    # end def
+
     def _classify_read_pair(self, frw_alignment, rvr_alignment):
 
         frw_orientation = get_read_orientation(frw_alignment)
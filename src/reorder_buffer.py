@@ -0,0 +1,52 @@
+
+import time
+
+
+class ReorderBuffer:
+    # Collects results of tasks, which are done out of order, and releases them
+    #   in order of the tasks. Tasks are numbered from 0.
+    # The buffer stalls, when it holds results which cannot be released
+    #   because a result of a preceding task is not done yet.
+    #   Time of such stalls is recorded.
+
+    def __init__(self):
+        self._results = dict()
+        self._next_task_num = 0
+        self._stall_start_time = None
+
+        self.stall_time = 0.0 # seconds
+        self.num_stalls = 0
+        self.max_num_buffered = 0
+    # end def
+
+    def add(self, task_num, result):
+        self._results[task_num] = result
+        self.max_num_buffered = max(self.max_num_buffered, len(self._results))
+    # end def
+
+    def pop_ready(self):
+        # Returns a list of results, which can be released
+        ready_results = list()
+        while self._next_task_num in self._results:
+            ready_results.append(self._results.pop(self._next_task_num))
+            self._next_task_num += 1
+        # end while
+
+        if not self._stall_start_time is None and len(ready_results) != 0:
+            self.stall_time += time.monotonic() - self._stall_start_time
+            self._stall_start_time = None
+        # end if
+        if self._stall_start_time is None and len(self._results) != 0:
+            self._stall_start_time = time.monotonic()
+            self.num_stalls += 1
+        # end if
+
+        return ready_results
+    # end def
+
+    def get_stall_summary(self):
+        return 'Ordered output: output waited for slower chunks {} times,' \
+            ' for {} s in total; at most {} chunks were buffered' \
+                .format(self.num_stalls, round(self.stall_time, 1), self.max_num_buffered)
+    # end def
+# end class
@@ -0,0 +1,214 @@
+
+import os
+
+import src.filesystem as fs
+from src.fatal_errors import FatalError
+from src.kromsatel_modes import KromsatelModes
+
+
+_SAMPLE_COLUMN = 'sample'
+_FRW_READS_COLUMN = 'R1'
+_RVR_READS_COLUMN = 'R2'
+_LONG_READS_COLUMN = 'long'
+
+_KNOWN_COLUMNS = (
+    _SAMPLE_COLUMN,
+    _FRW_READS_COLUMN,
+    _RVR_READS_COLUMN,
+    _LONG_READS_COLUMN,
+)
+
+# Names of directories, which kromsatel creates in the output directory itself
+_RESERVED_SAMPLE_NAMES = {'tmp', 'blast_database',}
+
+
+class Sample:
+
+    def __init__(self, name, frw_read_fpath, rvr_read_fpath, long_read_fpath):
+        self.name = name
+        self.frw_read_fpath = frw_read_fpath
+        self.rvr_read_fpath = rvr_read_fpath
+        self.long_read_fpath = long_read_fpath
+
+        if not long_read_fpath is None:
+            self.kromsatel_mode = KromsatelModes.Nanopore
+        elif not rvr_read_fpath is None:
+            self.kromsatel_mode = KromsatelModes.IlluminaPE
+        else:
+            self.kromsatel_mode = KromsatelModes.IlluminaSE
+        # end if
+    # end def
+
+    def get_fpaths(self):
+        return tuple(
+            fpath
+            for fpath in (self.frw_read_fpath, self.rvr_read_fpath, self.long_read_fpath)
+                if not fpath is None
+        )
+    # end def
+# end class
+
+
+def parse_sample_sheet(sample_sheet_fpath):
+    # A sample sheet is a tab-separated file with a header line.
+    # Column `sample` is mandatory; columns `R1`, `R2` and `long` are optional:
+    #   each sample has either reads R1 (and, for paired-end reads, R2),
+    #   or long reads. Empty lines and lines starting with `#` are ignored.
+    # Returns a list of samples.
+
+    with open(sample_sheet_fpath, 'rt') as sheet_file:
+        lines = [
+            (line_num, line.rstrip('\r\n'))
+            for line_num, line in enumerate(sheet_file, 1)
+                if line.strip() != '' and not line.startswith('#')
+        ]
+    # end with
+
+    if len(lines) == 0:
+        _raise_sheet_error(sample_sheet_fpath, 1, 'the sample sheet is empty')
+    # end if
+
+    header_line_num, header_line = lines[0]
+    column_names = [name.strip() for name in header_line.split('\t')]
+    _check_header(sample_sheet_fpath, header_line_num, column_names)
+
+    samples = list()
+    sample_names = set()
+
+    for line_num, line in lines[1:]:
+        fields = [field.strip() for field in line.split('\t')]
+        if len(fields) > len(column_names):
+            _raise_sheet_error(
+                sample_sheet_fpath, line_num,
+                'the line has more fields than the header'
+            )
+        # end if
+        fields += [''] * (len(column_names) - len(fields))
+        record = {
+            name: (None if field == '' else field)
+            for name, field in zip(column_names, fields)
+        }
+
+        sample = _make_sample(sample_sheet_fpath, line_num, record)
+
+        if sample.name in sample_names:
+            _raise_sheet_error(
+                sample_sheet_fpath, line_num,
+                'sample `{}` is listed more than once'.format(sample.name)
+            )
+        # end if
+        sample_names.add(sample.name)
+        samples.append(sample)
+    # end for
+
+    if len(samples) == 0:
+        _raise_sheet_error(sample_sheet_fpath, header_line_num, 'no samples are listed')
+    # end if
+
+    return samples
+# end def
+
+
+def _check_header(sample_sheet_fpath, line_num, column_names):
+    for name in column_names:
+        if not name in _KNOWN_COLUMNS:
+            _raise_sheet_error(
+                sample_sheet_fpath, line_num,
+                'unknown column `{}`. Allowed columns: {}' \
+                    .format(name, ', '.join(_KNOWN_COLUMNS))
+            )
+        # end if
+    # end for
+
+    if len(set(column_names)) != len(column_names):
+        _raise_sheet_error(sample_sheet_fpath, line_num, 'duplicated columns in the header')
+    # end if
+
+    if not _SAMPLE_COLUMN in column_names:
+        _raise_sheet_error(
+            sample_sheet_fpath, line_num,
+            'column `{}` is mandatory'.format(_SAMPLE_COLUMN)
+        )
+    # end if
+# end def
+
+
+def _make_sample(sample_sheet_fpath, line_num, record):
+    name = record.get(_SAMPLE_COLUMN)
+    frw_read_fpath = record.get(_FRW_READS_COLUMN)
+    rvr_read_fpath = record.get(_RVR_READS_COLUMN)
+    long_read_fpath = record.get(_LONG_READS_COLUMN)
+
+    _check_sample_name(sample_sheet_fpath, line_num, name)
+
+    if frw_read_fpath is None and not rvr_read_fpath is None:
+        _raise_sheet_error(
+            sample_sheet_fpath, line_num,
+            'sample `{}` has reverse reads (R2) but no forward ones (R1)'.format(name)
+        )
+    # end if
+    if long_read_fpath is None and frw_read_fpath is None:
+        _raise_sheet_error(
+            sample_sheet_fpath, line_num,
+            'no reads are specified for sample `{}`'.format(name)
+        )
+    # end if
+    if not long_read_fpath is None \
+       and not (frw_read_fpath is None and rvr_read_fpath is None):
+        _raise_sheet_error(
+            sample_sheet_fpath, line_num,
+            'sample `{}` has both short and long reads'.format(name)
+        )
+    # end if
+
+    sample = Sample(name, frw_read_fpath, rvr_read_fpath, long_read_fpath)
+
+    for fpath in sample.get_fpaths():
+        if fpath == fs.STDIN_FPATH:
+            _raise_sheet_error(
+                sample_sheet_fpath, line_num,
+                'reads of samples cannot be read from standard input'
+            )
+        # end if
+        if not os.path.exists(fpath):
+            _raise_sheet_error(
+                sample_sheet_fpath, line_num,
+                'file `{}` does not exist'.format(fpath)
+            )
+        # end if
+    # end for
+
+    if sample.kromsatel_mode == KromsatelModes.IlluminaPE \
+       and sample.frw_read_fpath == sample.rvr_read_fpath:
+        _raise_sheet_error(
+            sample_sheet_fpath, line_num,
+            'forward (R1) and reverse (R2) reads of sample `{}` are the same file' \
+                .format(name)
+        )
+    # end if
+
+    return sample
+# end def
+
+
+def _check_sample_name(sample_sheet_fpath, line_num, name):
+    # Output files of a sample are written to a directory named after the sample
+    if name is None:
+        _raise_sheet_error(sample_sheet_fpath, line_num, 'sample name is empty')
+    # end if
+    if name in ('.', '..') or '/' in name or os.sep in name \
+       or name in _RESERVED_SAMPLE_NAMES:
+        _raise_sheet_error(
+            sample_sheet_fpath, line_num,
+            'invalid sample name `{}`: it must be a valid directory name' \
+            ' other than {}'.format(name, ', '.join(sorted(_RESERVED_SAMPLE_NAMES)))
+        )
+    # end if
+# end def
+
+
+def _raise_sheet_error(sample_sheet_fpath, line_num, description):
+    error_msg = '\nError: invalid sample sheet `{}`, line {}:\n  {}' \
+        .format(sample_sheet_fpath, line_num, description)
+    raise FatalError(error_msg)
+# end def
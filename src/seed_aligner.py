@@ -0,0 +1,272 @@
+
+import src.fasta
+import src.process_cache
+from src.alignment import Alignment
+from src.sequences import reverse_complement
+from src.kromsatel_modes import KromsatelModes
+
+
+class ReferenceIndex:
+    # In-memory k-mer index of the reference sequence.
+
+    def __init__(self, reference_fpath, k):
+        self.k = k
+        self.reference_seq = src.fasta.read_fasta_sequence(reference_fpath)
+        self.kmer_positions = self._index_kmers()
+    # end def
+
+    def _index_kmers(self):
+        kmer_positions = dict()
+        k = self.k
+        seq = self.reference_seq
+
+        for pos in range(len(seq) - k + 1):
+            kmer = seq[pos : pos+k]
+            try:
+                kmer_positions[kmer].append(pos)
+            except KeyError:
+                kmer_positions[kmer] = [pos]
+            # end try
+        # end for
+
+        return kmer_positions
+    # end def
+# end class
+
+
+def get_reference_index(reference_fpath, k):
+    return src.process_cache.get_or_build(
+        ('reference_index', reference_fpath, k),
+        lambda: ReferenceIndex(reference_fpath, k)
+    )
+# end def
+
+
+class _Chain:
+    # Colinear chain of k-mer hits (anchors) located on close diagonals.
+
+    def __init__(self, query_pos, ref_pos, k):
+        self.query_start = query_pos
+        self.ref_start   = ref_pos
+        self.query_last  = query_pos
+        self.ref_last    = ref_pos
+        self.diagonal    = ref_pos - query_pos
+        self.score       = k # number of query bases covered by anchors
+    # end def
+
+    def add_anchor(self, query_pos, ref_pos, k):
+        self.score += min(k, query_pos - self.query_last)
+        self.query_last = query_pos
+        self.ref_last   = ref_pos
+        self.diagonal   = ref_pos - query_pos
+    # end def
+# end class
+
+
+class SeedExtendAligner:
+    # Aligns reads against the reference without any external program:
+    #   1) k-mers of a read are looked up in the reference k-mer index (seeding);
+    #   2) hits are chained along diagonals within a band, which tolerates indels;
+    #   3) ends of each chain are extended with ungapped X-drop extension.
+    # Scoring of the extension is the same as the one of megablast: +1/-2.
+
+    _MATCH_SCORE = 1
+    _MISMATCH_SCORE = -2
+    _X_DROP = 20
+
+    def __init__(self, kromsatel_args):
+        self.reference_fpath = kromsatel_args.reference_fpath
+
+        if kromsatel_args.kromsatel_mode == KromsatelModes.Nanopore:
+            self.k = 13
+            self.band_width = 32
+            self.max_gap = 200
+            self.max_alignments = 3
+        else:
+            self.k = 15
+            self.band_width = 8
+            self.max_gap = 50
+            self.max_alignments = 1
+        # end if
+
+        # Minimum number of query bases covered by seeds
+        self.min_score = 25
+
+        # Aligner parameters, which affect alignments
+        self.params_key = 'internal k={} band={} max_gap={} max_alignments={} ' \
+            'min_score={} x_drop={}' \
+            .format(
+                self.k, self.band_width, self.max_gap,
+                self.max_alignments, self.min_score, self._X_DROP
+            )
+    # end def
+
+    def align(self, seqs):
+        # Returns a list of alignment lists: i-th list corresponds to i-th sequence.
+        index = get_reference_index(self.reference_fpath, self.k)
+        return [self._align_sequence(seq, index) for seq in seqs]
+    # end def
+
+    def _align_sequence(self, seq, index):
+
+        query_len = len(seq)
+        if query_len < self.k:
+            return list()
+        # end if
+
+        rc_seq = reverse_complement(seq)
+
+        scored_chains = list()
+        for strand_plus, query_seq in ((True, seq), (False, rc_seq)):
+            for chain in self._find_chains(query_seq, index):
+                if chain.score >= self.min_score:
+                    scored_chains.append((chain.score, strand_plus, chain))
+                # end if
+            # end for
+        # end for
+
+        scored_chains.sort(key=lambda x: x[0], reverse=True)
+
+        alignments = list()
+        for _, strand_plus, chain in scored_chains:
+            query_seq = seq if strand_plus else rc_seq
+            query_from, query_to, ref_from, ref_to = \
+                self._extend_chain(chain, query_seq, index.reference_seq)
+
+            if not strand_plus:
+                # Map coordinates on the reverse-complement back to the read
+                query_from, query_to = \
+                    query_len - 1 - query_to, query_len - 1 - query_from
+            # end if
+
+            alignment = Alignment(query_from, query_to, ref_from, ref_to, strand_plus)
+
+            if not _overlaps_any(alignment, alignments):
+                alignments.append(alignment)
+                if len(alignments) == self.max_alignments:
+                    break
+                # end if
+            # end if
+        # end for
+
+        return alignments
+    # end def
+
+    def _find_chains(self, query_seq, index):
+
+        k = self.k
+        band_width = self.band_width
+        max_gap = self.max_gap
+        kmer_positions = index.kmer_positions
+
+        all_chains = list()
+        active_chains = dict() # diagonal bucket -> list of chains
+
+        for query_pos in range(len(query_seq) - k + 1):
+            ref_positions = kmer_positions.get(query_seq[query_pos : query_pos+k])
+            if ref_positions is None:
+                continue
+            # end if
+
+            for ref_pos in ref_positions:
+                diagonal = ref_pos - query_pos
+                bucket = diagonal // band_width
+
+                best_chain = None
+                best_bucket = None
+                best_shift = band_width + 1
+                for nearby_bucket in (bucket, bucket-1, bucket+1):
+                    for chain in active_chains.get(nearby_bucket, ()):
+                        shift = abs(diagonal - chain.diagonal)
+                        chain_can_be_extended = shift < best_shift \
+                            and query_pos - chain.query_last <= max_gap \
+                            and query_pos > chain.query_last \
+                            and ref_pos > chain.ref_last
+                        if chain_can_be_extended:
+                            best_chain = chain
+                            best_bucket = nearby_bucket
+                            best_shift = shift
+                        # end if
+                    # end for
+                # end for
+
+                if best_chain is None:
+                    chain = _Chain(query_pos, ref_pos, k)
+                    all_chains.append(chain)
+                    active_chains.setdefault(bucket, list()).append(chain)
+                else:
+                    best_chain.add_anchor(query_pos, ref_pos, k)
+                    if best_bucket != bucket:
+                        active_chains[best_bucket].remove(best_chain)
+                        active_chains.setdefault(bucket, list()).append(best_chain)
+                    # end if
+                # end if
+            # end for
+        # end for
+
+        return all_chains
+    # end def
+
+    def _extend_chain(self, chain, query_seq, reference_seq):
+
+        left_ext_len = self._xdrop_extension_len(
+            query_seq, reference_seq,
+            chain.query_start - 1, chain.ref_start - 1,
+            step=-1
+        )
+        right_ext_len = self._xdrop_extension_len(
+            query_seq, reference_seq,
+            chain.query_last + self.k, chain.ref_last + self.k,
+            step=1
+        )
+
+        query_from = chain.query_start - left_ext_len
+        ref_from   = chain.ref_start   - left_ext_len
+        query_to   = chain.query_last + self.k - 1 + right_ext_len
+        ref_to     = chain.ref_last   + self.k - 1 + right_ext_len
+
+        return query_from, query_to, ref_from, ref_to
+    # end def
+
+    def _xdrop_extension_len(self, query_seq, reference_seq, query_pos, ref_pos, step):
+
+        score = 0
+        best_score = 0
+        best_len = 0
+        ext_len = 0
+
+        query_len = len(query_seq)
+        ref_len = len(reference_seq)
+
+        while 0 <= query_pos < query_len and 0 <= ref_pos < ref_len:
+            ext_len += 1
+            if query_seq[query_pos] == reference_seq[ref_pos]:
+                score += self._MATCH_SCORE
+                if score > best_score:
+                    best_score = score
+                    best_len = ext_len
+                # end if
+            else:
+                score += self._MISMATCH_SCORE
+                if score < best_score - self._X_DROP:
+                    break
+                # end if
+            # end if
+            query_pos += step
+            ref_pos += step
+        # end while
+
+        return best_len
+    # end def
+# end class
+
+
+def _overlaps_any(alignment, alignments):
+    for other in alignments:
+        if alignment.query_from <= other.query_to \
+           and other.query_from <= alignment.query_to:
+            return True
+        # end if
+    # end for
+    return False
+# end def
@@ -26,13 +26,11 @@ _NON_SEQUENCE_PATTERN = r'[^{}]'.format(
 )
 
 
-def reverse_complement(seq):
-    return ''.join(map(_get_complement_base, seq))[::-1]
-# end def
+_COMPLEMENT_TABLE = str.maketrans(_COMPLEMENT_DICT)
 
 
-def _get_complement_base(base):
-    return _COMPLEMENT_DICT[base]
+def reverse_complement(seq):
+    return seq.translate(_COMPLEMENT_TABLE)[::-1]
 # end def
 
 
@@ -42,6 +40,15 @@ def verify_sequence(string):
 # end def
 
 
+_IUPAC_LINES_BYTES = ''.join(_COMPLEMENT_DICT.keys()).encode('ascii') + b'\n'
+
+
+def verify_sequence_lines_bytes(seq_lines_bytes):
+    # Verifies several newline-separated sequences (as bytes) at once
+    return len(seq_lines_bytes.translate(None, _IUPAC_LINES_BYTES)) == 0
+# end def
+
+
 def get_non_iupac_chars(string):
     return set(re.findall(_NON_SEQUENCE_PATTERN, string))
 # end def
@@ -2,9 +2,22 @@
 import multiprocessing as mp
 
 
-num_done_reads  = mp.Value('i', 0)
-next_report_num = mp.Value('i', 0)
+# Reads processed by the exact primer fast path, and reads aligned by it
+fast_path_num_reads = mp.Value('i', 0)
+fast_path_num_hits  = mp.Value('i', 0)
 
-output_lock        = mp.Lock()
-print_lock         = mp.Lock()
-status_update_lock = mp.Lock()
+# Reads processed by the prefilter, and reads discarded by it for each reason
+prefilter_num_reads      = mp.Value('i', 0)
+prefilter_num_too_short  = mp.Value('i', 0)
+prefilter_num_off_target = mp.Value('i', 0)
+
+# Read pairs checked for overlapping mates, and pairs merged
+merging_num_pairs  = mp.Value('i', 0)
+merging_num_merged = mp.Value('i', 0)
+
+# Sequences passed to each tier of the alignment cascade, and sequences aligned by it
+MAX_CASCADE_TIERS = 2
+cascade_tier_num_seqs = mp.Array('i', MAX_CASCADE_TIERS)
+cascade_tier_num_hits = mp.Array('i', MAX_CASCADE_TIERS)
+
+sidecar_lock = mp.Lock()
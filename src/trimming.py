@@ -49,6 +49,13 @@ class Trimmer:
         raise NotImplementedError
     # end def
 
+    def get_min_trimmed_len(self):
+        # Minimum number of bases trimmed off a read.
+        # The read start is always trimmed: either a primer is found there
+        #   (then at least one base of it is in the read), or the start is cropped.
+        return min(1, self.FIXED_CROP_LEN)
+    # end def
+
     def crop_start(self, alignment):
         if alignment.align_strand_plus:
             alignment.ref_from += self.FIXED_CROP_LEN
@@ -103,14 +110,9 @@ class Trimmer:
 
     def trim_read_to_fit_alignment(self, read, alignment):
 
-        read_copy = read.get_copy()
-
         new_start, new_end = alignment.query_from, alignment.query_to+1
 
-        read_copy.seq         = read_copy.seq[new_start : new_end]
-        read_copy.quality_str = read_copy.quality_str[new_start : new_end]
-
-        return read_copy
+        return read.get_trimmed(new_start, new_end)
     # end def
 # end class
 
@@ -121,6 +123,11 @@ class UnpairedTrimmer(Trimmer):
         super().__init__(kromsatel_args, primer_scheme)
     # end def
 
+    def get_min_trimmed_len(self):
+        # The read end is always trimmed as well
+        return 2 * super().get_min_trimmed_len()
+    # end def
+
     def trim_aligment(self, alignment, trimming_rule):
 
         start_primer = trimming_rule.start_primer
@@ -0,0 +1,159 @@
+
+import os
+import re
+import gzip
+import math
+import time
+import zlib
+
+
+_FASTQ_PATTERN = re.compile(r'.+\.f(ast)?q(\.gz)?$')
+
+_POLL_INTERVAL = 2.0 # seconds
+_SETTLE_TIME = 10 # seconds
+
+
+class FastqDirectoryWatcher:
+    # Watches a directory, into which fastq files are being written (e.g. by a basecaller).
+    # A file is considered completed, when its size and modification time
+    #   do not change for `settle_time` seconds, i.e. at several consecutive polls.
+    #   A gzipped file must also be complete: a file, the last gzip member of which
+    #   is truncated, is checked again once it changes. Each completed file
+    #   is yielded once. Watching stops when nothing changes in the directory
+    #   for `timeout` seconds. Subdirectories are not watched.
+
+    def __init__(self, dirpath, timeout, settle_time=_SETTLE_TIME, poll_interval=_POLL_INTERVAL):
+        self.dirpath = dirpath
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        # Number of consecutive polls, at which a completed file must be unchanged
+        self.num_settle_polls = max(1, math.ceil(settle_time / poll_interval))
+        self.num_completed_files = 0
+        # Gzipped files found truncated: {<FILE_PATH>: (<SIZE>, <MODIFICATION_TIME>)}
+        self._truncated_file_stats = dict()
+    # end def
+
+    def get_truncated_fpaths(self):
+        # Returns files, which have been left truncated, sorted
+        return sorted(self._truncated_file_stats.keys())
+    # end def
+
+    def iter_completed_files(self):
+        # Files completed at the same poll are yielded in order of modification
+        seen_fpaths = set()
+        prev_file_stats = dict()
+        # Number of polls, at which each file has been unchanged
+        num_unchanged_polls = dict()
+        last_activity_time = time.monotonic()
+
+        while True:
+            file_stats = {
+                fpath: stats
+                for fpath, stats in self._scan_fastq_files().items()
+                    if not fpath in seen_fpaths
+            }
+
+            num_unchanged_polls = {
+                fpath: num_unchanged_polls[fpath] + 1 if prev_file_stats.get(fpath) == stats else 0
+                for fpath, stats in file_stats.items()
+            }
+            for fpath in set(self._truncated_file_stats) - set(file_stats):
+                # The file has been removed
+                del self._truncated_file_stats[fpath]
+            # end for
+
+            completed_fpaths = sorted(
+                (
+                    fpath for fpath, stats in file_stats.items()
+                        if num_unchanged_polls[fpath] >= self.num_settle_polls \
+                           and stats[0] > 0 \
+                           and self._is_complete(fpath, stats)
+                ),
+                key=lambda fpath: (file_stats[fpath][1], fpath)
+            )
+
+            # Files, which have not settled yet, are not waited for in vain
+            is_settling = any(
+                num_polls < self.num_settle_polls for num_polls in num_unchanged_polls.values()
+            )
+            if file_stats != prev_file_stats or is_settling:
+                last_activity_time = time.monotonic()
+            # end if
+
+            for fpath in completed_fpaths:
+                seen_fpaths.add(fpath)
+                del file_stats[fpath]
+                self.num_completed_files += 1
+                yield fpath
+            # end for
+
+            if len(completed_fpaths) != 0:
+                # Cleaning of the files might have taken a while
+                last_activity_time = time.monotonic()
+            # end if
+
+            if time.monotonic() - last_activity_time >= self.timeout:
+                return
+            # end if
+
+            prev_file_stats = file_stats
+            time.sleep(self.poll_interval)
+        # end while
+    # end def
+
+    def _is_complete(self, fpath, stats):
+        if not fpath.endswith('.gz'):
+            return True
+        # end if
+        if self._truncated_file_stats.get(fpath) == stats:
+            # The file has not changed since it was found truncated
+            return False
+        # end if
+
+        if _gzip_is_complete(fpath):
+            self._truncated_file_stats.pop(fpath, None)
+            return True
+        # end if
+        self._truncated_file_stats[fpath] = stats
+        return False
+    # end def
+
+    def _scan_fastq_files(self):
+        # Returns {<FILE_PATH>: (<SIZE>, <MODIFICATION_TIME>)}
+        file_stats = dict()
+        with os.scandir(self.dirpath) as entries:
+            for entry in entries:
+                if not _FASTQ_PATTERN.match(entry.name):
+                    continue
+                # end if
+                try:
+                    if not entry.is_file():
+                        continue
+                    # end if
+                    stat_result = entry.stat()
+                except FileNotFoundError:
+                    # The file has been just renamed or removed
+                    continue
+                # end try
+                file_stats[entry.path] = (stat_result.st_size, stat_result.st_mtime_ns)
+            # end for
+        # end with
+        return file_stats
+    # end def
+# end class
+
+
+def _gzip_is_complete(fpath):
+    # Returns False, if the file cannot be decompressed to its end,
+    #   e.g. if it is still being written
+    try:
+        with gzip.open(fpath, 'rb') as gz_file:
+            while len(gz_file.read(1024 * 1024)) != 0:
+                pass
+            # end while
+        # end with
+    except (OSError, EOFError, zlib.error):
+        return False
+    # end try
+    return True
+# end def
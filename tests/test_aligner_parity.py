@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+
+# Checks that the built-in aligner (`--aligner internal`) agrees with BLAST:
+#   amplicon reads are simulated from the reference, cleaned with both aligners,
+#   and alignments selected for each read and classification of reads are compared.
+# Requires BLAST+: is skipped, if `blastn` is not in PATH, unless environment
+#   variable KROMSATEL_REQUIRE_BLAST is set (e.g. in CI): then it fails.
+# Shares of reads, which agree, are printed to stderr.
+# Run from the repository directory:
+#   python3 -m unittest discover tests
+
+import os
+import sys
+import gzip
+import random
+import shutil
+import tempfile
+import unittest
+import subprocess as sp
+
+_REPO_DIRPATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _REPO_DIRPATH)
+
+import src.fasta
+from src.sequences import reverse_complement
+from src.alignment import select_single_alignment
+from src.alignment_sidecar import AlignmentSidecarReader
+
+
+_KROMSATEL_FPATH = os.path.join(_REPO_DIRPATH, 'kromsatel.py')
+
+# The reference sequence and primers of the usage examples.
+# If the reference is missing, a random one is generated along with primers.
+_REFERENCE_FPATH = os.path.join(
+    _REPO_DIRPATH, 'reference', 'Wuhan-Hu-1-compele-genome.fasta'
+)
+_PRIMERS_FPATH = os.path.join(_REPO_DIRPATH, 'primers', 'nCov-2019_primers.csv')
+
+_NUM_READS = 2000
+_READ_LEN = 150
+_MISMATCH_RATE = 0.003
+_SEED = 1
+
+# Ends of alignments of the two aligners may differ by a few bases:
+#   BLAST extends alignments with gaps, while the internal aligner does not
+_COORD_TOLERANCE = 10 # bp
+# Share of reads, alignments or classes of which must be the same
+_MIN_AGREEMENT = 0.99
+
+_CLASSES = ('major', 'minor', 'uncertain')
+
+
+def _blast_is_available():
+    return not shutil.which('blastn') is None \
+           and not shutil.which('makeblastdb') is None
+# end def
+
+
+def _blast_is_required():
+    return os.environ.get('KROMSATEL_REQUIRE_BLAST', '') not in ('', '0')
+# end def
+
+
+@unittest.skipUnless(
+    _blast_is_available() or _blast_is_required(),
+    'blastn is not in PATH'
+)
+class AlignerParityTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        if not _blast_is_available():
+            raise RuntimeError('BLAST+ is required, but `blastn` is not in PATH')
+        # end if
+
+        cls.tmp_dirpath = tempfile.mkdtemp(prefix='kromsatel_parity_')
+        rng = random.Random(_SEED)
+
+        if os.path.exists(_REFERENCE_FPATH):
+            cls.reference_fpath = _REFERENCE_FPATH
+            cls.primers_fpath = _PRIMERS_FPATH
+        else:
+            cls.reference_fpath, cls.primers_fpath = _make_random_scheme(cls.tmp_dirpath, rng)
+        # end if
+
+        reference_seq = src.fasta.read_fasta_sequence(cls.reference_fpath)
+        amplicons = _find_amplicons(reference_seq, cls.primers_fpath)
+
+        cls.reads_fpath = os.path.join(cls.tmp_dirpath, 'reads.fastq.gz')
+        cls.read_names = _simulate_reads(cls.reads_fpath, reference_seq, amplicons, rng)
+
+        cls.results = dict()
+        for aligner in ('blast', 'internal'):
+            cls.results[aligner] = _run_kromsatel(
+                aligner,
+                cls.reads_fpath,
+                cls.primers_fpath,
+                cls.reference_fpath,
+                os.path.join(cls.tmp_dirpath, aligner)
+            )
+        # end for
+    # end def
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dirpath, ignore_errors=True)
+    # end def
+
+    def test_selected_alignments(self):
+        blast_alignments, _ = self.results['blast']
+        internal_alignments, _ = self.results['internal']
+
+        disagreements = list()
+        for name, blast_aln, internal_aln in \
+                zip(self.read_names, blast_alignments, internal_alignments):
+            if not _alignments_agree(blast_aln, internal_aln):
+                disagreements.append((name, blast_aln, internal_aln))
+            # end if
+        # end for
+
+        self._check_agreement(disagreements, 'alignments')
+    # end def
+
+    def test_classification(self):
+        _, blast_classes = self.results['blast']
+        _, internal_classes = self.results['internal']
+
+        disagreements = list()
+        for name in self.read_names:
+            blast_class = blast_classes.get(name)
+            internal_class = internal_classes.get(name)
+            if blast_class != internal_class:
+                disagreements.append((name, blast_class, internal_class))
+            # end if
+        # end for
+
+        self._check_agreement(disagreements, 'classes')
+    # end def
+
+    def _check_agreement(self, disagreements, what):
+        agreement = 1 - len(disagreements) / len(self.read_names)
+        print(
+            '\nAgreement of {} (BLAST vs internal): {:.2%} ({} of {} reads differ)' \
+                .format(what, agreement, len(disagreements), len(self.read_names)),
+            file=sys.stderr
+        )
+        self.assertGreaterEqual(
+            agreement,
+            _MIN_AGREEMENT,
+            '{} of {} reads differ by {} (BLAST vs internal), e.g.:\n{}' \
+                .format(
+                    len(disagreements), len(self.read_names), what,
+                    '\n'.join(map(str, disagreements[:10]))
+                )
+        )
+    # end def
+# end class
+
+
+def _alignments_agree(blast_aln, internal_aln):
+    if blast_aln is None or internal_aln is None:
+        return blast_aln is None and internal_aln is None
+    # end if
+    return blast_aln.align_strand_plus == internal_aln.align_strand_plus \
+           and abs(blast_aln.ref_from - internal_aln.ref_from) <= _COORD_TOLERANCE \
+           and abs(blast_aln.ref_to - internal_aln.ref_to) <= _COORD_TOLERANCE
+# end def
+
+
+def _run_kromsatel(aligner, reads_fpath, primers_fpath, reference_fpath, outdpath):
+    # Returns selected alignments of reads in order of the input file
+    #   and classes of output reads: {<READ_NAME>: <CLASS>}
+    sidecar_fpath = outdpath + '.alignments'
+    command = [
+        sys.executable, _KROMSATEL_FPATH,
+        '-1', reads_fpath,
+        '-p', primers_fpath,
+        '-r', reference_fpath,
+        '-o', outdpath,
+        '-s',
+        '-t', '1',
+        # All reads are in a single chunk
+        '-c', str(_NUM_READS),
+        '--aligner', aligner,
+        '--no-primer-fast-path',
+        '--save-alignments', sidecar_fpath,
+    ]
+    pipe = sp.run(command, stdout=sp.PIPE, stderr=sp.STDOUT)
+    if pipe.returncode != 0:
+        raise RuntimeError(
+            'kromsatel has failed with `--aligner {}`:\n{}' \
+                .format(aligner, pipe.stdout.decode('utf-8'))
+        )
+    # end if
+
+    alignment_lists = AlignmentSidecarReader(sidecar_fpath).read_chunk(0, 0, _NUM_READS)
+    selected_alignments = [
+        select_single_alignment(read_alignments) for read_alignments in alignment_lists
+    ]
+
+    read_classes = dict()
+    for read_class in _CLASSES:
+        outfpath = os.path.join(outdpath, 'reads_{}.fastq.gz'.format(read_class))
+        with gzip.open(outfpath, 'rt') as outfile:
+            for i, line in enumerate(outfile):
+                if i % 4 == 0:
+                    read_classes[line[1:].split()[0]] = read_class
+                # end if
+            # end for
+        # end with
+    # end for
+
+    return selected_alignments, read_classes
+# end def
+
+
+def _find_amplicons(reference_seq, primers_fpath):
+    # Returns (<START>, <END>) of amplicons, primers of which anneal
+    #   to the reference exactly. <END> is inclusive.
+    amplicons = list()
+    with open(primers_fpath, 'rt') as primers_file:
+        lines = [line.strip() for line in primers_file if line.strip() != '']
+    # end with
+
+    for left_line, right_line in zip(lines[0::2], lines[1::2]):
+        left_primer = left_line.split(',')[1].upper()
+        right_primer = reverse_complement(right_line.split(',')[1].upper())
+        start = reference_seq.find(left_primer)
+        end = reference_seq.find(right_primer)
+        if start != -1 and end != -1 and start < end:
+            amplicons.append((start, end + len(right_primer) - 1))
+        # end if
+    # end for
+
+    return amplicons
+# end def
+
+
+def _simulate_reads(reads_fpath, reference_seq, amplicons, rng):
+    # Reads start at either end of an amplicon: half of them span the whole
+    #   amplicon, and the rest are truncated to `_READ_LEN`. A few reads are from
+    #   fragments spanning two overlapping amplicons, and a few are random (off-target).
+    # Returns names of reads in order of the file.
+    read_names = list()
+
+    with gzip.open(reads_fpath, 'wt') as reads_file:
+        for i in range(_NUM_READS):
+            k = rng.randrange(len(amplicons))
+            r = rng.random()
+            if r < 0.90:
+                start, end = amplicons[k]
+                fragment = reference_seq[start : end+1]
+            elif r < 0.95 and k + 1 < len(amplicons):
+                start, end = amplicons[k+1][0], amplicons[k][1]
+                fragment = reference_seq[start : end+1]
+            else:
+                fragment = ''.join(rng.choice('ACGT') for _ in range(_READ_LEN))
+            # end if
+            if rng.random() < 0.5:
+                fragment = reverse_complement(fragment)
+            # end if
+
+            if rng.random() < 0.5:
+                fragment = fragment[:_READ_LEN]
+            # end if
+
+            seq = _add_mismatches(fragment, rng)
+            name = 'read_{}'.format(i)
+            reads_file.write('@{}\n{}\n+\n{}\n'.format(name, seq, 'I' * len(seq)))
+            read_names.append(name)
+        # end for
+    # end with
+
+    return read_names
+# end def
+
+
+def _add_mismatches(seq, rng):
+    return ''.join(
+        rng.choice([b for b in 'ACGT' if b != base]) if rng.random() < _MISMATCH_RATE else base
+        for base in seq
+    )
+# end def
+
+
+def _make_random_scheme(dirpath, rng):
+    # Makes a random reference sequence and a scheme of 400 bp amplicons
+    #   overlapping by 70 bp. Returns paths to the reference and primers files.
+    reference_len = 30000
+    reference_seq = ''.join(rng.choice('ACGT') for _ in range(reference_len))
+
+    reference_fpath = os.path.join(dirpath, 'reference.fasta')
+    with open(reference_fpath, 'wt') as reference_file:
+        reference_file.write('>reference\n{}\n'.format(reference_seq))
+    # end with
+
+    primers_fpath = os.path.join(dirpath, 'primers.csv')
+    with open(primers_fpath, 'wt') as primers_file:
+        start = 30
+        amplicon_num = 1
+        while start + 420 < reference_len:
+            end = start + 399
+            left_len = rng.randint(22, 26)
+            right_len = rng.randint(22, 26)
+            primers_file.write(
+                'amplicon_{}_LEFT,{}\n'.format(amplicon_num, reference_seq[start : start+left_len])
+            )
+            primers_file.write(
+                'amplicon_{}_RIGHT,{}\n'.format(
+                    amplicon_num,
+                    reverse_complement(reference_seq[end-right_len+1 : end+1])
+                )
+            )
+            start += 330
+            amplicon_num += 1
+        # end while
+    # end with
+
+    return reference_fpath, primers_fpath
+# end def
+
+
+if __name__ == '__main__':
+    unittest.main()
+# end if